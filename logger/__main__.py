@@ -3,10 +3,29 @@
 # Tests
 
 import unittest
+import unittest.mock
+import asyncio
+import tempfile
+import gzip
+import multiprocessing
+import threading
+import signal
+import time
+import os
 
 import logger
+import logger.benchmarks
+import logger.binary
+import logger.bypassers
+import logger.collector
 import logger.debug
 import logger.decorators
+import logger.interpolate
+import logger.loggers
+import logger.records
+import logger.sets
+import logger.io
+import logger.timestamps
 
 class _Object: pass
 
@@ -197,9 +216,795 @@ class TestDebugFunctions(unittest.TestCase):
             self.assertIs(logger.debug.get_function(1), type(self).test_get_function)
         inner()
 
+    def test_function_registry(self):
+        def make(value):
+            def closure():
+                return value, logger.debug.get_function()
+            return closure
+        first = logger.debug.register_function(make(1))
+        second = make(2) # not registered; found by scanning the heap
+        self.assertIs(first()[1], first)
+        self.assertIs(second()[1], second)
+        self.assertIn(second, logger.debug._functions[second.__code__])
+
+        def outer():
+            def inner(): # no free variables, re-created on each call
+                return logger.debug.get_function()
+            return inner
+        results = []
+        for i in range(3):
+            f = outer()
+            results.append(f() is f)
+            del f
+        self.assertEqual(results, [True, True, True])
+
+class TestIO(unittest.TestCase):
+
+    def test_file_pool(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            files = [os.path.join(tmp, "%d.log" % i) for i in range(3)]
+            with logger.io.FilePool(max_files=2) as pool:
+                for file in files:
+                    pool.write(file, ["spam\n"])
+                self.assertEqual(len(pool), 2)
+                self.assertNotIn(files[0], pool) # least recently used
+                self.assertIn(files[2], pool)
+                pool.write(files[0], ["eggs\n"])
+                self.assertNotIn(files[1], pool)
+            self.assertEqual(len(pool), 0)
+
+            with open(files[0]) as f:
+                self.assertEqual(f.read(), "spam\neggs\n")
+
+    def test_console_sink(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            file = os.path.join(tmp, "console.txt")
+            fd = os.open(file, os.O_WRONLY | os.O_CREAT)
+
+            def written():
+                with open(file) as f:
+                    return f.read()
+
+            try:
+                sink = logger.io.ConsoleSink(flush_lines=3, fd=fd)
+                sink.write("a\n")
+                sink.writelines(["b", "\n"]) # a single write
+                self.assertEqual(written(), "")
+                sink.write("c\n")
+                self.assertEqual(written(), "a\nb\nc\n")
+                sink.write("d" * 10000) # more than the buffer holds
+                self.assertTrue(written().startswith("a\nb\nc\nddd"))
+                sink.write("\n")
+                sink.close()
+                self.assertEqual(written(), "a\nb\nc\n" + "d" * 10000 + "\n")
+                os.fstat(fd) # the descriptor is left open
+
+                sink = logger.io.ConsoleSink(flush_lines=0, flush_interval=0.2,
+                                             fd=fd)
+                sink.write("spam\n")
+                timer = sink.timer
+                self.assertIsNotNone(timer)
+                self.assertFalse(written().endswith("spam\n"))
+                timer.join(5)
+                self.assertTrue(written().endswith("spam\n"))
+                self.assertIsNone(sink.timer)
+                sink.write("eggs\n")
+                sink.close()
+                self.assertIsNone(sink.timer)
+                self.assertTrue(written().endswith("spam\neggs\n"))
+            finally:
+                os.close(fd)
+
+    def test_log_many(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            files = {"normal": os.path.join(tmp, "normal.log"),
+                     "error": os.path.join(tmp, "error.log")}
+            log = logger.loggers.TypeLogger(logfiles=files, display=False,
+                                            ts_format="")
+            with log:
+                log.log_many(["spam", ("eggs", "ham"),
+                              logger.records.Record(("bacon",),
+                                                    options={"type": "error"})])
+                self.assertEqual(len(log.handles), 2)
+            with open(files["normal"]) as f:
+                self.assertEqual(f.read(), "spam\neggs ham\n")
+            with open(files["error"]) as f:
+                self.assertEqual(f.read(), "bacon\n")
+
+    def test_threaded_logger(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            files = {"normal": os.path.join(tmp, "normal.log"),
+                     "error": os.path.join(tmp, "error.log")}
+            log = logger.loggers.TypeLogger(logfiles=files, display=False,
+                                            ts_format="")
+
+            def work(n):
+                for i in range(500):
+                    log.logger("spam", n, i)
+                    log.multiple("eggs", n, i, types=["normal", "error"])
+
+            with log:
+                threads = [threading.Thread(target=work, args=(n,))
+                           for n in range(4)]
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+            with open(files["normal"]) as f:
+                self.assertEqual(len(f.readlines()), 4 * 500 * 2)
+            with open(files["error"]) as f:
+                self.assertEqual(len(f.readlines()), 4 * 500)
+
+    def test_multiple(self):
+        rendered = []
+        class Arg:
+            def __str__(self):
+                rendered.append(self)
+                return "arg"
+
+        with tempfile.TemporaryDirectory() as tmp:
+            files = {name: os.path.join(tmp, name + ".log")
+                     for name in ("normal", "error", "warn", "debug")}
+            log = logger.loggers.TypeLogger(logfiles=files, display=False,
+                                            ts_format="[ts] ")
+            log.bypassers.update([("write", {"warn"}, set(), None, False),
+                                  ("timestamp", {"error"}, set(), None, "! "),
+                                  ("files", {"debug"}, set(), None, "")])
+            with log:
+                log.multiple("spam", Arg(), types=["normal", "error", "warn"])
+                log.multiple("eggs", types="*")
+            self.assertEqual(len(rendered), 1)
+
+            with open(files["normal"]) as f:
+                self.assertEqual(f.read().splitlines(), ["[TS]spam arg",
+                                                         "[TS]eggs"])
+            with open(files["error"]) as f:
+                self.assertEqual(f.read().splitlines(), ["! spam arg",
+                                                         "! eggs"])
+            self.assertFalse(os.path.exists(files["warn"]))
+            self.assertFalse(os.path.exists(files["debug"]))
+
+    def test_binary_log(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            for binary in (False, True):
+                file = os.path.join(tmp, "binary.log" if binary else "text.log")
+                log = logger.loggers.TypeLogger(logfiles={"normal": file},
+                                                display=False, binary=binary,
+                                                segment_size=256)
+                with log:
+                    for i in range(20):
+                        log.logger("spam", i, "\neggs")
+                    log.bypassers.update([("timestamp", {"normal"}, set(),
+                                           None, "(raw) ")])
+                    log.logger("ham")
+            self.assertGreater(len(logger.binary.segments(file)), 1)
+            entry = next(iter(logger.binary.BinaryReader(file)))
+            self.assertEqual((entry.kind, entry.text), ("normal", "spam 0 "))
+            with open(os.path.join(tmp, "text.log")) as f:
+                self.assertEqual(logger.binary.to_text(file), f.read())
+
+    def test_binary_log_fork(self):
+        context = multiprocessing.get_context("fork")
+        with tempfile.TemporaryDirectory() as tmp:
+            file = os.path.join(tmp, "binary.log")
+
+            def work():
+                log.writelines([(2, "normal", None, "child")])
+                log.close()
+
+            with logger.binary.BinaryLog(file, segment_size=256) as log:
+                log.writelines([(1, "normal", None, "parent")])
+                process = context.Process(target=work)
+                process.start()
+                process.join(10)
+                if process.is_alive():
+                    process.kill()
+                    process.join()
+                self.assertEqual(process.exitcode, 0)
+                # the parent's next segment skips the one of the child
+                log.writelines([(3, "normal", None, "parent")] * 20)
+            self.assertGreater(len(logger.binary.segments(file)), 2)
+            texts = [entry.text for entry in logger.binary.BinaryReader(file)]
+            self.assertEqual(texts.count("parent"), 21)
+            self.assertEqual(texts.count("child"), 1)
+
+    def test_rotation(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            files = {"normal": os.path.join(tmp, "normal.log"),
+                     "error": os.path.join(tmp, "error.log")}
+            log = logger.loggers.TypeLogger(logfiles=files, display=False,
+                                            ts_format="", max_bytes=50,
+                                            backups=2, retention={"error": 3},
+                                            compress="gzip")
+            with log:
+                for i in range(30):
+                    log.logger("spam", i) # 7 or 8 bytes
+                    log.logger("eggs", i, type="error")
+            rotation = log.handles.rotation
+            rotated = rotation.rotated(files["normal"])
+            self.assertEqual(len(rotated), 2)
+            self.assertEqual(len(rotation.rotated(files["error"])), 3)
+            self.assertLessEqual(os.path.getsize(files["normal"]), 50)
+            with gzip.open(rotated[-1], "rt") as f:
+                self.assertEqual(f.readline(), "spam 19\n")
+
+        class Rotation(logger.io.Rotation):
+            default_compress = "zip"
+        with self.assertRaises(ValueError):
+            Rotation()
+
+    @unittest.skipUnless(hasattr(os, "fork"), "requires fork()")
+    def test_collector(self):
+        context = multiprocessing.get_context("fork")
+        workers, count = 8, 500
+
+        def work(n):
+            log = logger.loggers.TypeLogger(logfiles={"normal": file},
+                                            display=False, ts_format="",
+                                            autoflush=False,
+                                            collector=collector)
+            with log:
+                for i in range(count):
+                    log.logger("worker", n, "line", i, "x" * 200)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            file = os.path.join(tmp, "shared.log")
+            with logger.collector.Collector(batch_size=50,
+                                            context=context) as collector:
+                processes = [context.Process(target=work, args=(n,))
+                             for n in range(workers)]
+                for process in processes:
+                    process.start()
+                for process in processes:
+                    process.join()
+                    self.assertEqual(process.exitcode, 0)
+
+            expected = {"worker {0} line {1} {2}\n".format(n, i, "x" * 200)
+                        for n in range(workers) for i in range(count)}
+            with open(file) as f:
+                lines = f.readlines()
+            self.assertEqual(len(lines), workers * count)
+            self.assertEqual(set(lines), expected)
+
+    def test_collector_drain(self):
+        context = multiprocessing.get_context("fork")
+        batches, size = 200, 100
+
+        def work():
+            client = collector.client(autoflush=True)
+            for i in range(batches):
+                client.write(file, ["{0} {1}\n".format(i, "x" * 200)] * size)
+            # exit without waiting until the lines are written
+
+        with tempfile.TemporaryDirectory() as tmp:
+            file = os.path.join(tmp, "shared.log")
+            with logger.collector.Collector(context=context) as collector:
+                idle = multiprocessing.connection.Client(collector.address,
+                                                authkey=collector.authkey)
+                process = context.Process(target=work)
+                process.start()
+                process.join()
+                self.assertEqual(process.exitcode, 0)
+            idle.close() # it didn't keep the collector from stopping
+            with open(file) as f:
+                self.assertEqual(len(f.readlines()), batches * size)
+
+    @unittest.skipUnless(hasattr(os, "fork"), "requires fork()")
+    def test_collector_client_fork(self):
+        context = multiprocessing.get_context("fork")
+        client = logger.collector.CollectorClient(("localhost", 0), b"",
+                                                  autoflush=False,
+                                                  batch_size=100)
+        client.close() # not flushed before forking, so the lock stays held
+        held, release = threading.Event(), threading.Event()
+
+        def hold():
+            with client.lock:
+                held.set()
+                release.wait()
+
+        def work():
+            client.write("spam.log", ["ham\n"]) # the lock isn't held here
+            assert len(client) == 1, len(client)
+
+        thread = threading.Thread(target=hold)
+        thread.start()
+        held.wait()
+        try:
+            process = context.Process(target=work)
+            process.start()
+            process.join(10)
+            if process.is_alive():
+                process.kill()
+                process.join()
+            self.assertEqual(process.exitcode, 0)
+        finally:
+            release.set()
+            thread.join()
+        self.assertEqual(len(client), 0)
+
+    def test_async_logger(self):
+        async def main(file):
+            log = logger.loggers.AsyncTypeLogger(logfiles={"normal": file},
+                                                 display=False, ts_format="",
+                                                 max_queue=5)
+            async with log:
+                for i in range(20):
+                    await log.logger("spam", i)
+                for i in range(20):
+                    log.logger("eggs", i) # fire-and-forget
+                self.assertGreater(len(log.pending), 0)
+                await log.aflush()
+                self.assertEqual(len(log.pending), 0)
+            self.assertIsNone(log._task)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            file = os.path.join(tmp, "async.log")
+            asyncio.run(main(file))
+            with open(file) as f:
+                lines = f.read().splitlines()
+            self.assertEqual(lines, ["spam %d" % i for i in range(20)] +
+                                    ["eggs %d" % i for i in range(20)])
+
+    def test_async_writer(self):
+        done = []
+        with logger.io.AsyncWriter() as writer:
+            for i in range(100):
+                writer.submit(done.append, i)
+            writer.flush()
+            self.assertEqual(done, list(range(100)))
+        self.assertIsNone(writer.thread)
+
+        with self.assertRaises(ValueError):
+            logger.io.AsyncWriter(overflow="spam")
+
+    @unittest.skipUnless(hasattr(os, "fork"), "requires fork()")
+    def test_async_writer_fork(self):
+        context = multiprocessing.get_context("fork")
+        done = []
+
+        def work():
+            writer.submit(done.append, "child")
+            writer.flush()
+            assert done == ["parent", "child"], done
+            writer.close()
+
+        with logger.io.AsyncWriter(max_queue=1) as writer:
+            writer.submit(done.append, "parent")
+            writer.flush()
+            process = context.Process(target=work)
+            process.start()
+            process.join(10)
+            if process.is_alive():
+                process.kill()
+                process.join()
+            self.assertEqual(process.exitcode, 0)
+            self.assertEqual(done, ["parent"])
+
+class TestTerminal(unittest.TestCase):
+
+    def setUp(self):
+        self.columns = os.environ.get("COLUMNS")
+
+    def tearDown(self):
+        if self.columns is None:
+            os.environ.pop("COLUMNS", None)
+        else:
+            os.environ["COLUMNS"] = self.columns
+
+    def test_wrap_lines(self):
+        lines = ["spam eggs ham bacon", "short   ", "averyveryverylongword x",
+                 "ab cd ef gh"]
+        self.assertEqual(list(logger.loggers.BaseLogger._wrap_lines(lines, 10)),
+                         ["spam eggs", "ham bacon", "short",
+                          "averyveryverylongword", "x", "ab cd ef", "gh"])
+        self.assertEqual(list(logger.loggers.BaseLogger._wrap_lines(lines, 80)),
+                         ["spam eggs ham bacon", "short",
+                          "averyveryverylongword x", "ab cd ef gh"])
+
+    def test_terminal_width(self):
+        os.environ["COLUMNS"] = "100"
+        width = logger.io.TerminalWidth(ttl=0.05)
+        self.assertEqual(width(), 100)
+        os.environ["COLUMNS"] = "120"
+        self.assertEqual(width(), 100) # cached
+        time.sleep(0.1)
+        self.assertEqual(width(), 120)
+        os.environ["COLUMNS"] = "90"
+        width.invalidate()
+        self.assertEqual(width(), 90)
+        self.assertFalse(width.handler_installed)
+
+    @unittest.skipUnless(hasattr(signal, "SIGWINCH"), "requires SIGWINCH")
+    def test_terminal_resize(self):
+        previous = signal.getsignal(signal.SIGWINCH)
+        signal.signal(signal.SIGWINCH, signal.SIG_DFL)
+        try:
+            os.environ["COLUMNS"] = "100"
+            width = logger.io.TerminalWidth(ttl=3600, handle_signal=True)
+            self.assertEqual(width(), 100)
+            self.assertEqual(signal.getsignal(signal.SIGWINCH), width.invalidate)
+            os.environ["COLUMNS"] = "120"
+            os.kill(os.getpid(), signal.SIGWINCH)
+            self.assertEqual(width(), 120)
+        finally:
+            signal.signal(signal.SIGWINCH, previous)
+
+class TestTimestamps(unittest.TestCase):
+
+    def test_cached_timestamp(self):
+        for ts_format in ("[%Y-%m-%d] (%H:%M:%S {tzoffset})", "%c {tzname}",
+                          "{{%H}} %j", "", "%S.%f"):
+            for use_utc in (False, True):
+                formatter = logger.timestamps.TimestampFormatter(ts_format,
+                                                                 use_utc)
+                for i in range(3):
+                    # both calls must read the same time, or they could
+                    # fall on each side of a second boundary
+                    when = 1500000000.75 + i * 43200.5
+                    with unittest.mock.patch.object(logger.timestamps.time,
+                                                    "time", return_value=when):
+                        value = formatter()
+                        self.assertEqual(formatter(), value) # cached
+                    if "%f" not in ts_format:
+                        self.assertEqual(value, formatter.render(when))
+                        self.assertEqual(formatter.at(when + 1),
+                                         formatter.render(when + 1))
+
+        formatter = logger.timestamps.TimestampFormatter("{0}")
+        with self.assertRaises(IndexError):
+            formatter()
+
+class TestLevels(unittest.TestCase):
+
+    def test_level_rejection(self):
+        rendered = []
+        class Arg:
+            def __str__(self):
+                rendered.append(self)
+                return "arg"
+
+        log = logger.loggers.NamesLogger(levels={"debug": 0, "error": 20},
+                                         level=10, display=False, write=False)
+        self.assertTrue(log.is_enabled_for("error"))
+        self.assertFalse(log.is_enabled_for("debug"))
+        self.assertFalse(log.is_enabled_for(5))
+        log.logger(Arg(), level="debug")
+        self.assertFalse(rendered)
+
+        log.bypassers.update([("level", {(None, True)}, None, "error")])
+        self.assertTrue(log.is_enabled_for("debug"))
+        log.level = 30
+        self.assertFalse(log.is_enabled_for("debug"))
+
+    def test_level_lookup(self):
+        log = logger.loggers.NamesLogger(levels={"debug": 0, "error": 20},
+                                         level=10, display=False, write=False)
+        method = log.logger # checks the state once, to bind the handler
+        del log.__dict__["_bypass_state"]
+        method("spam", level="debug")
+        self.assertNotIn("_bypass_state", log.__dict__) # rejected first
+
+        lookups = []
+        class Settings(dict):
+            def __getitem__(self, key):
+                lookups.append(key)
+                return super().__getitem__(key)
+
+        log.bypassers.update([("level", {(None, True)},
+                               Settings(value="debug"), "value")])
+        self.assertIsNone(log._level_threshold())
+        log.logger("spam", level="error")
+        self.assertEqual(lookups, ["value"]) # not evaluated twice
+        self.assertFalse(log.is_enabled_for("error"))
+
+class TestRecords(unittest.TestCase):
+
+    def test_lazy_record(self):
+        rendered = []
+        class Arg:
+            def __str__(self):
+                rendered.append(self)
+                return "arg"
+
+        record = logger.records.Record(("spam", Arg()), "-")
+        self.assertFalse(rendered)
+        self.assertEqual(record.text, "spam-arg")
+        self.assertEqual(record.lines, ["spam-arg"])
+        self.assertEqual(str(record), "spam-arg")
+        self.assertEqual(len(rendered), 1)
+        self.assertIs(logger.records.Record.from_output((record,), " "), record)
+
+        record = logger.records.Record(("a", "b"), " ", lambda x: x[::-1])
+        self.assertEqual(record.text, "b a")
+
+class TestTranslater(unittest.TestCase):
+
+    def test_catalog(self):
+        lookups = []
+        class Lines(dict):
+            def __getitem__(self, line):
+                lookups.append(line)
+                return super().__getitem__(line)
+
+        french = Lines(HELLO="Bonjour {0}")
+        log = logger.loggers.TranslatedBaseLogger(modules={"French": french},
+                                                  all_languages={"French": "fr"},
+                                                  display=False, write=False)
+        log.load_catalog(["HELLO", "MISSING", "lowercase"])
+        self.assertEqual(log.catalog, {("French", "HELLO"): "Bonjour {0}"})
+        self.assertEqual(log.untranslated, {("French", "MISSING"),
+                                            ("English", "HELLO"),
+                                            ("English", "MISSING")})
+        self.assertEqual(lookups, ["HELLO", "MISSING"])
+
+        self.assertEqual(log.get_translation("HELLO", "French"), "Bonjour {0}")
+        self.assertIsNone(log.get_translation("MISSING", "French"))
+        self.assertIsNone(log.get_translation("lowercase", "French"))
+        self.assertEqual(lookups, ["HELLO", "MISSING"]) # all cached
+
+        lines = ["HELLO", "MISSING", "spam"]
+        log.translate(lines, "French", ["Bob"], {}, ())
+        self.assertEqual(lines, ["Bonjour Bob", "MISSING", "spam"])
+
+        french["HELLO"] = "Salut {0}"
+        french["MISSING"] = "Absent"
+        self.assertEqual(log.get_translation("HELLO", "French"), "Bonjour {0}")
+        log.clear_catalog()
+        self.assertEqual(log.catalog, {})
+        self.assertEqual(log.untranslated, set())
+        self.assertEqual(log.get_translation("HELLO", "French"), "Salut {0}")
+        self.assertEqual(log.get_translation("MISSING", "French"), "Absent")
+
+    def test_translated_batches(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            files = {"normal": os.path.join(tmp, "normal.log"),
+                     "error": os.path.join(tmp, "error.log")}
+            french = {"HELLO": "Bonjour", "WORLD": "Monde"}
+            log = logger.loggers.TranslatedTypeLogger(logfiles=files,
+                  display=False, ts_format="", current="French",
+                  modules={"French": french}, all_languages={"French": "fr"})
+            with log:
+                log.logger("HELLO", "WORLD")
+                log.multiple("HELLO", "WORLD", types=["normal", "error"])
+                log.log_many([logger.records.Record(("HELLO", "WORLD"))])
+
+            with open(os.path.join(tmp, "fr_normal.log")) as f:
+                self.assertEqual(f.read(), "Bonjour Monde\n" * 3)
+            with open(os.path.join(tmp, "fr_error.log")) as f:
+                self.assertEqual(f.read(), "Bonjour Monde\n")
+
+class TestInterpolate(unittest.TestCase):
+
+    def test_string_format(self):
+        obj = _Object()
+        obj.items = {"spam": [1, 2]}
+        for string, args, kwargs in (("{0} {1!r}", (1, "x"), {}),
+                                     ("{} {}", ("a", "b"), {}),
+                                     ("{{x}} {0:>5.1f}|", (3.14159,), {}),
+                                     ("{o.items[spam][1]}", (), {"o": obj})):
+            template = logger.interpolate.String(string)
+            for i in range(2): # parsed, then cached
+                self.assertEqual(template.format(*args, **kwargs),
+                                 string.format(*args, **kwargs))
+
+        self.assertEqual(logger.interpolate.String("{-1}").format(1, 2), "2")
+        with self.assertRaises(ValueError):
+            logger.interpolate.String("{0} {}").format(1, 2)
+
+    def test_string_codegen(self):
+        obj = _Object()
+        obj.items = {"spam": [1, 2]}
+        for string, mapping in (("Hello {0}, you have {count:>4} new {kind!r}",
+                                 {0: "user", "count": 3, "kind": "messages",
+                                  None: 1}),
+                                ("{{x}} {0:>5.1f}|{-1}", {0: 3.14159, None: 1}),
+                                ("{o.items[spam][1]!s}", {"o": obj}),
+                                ("no fields", {})):
+            template = logger.interpolate.String(string)
+            self.assertEqual(template.compile_function()(mapping),
+                             template._interpret(mapping))
+
+        class Shouting(logger.interpolate.String):
+            def modifier(self, final):
+                return "".join(final).upper()
+        class Changing(logger.interpolate.String):
+            def __str__(self):
+                return self.string + "!"
+        self.assertEqual(logger.interpolate.String("a{0}").format("b"), "ab")
+        self.assertEqual(Shouting("a{0}").format("b"), "AB")
+        changing = Changing("a{0}")
+        self.assertEqual(changing.format("b"), "ab!")
+        changing.string = "{0}c"
+        self.assertEqual(changing.format("b"), "bc!")
+
+class TestSets(unittest.TestCase):
+
+    def test_ordered_index(self):
+        oset = logger.sets.OrderedSet(range(10))
+        del oset[::3]
+        self.assertEqual(list(oset), [1, 2, 4, 5, 7, 8])
+        self.assertEqual(oset[-1], 8)
+        self.assertEqual(oset.find(5), 3)
+        oset.add(0)
+        self.assertEqual(oset[1:7:2], logger.sets.OrderedSet([2, 5, 8]))
+
+        mset = logger.sets.FrozenOrderedMultiSet("aabbbc")
+        self.assertEqual(mset[4], "b")
+        self.assertEqual(mset.index("c"), 5)
+        self.assertEqual(list(mset[1:4]), ["a", "b", "b"])
+
+    def test_interleaved_deletes(self):
+        items = list(range(3000))
+        oset = logger.sets.OrderedSet(items)
+        step = 0
+        while oset:
+            self.assertEqual(oset[0], items[0])
+            self.assertEqual(oset[-1], items[-1])
+            self.assertEqual(oset.find(items[len(items) // 2]), len(items) // 2)
+            del oset[len(oset) // 3]
+            del items[len(items) // 3]
+            step += 1
+            if step % 7 == 0: # new items go after the markers
+                oset.add(-step)
+                items.append(-step)
+            self.assertEqual(list(oset[1:8:3]), items[1:8:3])
+        self.assertEqual(oset.find(0), -1)
+
+        oset = logger.sets.OrderedSet(range(20000))
+        start = time.perf_counter()
+        while oset:
+            del oset[0]
+        self.assertLess(time.perf_counter() - start, 5) # quadratic took ~20s
+
+    def test_multiset_counts(self):
+        mset = logger.sets.MultiSet("aab")
+        mset.sum_update(logger.sets.FrozenMultiSet._from_counts({"a": 10**9}))
+        self.assertEqual(len(mset), 10**9 + 3)
+        self.assertEqual(mset.count("a"), 10**9 + 2)
+        mset -= logger.sets.MultiSet("a")
+        self.assertEqual(len(mset & logger.sets.Set("b")), 1)
+        self.assertEqual(len(mset + mset), 2 * (10**9 + 2))
+        mset.drop("a")
+        self.assertEqual(len(mset), 1)
+
+    def test_frozen_compact(self):
+        fset = logger.sets.FrozenSet(["error", "info"])
+        self.assertIn("info", fset)
+        self.assertNotIn(1, fset)
+        self.assertEqual(hash(fset), hash(logger.sets.FrozenOrderedSet(["info", "error"])))
+
+        domain = logger.sets.register_domain(["debug", "info", "warning", "error"])
+        try:
+            bits = logger.sets.FrozenSet(["info", "error"])
+            self.assertEqual(bits, fset)
+            self.assertIs(bits, logger.sets.FrozenSet(["error", "info"]))
+            self.assertEqual(list(bits | logger.sets.FrozenSet(["debug"])),
+                             ["debug", "info", "error"])
+        finally:
+            logger.sets.unregister_domain(domain)
+
+        self.assertNotIn([], fset)
+        self.assertNotIn([], bits)
+        self.assertIn("a", logger.sets.FrozenMultiSet("aab"))
+        self.assertNotIn("c", logger.sets.FrozenMultiSet("aab"))
+        self.assertIn((1, 2), logger.sets.FrozenSet([(1, 2), None]))
+
+        large = logger.sets.FrozenSet(str(i) for i in range(20)) # bisected
+        self.assertIn("13", large)
+        self.assertNotIn("x", large)
+        self.assertNotIn(13, large)
+        self.assertNotIn([], large)
+
 class TestBypassersHandlers(unittest.TestCase):
 
     def test_runtime_creation(self):
-        pass
+        class Custom(logger.bypassers.Bypassers):
+            __names__ = (("setting", None), ("pairs", set))
+            __views__ = (("keys", (0,)), ("pairs", (1,)))
+
+            def __init__(self, names=None):
+                super().__init__(names)
+                self.label = "spam"
+
+        bypasser = Custom([("display", {"x"})])
+        self.assertEqual(bypasser.label, "spam")
+        self.assertIn("display", bypasser)
+        self.assertIn(({"x"},), bypasser.pairs())
+        with self.assertRaises(AttributeError):
+            logger.bypassers.TypeBypassers().label = "eggs"
+
+    def test_views(self):
+        bypasser = logger.bypassers.TypeBypassers()
+        bypasser.add("spam", "eggs", "ham")
+        bypasser.update([("spam", {"x"}, set(), None, "")])
+        types = bypasser.types()
+        self.assertEqual(len(types), 4)
+        self.assertIn(({"x"},), types)
+        self.assertNotIn(({"y"},), types)
+        bypasser.__mapping__["spam"][1][0].add("y")
+        bypasser.touch()
+        self.assertIn(({"x", "y"},), types)
+
+        keys = bypasser.keys()
+        self.assertEqual(bypasser[1], "eggs")
+        self.assertEqual(list(bypasser[-2:]), ["eggs", "ham"])
+        del bypasser[0]
+        self.assertEqual(len(keys), 2)
+        self.assertNotIn("spam", keys)
+        self.assertEqual(keys & {"ham", "bacon"}, {"ham"})
+        self.assertEqual(keys - {"ham"}, {"eggs"})
+        self.assertTrue(keys.isdisjoint({"spam"}))
+
+    def test_type_masks(self):
+        log = logger.loggers.TypeLogger(logfiles={"spam": "spam.log"},
+                                        display=False, write=False)
+        types = {"spam"}
+        log.bypassers.update([("files", types, set(), None, "")])
+        plan = logger.decorators.check_bypass.get_plan(log, typed=True)
+        self.assertTrue(plan.bound("files", "spam"))
+        self.assertFalse(plan.bound("files", "normal"))
+        self.assertFalse(plan.bound("all", "spam"))
+        types.add("normal")
+        log.bypassers.touch()
+        plan = logger.decorators.check_bypass.get_plan(log, typed=True)
+        self.assertTrue(plan.bound("files", "normal"))
+        self.assertEqual(log.type_domain.bits["spam"], 0)
+
+        get_plan = logger.decorators.check_bypass.get_plan
+        limit = log.type_domain.max_items
+        for i in range(limit + 2):
+            types.clear()
+            types.add("temp{0}".format(i))
+            log.bypassers.touch()
+            plan = get_plan(log, typed=True)
+        self.assertLessEqual(len(log.type_domain), limit)
+        self.assertNotIn("temp0", log.type_domain.bits)
+        self.assertTrue(plan.bound("files", "temp{0}".format(limit + 1)))
+        self.assertFalse(plan.bound("files", "temp0"))
+
+    def test_in_place_changes(self):
+        log = logger.loggers.TypeLogger(logfiles={"spam": "spam.log"},
+                                        display=False, write=False)
+        TrackedSet = logger.bypassers.TrackedSet
+        types, pairs = TrackedSet({"spam"}), TrackedSet()
+        log.bypassers.update([("display", types, pairs, None, True)])
+        get_plan = logger.decorators.check_bypass.get_plan
+        self.assertTrue(get_plan(log, typed=True).bound("display", "spam"))
+        self.assertEqual(get_plan(log, typed=True).evaluate("normal"), {})
+
+        types.add("normal") # no touch()
+        self.assertTrue(get_plan(log, typed=True).bound("display", "normal"))
+        pairs.add((None, True))
+        types.clear()
+        self.assertEqual(get_plan(log, typed=True).evaluate("eggs"),
+                         {"display": True})
+        self.assertIn(({(None, True)},), log.bypassers.pairs())
+        self.assertNotIn(((),), log.bypassers.types())
+        self.assertIn((set(),), log.bypassers.types())
+
+        log.bypassers.add("write") # its sets are tracked as well
+        log.bypassers.__mapping__["write"][0][0].add("spam")
+        self.assertTrue(get_plan(log, typed=True).bound("write", "spam"))
+        copied = log.bypassers.copy(deep=True)
+        version = log.bypassers.__mapping__.version
+        copied.__mapping__["write"][0][0].add("eggs")
+        self.assertEqual(log.bypassers.__mapping__.version, version)
+
+        log = logger.loggers.NamesLogger(levels={"debug": 0, "error": 20},
+                                         level=10, display=False, write=False)
+        pairs = TrackedSet()
+        log.bypassers.update([("level", pairs, None, "error")])
+        self.assertFalse(log.is_enabled_for("debug"))
+        pairs.add((None, True))
+        self.assertTrue(log.is_enabled_for("debug"))
+
+        pairs = set() # not tracked: touch() is needed
+        log.bypassers.update([("check", pairs, None, False)])
+        get_plan(log)
+        pairs.add((None, True))
+        self.assertNotIn("check", get_plan(log).evaluate())
+        log.bypassers.touch()
+        self.assertEqual(get_plan(log).evaluate()["check"], False)
 
 unittest.main()
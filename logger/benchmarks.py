@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+
+"""Micro-benchmarks for the hot paths of the loggers.
+
+Run with 'python -m logger.benchmarks [name ...]'. Each benchmark times
+an operation before and after it was optimized, and returns a dict of
+{label: seconds per call} pairs (or {label: bytes} pairs, as ints, for
+the memory used), which run() prints as a table.
+
+"""
+
+__all__ = ["benchmarks", "run"]
+
+import tracemalloc
+import inspect
+import timeit
+import sys
+import gc
+
+from typing import Callable, Dict
+
+from .timestamps import TimestampFormatter
+from .bypassers import BaseBypassers
+from .interpolate import String
+from .debug import get_function
+from .decorators import check_bypass
+from .loggers import TypeLogger
+from .sets import OrderedSet, FrozenSet, register_domain, unregister_domain
+
+benchmarks = {} # type: Dict[str, Callable[..., Dict[str, float]]]
+
+def benchmark(func):
+    """Register a benchmark function under its name (minus 'bench_')."""
+    benchmarks[func.__name__[6:]] = func
+    return func
+
+def measure(func, number, repeat=3):
+    """Return the best time per call of func, in seconds."""
+    return min(timeit.repeat(func, number=number, repeat=repeat)) / number
+
+def footprint(make, args):
+    """Return the memory allocated per call of make(arg), in bytes."""
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        objects = [make(arg) for arg in args]
+        size = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+    del objects
+    return size // len(args)
+
+@benchmark
+def bench_timestamp(number=100000):
+    """Compare rendering a timestamp from scratch to the cached formatter."""
+    formatter = TimestampFormatter("[%Y-%m-%d] (%H:%M:%S {tzoffset})")
+    return {"before": measure(formatter.render, number),
+            "after": measure(formatter, number)}
+
+def _legacy_get_setting(mapping, index):
+    """Find the setting at index by walking the mapping (the old way)."""
+    if index < 0:
+        index += len(mapping)
+    for i, setting in enumerate(mapping):
+        if i == index:
+            return setting
+    raise IndexError("bypasser index out of bounds")
+
+@benchmark
+def bench_bypassers_index(number=1000, size=5000):
+    """Compare positional access on a large bypasser, old and new."""
+    bypasser = BaseBypassers()
+    bypasser.add(*("tenant-{0}".format(i) for i in range(size)))
+    mapping = bypasser.__mapping__
+    middle = size // 2
+    def old_index():
+        return _legacy_get_setting(mapping, middle)
+    def old_slice():
+        return [_legacy_get_setting(mapping, i)
+                for i in range(middle, middle + 10)]
+    return {"index before": measure(old_index, number),
+            "index after": measure(lambda: bypasser[middle], number),
+            "slice before": measure(old_slice, number // 10 or 1),
+            "slice after": measure(lambda: bypasser[middle:middle + 10],
+                                   number)}
+
+@benchmark
+def bench_interpolate(number=100000):
+    """Compare interpolate.String (interpreted and generated) to str.format."""
+    string = "Hello {0}, you have {count:>4} new {kind!r}"
+    template = String(string)
+    mapping = {0: "user", "count": 3, "kind": "messages", None: 1}
+    template.format_map(mapping) # parse and compile it beforehand
+    def formatted():
+        return string.format("user", count=3, kind="messages")
+    def interpreted():
+        return "".join(template._interpret(mapping))
+    short = "Hello {0}"
+    short_template = String(short)
+    return {"str.format": measure(formatted, number),
+            "interpreted": measure(interpreted, number),
+            "generated": measure(lambda: template.format_map(mapping), number),
+            "short format": measure(lambda: short.format("user"), number),
+            "short String": measure(lambda: short_template.format("user"),
+                                    number)}
+
+def _legacy_set_index(oset, index):
+    """Find the item at index by walking the set (the old way)."""
+    for i, item in enumerate(oset):
+        if i == index:
+            return item
+    raise IndexError("set index out of range")
+
+def _legacy_set_find(oset, item):
+    """Find the index of the item by walking the set (the old way)."""
+    for i, value in enumerate(oset):
+        if value == item:
+            return i
+    return -1
+
+@benchmark
+def bench_ordered_set(number=10, sizes=(100000, 1000000)):
+    """Compare positional access on large ordered sets, old and new."""
+    results = {}
+    for size in sizes:
+        oset = OrderedSet(range(size))
+        middle = size // 2
+        oset[middle] # build the index beforehand
+        results["{0:.0e} index before".format(size)] = measure(
+                lambda: _legacy_set_index(oset, middle), number)
+        results["{0:.0e} index after".format(size)] = measure(
+                lambda: oset[middle], number * 1000)
+        results["{0:.0e} find before".format(size)] = measure(
+                lambda: _legacy_set_find(oset, middle), number)
+        results["{0:.0e} find after".format(size)] = measure(
+                lambda: oset.find(middle), number * 1000)
+    return results
+
+@benchmark
+def bench_frozen_set(number=100000):
+    """Compare hashing and membership of frozen sets, old and new."""
+    items = ["debug", "info", "warning", "error"]
+    legacy = dict.fromkeys(items, 1) # what the old sets hashed every time
+    sorted_set = FrozenSet(items)
+    domain = register_domain(["trace"] + items + ["critical"])
+    bits_set = FrozenSet(items)
+    unregister_domain(domain)
+    results = {
+        "hash before": measure(lambda: hash(tuple(legacy.items())), number),
+        "hash after": measure(lambda: hash(bits_set), number),
+        "in dict": measure(lambda: "error" in legacy, number),
+        "in sorted": measure(lambda: "error" in sorted_set, number),
+        "in bits": measure(lambda: "error" in bits_set, number)}
+
+    # memory of distinct sets, after a membership test on each of them
+    names = [items + ["type{0}".format(i)] for i in range(1000)]
+    results["bytes dict"] = footprint(
+            lambda keys: _tested(dict.fromkeys(keys, 1)), names)
+    results["bytes sorted"] = footprint(
+            lambda keys: _tested(FrozenSet(keys)), names)
+    domain = register_domain(["type{0}".format(i) for i in range(10)])
+    masks = [[item for bit, item in enumerate(domain.items) if i >> bit & 1]
+             for i in range(1, 1000)]
+    results["bytes bits"] = footprint(
+            lambda keys: _tested(FrozenSet(keys)), masks)
+    unregister_domain(domain)
+    return results
+
+def _tested(container):
+    """Test the membership of an item in the container, and return it."""
+    "type7" in container
+    return container
+
+def _legacy_all_types(logger):
+    """Find the types written to the 'logall' file (the old way)."""
+    types = set()
+    for values in logger.bypassers["all"]:
+        types.update(values[0])
+    return [x for x in logger.logfiles if x in types]
+
+@benchmark
+def bench_type_bypass(number=10000, size=50):
+    """Compare checking the types bound to a setting, old and new."""
+    logfiles = {"type{0}".format(i): "type{0}.log".format(i)
+                for i in range(size)}
+    logger = TypeLogger(logfiles=logfiles, display=False, write=False)
+    for i in range(0, size, 5):
+        logger.bypassers.update([("all", set(list(logfiles)[i:i + 3]), set(),
+                                  None, "")])
+    plan = check_bypass.get_plan(logger, typed=True)
+    def old_all():
+        return "type7" in _legacy_all_types(logger)
+    return {"all before": measure(old_all, number),
+            "all after": measure(lambda: plan.bound("all", "type7"), number),
+            "compile all": measure(lambda: [plan.compile(t) for t in logfiles],
+                                   number // 100 or 1)}
+
+@benchmark
+def bench_many_bypassers(number=2000, sizes=(50, 500, 2000)):
+    """Time logging repeatedly with many bypassers bound."""
+    results = {}
+    for size in sizes:
+        logger = TypeLogger(logfiles={"normal": "normal.log"}, display=False,
+                            write=False)
+        logger.bypassers.update([("setting{0}".format(i),
+                                  {"type{0}".format(j) for j in range(i % 8)},
+                                  set(), None, "") for i in range(size)])
+        logger.logger("spam") # compile the plan beforehand
+        results["{0} bypassers".format(size)] = measure(
+                lambda: logger.logger("spam"), number)
+    return results
+
+def _legacy_get_function(depth=0):
+    """Find the calling function by scanning its referrers (the old way)."""
+    frame = sys._getframe(depth + 1)
+    code = frame.f_code
+    funcs = [func for func in gc.get_referrers(code)
+             if inspect.isfunction(func) and func.__code__ is code and
+             func.__globals__ is frame.f_globals]
+    if len(funcs) == 1:
+        return funcs[0]
+
+@benchmark
+def bench_get_function(number=100):
+    """Compare finding the calling function, old and new."""
+    def old():
+        return _legacy_get_function()
+    def new():
+        return get_function()
+    new() # the first lookup scans the heap, as the old way does
+    return {"before": measure(old, number),
+            "after": measure(new, number)}
+
+def run(names=None, number=None):
+    """Run the given benchmarks (all by default) and print the results."""
+    for name in names or benchmarks:
+        kwargs = {} if number is None else {"number": number}
+        results = benchmarks[name](**kwargs)
+        print(name)
+        for label, value in results.items():
+            if isinstance(value, int):
+                print("    {0:<16} {1:>12} bytes".format(label, value))
+            else:
+                print("    {0:<16} {1:>12.3f} us/call".format(label,
+                                                            value * 1e6))
+
+if __name__ == "__main__":
+    run(sys.argv[1:])
@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+
+"""Memory-mapped, append-only binary log files.
+
+A binary log is a sequence of segment files, named after the log's path
+with a six-digit suffix ("logger.log.000001", "logger.log.000002", and
+so on). Each segment is preallocated to a fixed size and memory-mapped,
+and records are appended to it until it is full, at which point a new
+segment is started. A segment is truncated to the size of its records
+when it is closed; a segment which wasn't closed properly (e.g. after a
+crash) ends at the first record with a zero length.
+
+Each segment starts with an 8-bytes magic number, followed by records.
+A record is a 16-bytes header, followed by a UTF-8 payload:
+
+    size:       Total size of the record, header included (uint32)
+    time:       Time of the record, in nanoseconds since the epoch (int64)
+    kind:       Interned log type or level of the record (uint16)
+    format:     Interned timestamp format of the record (uint16)
+
+Strings (kinds and formats) are interned as small integers, which are
+declared by special records (with a kind of DECLARE, the integer in the
+time field, and the string as the payload). All the declarations are
+repeated at the start of every segment. A format of RAW means that the
+payload is the complete line, and that no timestamp needs to be added.
+
+The timestamps are only formatted when the log is read back; to_text()
+reproduces the lines exactly as the text files would contain them.
+
+"""
+
+__all__ = ["BinaryLog", "BinaryPool", "BinaryReader", "Entry", "segments",
+           "to_text"]
+
+import collections
+import threading
+import struct
+import mmap
+import re
+import os
+
+from .utilities import pick
+from .io import IOBase, FilePool
+from .timestamps import TimestampFormatter
+
+MAGIC = b"LOGSEG\x00\x01"
+
+DECLARE = RAW = 0xFFFF
+
+_header = struct.Struct("<IqHH")
+
+Entry = collections.namedtuple("Entry", "time kind ts_format use_utc text")
+
+def segments(path):
+    """Return the paths of the segments of the log, in order."""
+    head, tail = os.path.split(path)
+    pattern = re.compile(re.escape(tail) + r"\.(\d{6,})$")
+    found = []
+    for name in os.listdir(head or "."):
+        match = pattern.match(name)
+        if match is not None:
+            found.append((int(match.group(1)), os.path.join(head, name)))
+    return [segment for index, segment in sorted(found)]
+
+class BinaryLog(IOBase):
+    """Append-only binary log, made of memory-mapped segments.
+
+    Records are given to writelines() as (time, kind, format, text)
+    tuples, 'time' being in nanoseconds since the epoch, 'kind' the
+    log type or level as a string, 'format' a (ts_format, use_utc)
+    pair (or None if 'text' already holds the timestamp) and 'text'
+    the line itself, without the trailing newline.
+
+    A new segment is always started when the log is opened, so that
+    opening it never needs to read the existing segments. Records are
+    visible to readers as soon as they are written, since the mapped
+    pages are shared with the operating system; sync() forces them to
+    be written to disk.
+
+    A child process created with fork() leaves the current segment to
+    its parent, and starts a new one when it first writes. Segments
+    which were already created by another process are skipped.
+
+    """
+
+    default_segment_size = 1 << 24
+    default_errors = "surrogateescape"
+
+    def __init__(self, path, errors=None, segment_size=None):
+        """Create a new binary log."""
+        super().__init__()
+        self.path = path
+        self.errors = pick(errors, self.default_errors)
+        self.segment_size = pick(segment_size, self.default_segment_size)
+        self.lock = threading.RLock()
+        self.strings = {}
+        self.ids = {None: RAW} # kinds and formats to their integer
+        self.file = None
+        self.map = None
+        self.offset = 0
+        self.index = None
+
+    def __repr__(self):
+        """Return the representation of the log."""
+        return "<{0} ({1!r}, segment {2})>".format(type(self).__name__,
+                                                  self.path, self.index)
+
+    def _intern(self, string):
+        """Return the integer for the string, declaring it if needed."""
+        number = self.strings.get(string)
+        if number is None:
+            number = len(self.strings)
+            if number >= DECLARE:
+                raise ValueError("too many distinct kinds and formats")
+            self.strings[string] = number
+            self._append(number, DECLARE, 0, string.encode("utf-8", self.errors))
+        return number
+
+    def _append(self, time, kind, format, payload):
+        """Append a record. This is called with the lock held."""
+        size = _header.size + len(payload)
+        if self.map is None or self.offset + size > len(self.map):
+            self._roll(size)
+        _header.pack_into(self.map, self.offset, size, time, kind, format)
+        self.map[self.offset + _header.size:self.offset + size] = payload
+        self.offset += size
+
+    def _roll(self, needed):
+        """Close the current segment and start a new one."""
+        self._release()
+        if self.index is None:
+            found = segments(self.path)
+            self.index = int(found[-1].rpartition(".")[2]) if found else 0
+        self.index += 1
+
+        declarations = [(number, string.encode("utf-8", self.errors))
+                        for string, number in self.strings.items()]
+        size = len(MAGIC) + needed + sum(_header.size + len(payload)
+                                         for number, payload in declarations)
+
+        while True:
+            name = "{0}.{1:06d}".format(self.path, self.index)
+            try:
+                self.file = open(name, "xb+")
+            except FileExistsError: # started by another process
+                self.index += 1
+            else:
+                break
+        self.file.truncate(max(size, self.segment_size))
+        if hasattr(os, "posix_fallocate"):
+            try:
+                os.posix_fallocate(self.file.fileno(), 0, max(size, self.segment_size))
+            except OSError:
+                pass # the file is sparse, but that still works
+        self.map = mmap.mmap(self.file.fileno(), 0)
+        self.map[:len(MAGIC)] = MAGIC
+        self.offset = len(MAGIC)
+        for number, payload in declarations:
+            self._append(number, DECLARE, 0, payload)
+
+    def _release(self):
+        """Unmap the current segment and truncate it to its records."""
+        if self.map is not None:
+            self.map.flush()
+            self.map.close()
+            self.map = None
+        if self.file is not None:
+            self.file.truncate(self.offset)
+            self.file.close()
+            self.file = None
+
+    def writelines(self, entries):
+        """Append an iterable of (time, kind, format, text) entries."""
+        with self.lock:
+            if self.closed:
+                raise ValueError("I/O operation on closed binary log")
+            ids = self.ids
+            errors = self.errors
+            pack = _header.pack
+            chunk = bytearray() # the records are copied to the map at once
+            for time, kind, format, text in entries:
+                payload = text.encode("utf-8", errors)
+                size = _header.size + len(payload)
+                try:
+                    numbers = ids[kind], ids[format]
+                except KeyError:
+                    self._store(chunk)
+                    chunk.clear()
+                    numbers = self._declare(kind, format)
+                chunk += pack(size, time, *numbers)
+                chunk += payload
+            self._store(chunk)
+
+    def _store(self, chunk):
+        """Append already packed records. This is called with the lock held."""
+        offset = self.offset
+        if self.map is None or offset + len(chunk) > len(self.map):
+            if not chunk:
+                return
+            size = _header.unpack_from(chunk)[0]
+            if size < len(chunk) > self.segment_size - len(MAGIC):
+                # too many records for one segment; store them one by one
+                start = 0
+                while start < len(chunk):
+                    size = _header.unpack_from(chunk, start)[0]
+                    self._store(chunk[start:start + size])
+                    start += size
+                return
+            self._roll(len(chunk))
+            offset = self.offset
+        self.map[offset:offset + len(chunk)] = chunk
+        self.offset = offset + len(chunk)
+
+    def _declare(self, kind, format):
+        """Return the integers for the kind and format, declaring them."""
+        ids = self.ids
+        if kind not in ids:
+            ids[kind] = self._intern(kind)
+        if format not in ids:
+            ts_format, use_utc = format
+            ids[format] = self._intern(("U" if use_utc else "L") + ts_format)
+        return ids[kind], ids[format]
+
+    def after_fork(self):
+        """Leave the current segment to the parent process."""
+        self.lock = threading.RLock()
+        if self.map is not None:
+            self.map.close() # only unmapped in this process
+            self.map = None
+        if self.file is not None:
+            self.file.close() # not truncated, as the parent still writes
+            self.file = None
+        self.offset = 0
+
+    def sync(self):
+        """Write the records of the current segment to disk."""
+        with self.lock:
+            if self.map is not None:
+                self.map.flush()
+
+    def close(self):
+        """Close the current segment."""
+        with self.lock:
+            self._release()
+            super().close()
+
+class BinaryPool(FilePool):
+    """Pool of binary logs, to be used in place of a FilePool.
+
+    This has the same interface as the FilePool, but the files are
+    binary logs, and the lines given to write() are binary entries (see
+    BinaryLog.writelines() for their format). 'encoding' is ignored, as
+    the payloads are always encoded in UTF-8.
+
+    """
+
+    default_segment_size = BinaryLog.default_segment_size
+
+    def __init__(self, max_files=None, autoflush=None, segment_size=None):
+        """Create a new binary logs pool."""
+        super().__init__(max_files, autoflush)
+        self.segment_size = pick(segment_size, self.default_segment_size)
+
+    def _handle(self, file, encoding, errors):
+        """Return a new binary log for the file."""
+        return BinaryLog(file, errors, self.segment_size)
+
+class BinaryReader:
+    """Read the records of a binary log, in order.
+
+    Iterating over the reader yields an Entry for each record, with the
+    time (in nanoseconds), the kind, the timestamp format and whether it
+    is in UTC (the format being None if the text is the complete line),
+    and the text. The segments are read when iterating, so records
+    appended in the meantime are seen by the next iteration.
+
+    """
+
+    default_errors = "surrogateescape"
+
+    def __init__(self, path, errors=None):
+        """Create a new reader for the binary log."""
+        self.path = path
+        self.errors = pick(errors, self.default_errors)
+
+    def __repr__(self):
+        """Return the representation of the reader."""
+        return "{0}({1!r})".format(type(self).__name__, self.path)
+
+    def __iter__(self):
+        """Yield the entries of the log."""
+        strings = {}
+        errors = self.errors
+        for segment in segments(self.path):
+            with open(segment, "rb") as file:
+                size = os.fstat(file.fileno()).st_size
+                if size < len(MAGIC):
+                    continue # never written to
+                with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as map:
+                    if map[:len(MAGIC)] != MAGIC:
+                        raise ValueError("{0!r} is not a log segment".format(segment))
+                    offset = len(MAGIC)
+                    while offset + _header.size <= size:
+                        length, time, kind, format = _header.unpack_from(map, offset)
+                        if length < _header.size or offset + length > size:
+                            break # end of the records
+                        text = map[offset + _header.size:offset + length].decode(
+                               "utf-8", errors)
+                        offset += length
+                        if kind == DECLARE:
+                            strings[time] = text
+                        elif format == RAW:
+                            yield Entry(time, strings[kind], None, False, text)
+                        else:
+                            format = strings[format]
+                            yield Entry(time, strings[kind], format[1:],
+                                        format[0] == "U", text)
+
+    def iter_text(self):
+        """Yield the lines of the log, as the text files would hold them."""
+        formatters = {}
+        for time, kind, ts_format, use_utc, text in self:
+            if ts_format is None:
+                yield text + "\n"
+                continue
+            formatter = formatters.get((ts_format, use_utc))
+            if formatter is None:
+                formatter = TimestampFormatter(ts_format, use_utc)
+                formatters[ts_format, use_utc] = formatter
+            # microseconds keep the float exact enough to never round up
+            yield formatter.at(time // 1000 / 1e6) + text + "\n"
+
+    def to_text(self, file=None, encoding=None):
+        """Return the text of the log, or write it to 'file' if given."""
+        if file is None:
+            return "".join(self.iter_text())
+        with open(file, "w", encoding=encoding, errors=self.errors) as f:
+            f.writelines(self.iter_text())
+
+def to_text(path, file=None, encoding=None, errors=None):
+    """Return the text of the binary log, or write it to 'file' if given."""
+    return BinaryReader(path, errors).to_text(file, encoding)
@@ -7,18 +7,279 @@ See Bypassers.__doc__ on how to use these properly.
 
 """
 
-__all__ = [] # Bypassers defined in this module get automatically added here
+__all__ = ["TrackedSet"] # Bypassers defined in this module get automatically added here
 
 import collections
 import functools
 import weakref
 import copy
 
-from typing import Dict, Set, Tuple, Any
+from typing import Dict, List, Optional, Set, Tuple, Any
 
-from .decorators import Property, ClassProperty
+from .decorators import ClassProperty
 from .types import NoValue
 
+def _freeze(item):
+    """Return a hashable equivalent of a view item (sets are frozen)."""
+    if isinstance(item, tuple):
+        return tuple(frozenset(x) if isinstance(x, set) else x for x in item)
+    return item
+
+class ViewIndex:
+    """Hash index of the items of a view over a BypassersMapping.
+
+    This counts every item that iterating over the view would yield,
+    so that membership and length are O(1). Since the bound values are
+    commonly sets (which are unhashable), items are indexed with their
+    sets converted to frozensets; as sets and frozensets compare equal,
+    this doesn't change the result of any comparison. Items that still
+    can't be hashed are kept in a list and searched linearly.
+
+    The index of the keys view (position 0 alone) is the mapping itself,
+    and is not handled here.
+
+    """
+
+    __slots__ = ("position", "counts", "unhashable", "length")
+
+    def __init__(self, position, mapping):
+        """Build the index from the current content of the mapping."""
+        self.position = position
+        self.counts = collections.Counter() # type: Dict[Any, int]
+        self.unhashable = [] # type: List[Any]
+        self.length = 0
+        for key, bound in mapping.items():
+            for values in bound:
+                self.add(key, values)
+
+    def add(self, key, values):
+        """Add the item made out of the setting and its values."""
+        all_values = (key, *values)
+        item = tuple([all_values[i] for i in self.position])
+        try:
+            self.counts[_freeze(item)] += 1
+        except TypeError:
+            self.unhashable.append(item)
+        self.length += 1
+
+    def __contains__(self, item):
+        """Return True if item is in the view, False otherwise."""
+        try:
+            if _freeze(item) in self.counts:
+                return True
+        except TypeError:
+            pass
+        return item in self.unhashable
+
+class TrackedSet(set):
+    """Set which marks the bypassers it is bound to as modified.
+
+    This is the type of the sets that the bypassers create (such as the
+    default 'types' and 'pairs' of a new setting). Any in-place change
+    bumps the version of the mappings the set is bound in, so that the
+    compiled views of the bypassers are rebuilt, as if touch() had been
+    called. Copies of the set are not bound to anything.
+
+    """
+
+    __slots__ = ("_owners",)
+
+    def __init__(self, iterable=()):
+        """Create a new tracked set."""
+        super().__init__(iterable)
+        self._owners = [] # type: List[weakref.ref]
+
+    def __reduce__(self):
+        """Return the data needed to copy or pickle the set."""
+        return type(self), (list(self),)
+
+    def _bind(self, mapping):
+        """Report the changes of the set to the mapping (held weakly)."""
+        owners = [ref for ref in self._owners if ref() is not None]
+        if not any(ref() is mapping for ref in owners):
+            owners.append(weakref.ref(mapping))
+        self._owners = owners
+
+    def _changed(self):
+        """Mark the mappings the set is bound in as modified."""
+        for ref in self._owners:
+            owner = ref()
+            if owner is not None:
+                owner._modified()
+
+def _tracked(name):
+    """Return a method of set which calls _changed() afterwards."""
+    method = getattr(set, name)
+    @functools.wraps(method)
+    def wrapper(self, *args):
+        result = method(self, *args)
+        self._changed()
+        return result
+    return wrapper
+
+for _name in ("add", "discard", "remove", "pop", "clear", "update",
+              "intersection_update", "difference_update",
+              "symmetric_difference_update", "__ior__", "__iand__",
+              "__isub__", "__ixor__"):
+    setattr(TrackedSet, _name, _tracked(_name))
+del _name
+
+class BypassersMapping(collections.OrderedDict):
+    """Underlying mapping of the Bypassers, with a modification counter.
+
+    The 'version' attribute is incremented every time the mapping is
+    modified, which allows compiled views of the bypassers (such as the
+    evaluation plans of the loggers) to know when they're outdated. The
+    lists of values are modified through the append() method, which
+    increments the counter as well.
+
+    The view objects of the bypassers use hash indexes of their items
+    (see ViewIndex), which the mapping keeps here. append() adds to the
+    existing indexes, while other modifications drop them (they will be
+    rebuilt the next time a view needs them).
+
+    The sets bound to the settings may be modified in-place, which
+    doesn't go through the mapping. TrackedSet instances tell the
+    mappings they are bound in about it; other sets need touch().
+
+    The mapping also keeps a list of its settings in order, which makes
+    positional access (key_at() and key_slice()) O(1) instead of having
+    to walk the mapping. New settings are appended to the list as they
+    are inserted; removing or moving a setting other than the last one
+    discards the list, which is then rebuilt on the next positional
+    access. The delete_at() method removes a setting by position while
+    keeping the list.
+
+    """
+
+    def __init__(*args, **kwargs):
+        """Create a new mapping."""
+        if not args:
+            raise TypeError("BypassersMapping.__init__ needs an argument")
+        self, *args = args
+        self.version = 0
+        self._keys = [] # type: Optional[List[Any]]
+        self._indexes = {} # type: Dict[Tuple[int, ...], ViewIndex]
+        super(BypassersMapping, self).__init__(*args, **kwargs)
+
+    def __setitem__(self, key, value):
+        """Set the values of a setting."""
+        new = key not in self
+        super().__setitem__(key, value)
+        for values in value:
+            self._track(values)
+        if new and self._keys is not None:
+            self._keys.append(key)
+        self._modified()
+
+    def __delitem__(self, key):
+        """Remove a setting."""
+        super().__delitem__(key)
+        self._discard(key)
+        self._modified()
+
+    def _modified(self):
+        """Bump the version and drop the view indexes."""
+        self._indexes.clear()
+        self.version += 1
+
+    def _track(self, values):
+        """Have the TrackedSet instances in values report to the mapping."""
+        for value in values:
+            if isinstance(value, TrackedSet):
+                value._bind(self)
+
+    def _discard(self, key):
+        """Remove key from the positional index, or drop the index."""
+        keys = self._keys
+        if keys is not None:
+            if keys and keys[-1] == key:
+                keys.pop()
+            else:
+                self._keys = None
+
+    def _key_list(self):
+        """Return the list of settings, rebuilding it if needed."""
+        keys = self._keys
+        if keys is None:
+            keys = self._keys = list(self)
+        return keys
+
+    def key_at(self, index):
+        """Return the setting at the given position."""
+        return self._key_list()[index]
+
+    def key_slice(self, index):
+        """Return a list of the settings within the slice."""
+        return self._key_list()[index]
+
+    def delete_at(self, index):
+        """Remove the setting at the given position."""
+        keys = self._key_list()
+        key = keys[index]
+        super().__delitem__(key)
+        del keys[index]
+        self._modified()
+        return key
+
+    def append(self, key, values):
+        """Bind a new tuple of values to the setting."""
+        if key not in self:
+            super().__setitem__(key, [])
+            if self._keys is not None:
+                self._keys.append(key)
+        self[key].append(values)
+        self._track(values)
+        for index in self._indexes.values():
+            index.add(key, values)
+        self.version += 1
+
+    def view_index(self, position):
+        """Return the index of the view over the given positions."""
+        index = self._indexes.get(position)
+        if index is None:
+            index = self._indexes[position] = ViewIndex(position, self)
+        return index
+
+    def touch(self):
+        """Mark the mapping as modified."""
+        self._modified()
+
+    def pop(self, key, *args):
+        """Remove a setting and return its values."""
+        if key not in self:
+            return super().pop(key, *args)
+        value = super().pop(key)
+        self._discard(key)
+        self._modified()
+        return value
+
+    def popitem(self, last=True):
+        """Remove and return a (setting, values) pair."""
+        key, values = super().popitem(last)
+        if last:
+            self._discard(key)
+        else:
+            self._keys = None
+        self._modified()
+        return key, values
+
+    def move_to_end(self, key, last=True):
+        """Move a setting to either end of the mapping."""
+        super().move_to_end(key, last)
+        self._keys = None
+        self.version += 1 # the view indexes don't depend on the order
+
+    def clear(self):
+        """Remove all the settings."""
+        super().clear()
+        self._keys = []
+        self._modified()
+
+    def __reduce__(self):
+        """Return the data needed to copy or pickle the mapping."""
+        return type(self), (list(self.items()),)
+
 class PartialView(functools.partial):
     """Thin subclass of functools.partial for view objects.
 
@@ -60,17 +321,23 @@ class Viewer:
         return "{0}{1}([{2}])".format(self.name, self.value.capitalize(),
                                       ", ".join(repr(x) for x in self))
 
+    def _index(self):
+        """Return the hash index of self (the mapping for keys views)."""
+        mapping = self.instance.__mapping__
+        if self.position == (0,):
+            return mapping
+        return mapping.view_index(self.position)
+
     def __contains__(self, item):
         """Return True if item is in self, False otherwise."""
-        for value in self:
-            if value == item:
-                return True
-
-        return False
+        return item in self._index()
 
     def __len__(self):
         """Return the length of self."""
-        return sum(1 for i in self)
+        index = self._index()
+        if isinstance(index, ViewIndex):
+            return index.length
+        return len(index)
 
     def __iter__(self, factory=iter):
         """Return a modular iterator over the items in the instance."""
@@ -111,29 +378,35 @@ class Viewer:
         except TypeError:
             return NotImplemented
 
-        return new == tuple(self)
+        return len(new) == len(self) and new == tuple(self)
 
     def __ne__(self, other):
         """Return True if self != other, False otherwise."""
-        try:
-            new = tuple(other)
-        except TypeError:
+        value = self.__eq__(other)
+        if value is NotImplemented:
             return NotImplemented
 
-        return new != tuple(self)
+        return not value
+
+    @staticmethod
+    def _as_set(other):
+        """Return other as a set-like object (with fast 'in' and len)."""
+        if isinstance(other, (set, frozenset, Viewer)):
+            return other
+        return set(other)
 
     def __le__(self, other):
         """Return True if self <= other, False otherwise."""
         if 0 not in self.position:
             return NotImplemented
 
-        new = set(self)
-
         try:
-            return new.issubset(other)
+            other = self._as_set(other)
         except TypeError:
             return NotImplemented
 
+        return all(item in other for item in self)
+
     def __lt__(self, other):
         """Return True if self < other, False otherwise."""
         value = self.__le__(other)
@@ -147,13 +420,13 @@ class Viewer:
         if 0 not in self.position:
             return NotImplemented
 
-        new = set(self)
-
         try:
-            return new.issuperset(other)
+            other = self._as_set(other)
         except TypeError:
             return NotImplemented
 
+        return all(item in self for item in other)
+
     def __gt__(self, other):
         """Return True if self > other, False otherwise."""
         value = self.__ge__(other)
@@ -167,14 +440,12 @@ class Viewer:
         if 0 not in self.position:
             return NotImplemented
 
-        new = set(self)
-
         try:
-            new.difference_update(other)
+            other = self._as_set(other)
         except TypeError:
             return NotImplemented
 
-        return new
+        return {item for item in self if item not in other}
 
     def __rsub__(self, other):
         """Return a set with items in other but not in self."""
@@ -182,12 +453,11 @@ class Viewer:
             return NotImplemented
 
         try:
-            new = set(other)
+            other = self._as_set(other)
         except TypeError:
             return NotImplemented
 
-        new.difference_update(self)
-        return new
+        return {item for item in other if item not in self}
 
     def __and__(self, other):
         """Return a set with items that are both in self and other."""
@@ -195,12 +465,13 @@ class Viewer:
             return NotImplemented
 
         try:
-            new = set(other)
+            other = self._as_set(other)
         except TypeError:
             return NotImplemented
 
-        new.intersection_update(self)
-        return new
+        if len(other) <= len(self): # iterate over the smaller one
+            return {item for item in other if item in self}
+        return {item for item in self if item in other}
 
     __rand__ = __and__
 
@@ -225,11 +496,12 @@ class Viewer:
             return NotImplemented
 
         try:
-            new = set(other)
+            other = self._as_set(other)
         except TypeError:
             return NotImplemented
 
-        new.symmetric_difference_update(self)
+        new = {item for item in other if item not in self}
+        new.update(item for item in self if item not in other)
         return new
 
     __rxor__ = __xor__
@@ -240,11 +512,13 @@ class Viewer:
             return NotImplemented
 
         try:
-            new = set(other)
+            other = self._as_set(other)
         except TypeError:
             return NotImplemented
 
-        return new.isdisjoint(self)
+        if len(other) <= len(self):
+            return not any(item in self for item in other)
+        return not any(item in other for item in self)
 
 class Stable(type):
     """Metaclass to handle stable view objects."""
@@ -392,11 +666,7 @@ class Subscript:
                         raise ValueError("reversed() with non-negative step is unsupported")
 
                     for position in range(start, stop, step):
-                        try:
-                            key = inst._get_setting(position)
-                        except IndexError:
-                            continue
-
+                        key = mapping.key_at(position)
                         if key not in done:
                             yield from factory(mapping[key])
                             done.add(key)
@@ -451,7 +721,6 @@ class BypassersMeta(type):
     def __new__(meta, name, bases, namespace):
         """Create a new Bypassers class."""
         if name == "Bypassers" and namespace["__module__"] == __name__:
-            del namespace["_mapping_cache"]
             meta.allowed[name] = set(namespace) - {"__names__", "__views__"}
             return super().__new__(meta, name, bases, namespace)
 
@@ -527,6 +796,13 @@ class Bypassers(metaclass=BypassersMeta):
     occupy space). This can be remedied by iterating over the items,
     re-assigning, or deleting (from the index) such attribute.
 
+    The loggers compile the bypassers into an evaluation plan, which is
+    rebuilt whenever the bypasser is modified. The sets bound to the
+    settings (such as 'types' and 'pairs') can also be modified in-place.
+    TrackedSet instances, which the bypassers use for the sets they
+    create, notify the bypasser of it; for any other set, the bypasser
+    needs to be told about it by calling `bypasser.touch()` afterwards.
+
     From this point on, `bypasser` will refer to an instance of any
     Bypassers class (a subclass of the present class). It is assumed
     that it was constructed properly. Each method and operation is
@@ -544,27 +820,15 @@ class Bypassers(metaclass=BypassersMeta):
 
     """
 
-    # the metaclass automatically removes this from the namespace when
-    # the class is done initializing (kept in __mapping__/__del__)
-    _mapping_cache = {} # type: Dict[int, collections.OrderedDict]
-    # special-case a None instance to return None
-    _mapping_cache[id(None)] = None # type: ignore
+    # '__mapping__' is the underlying BypassersMapping (an OrderedDict
+    # subclass); it is created by __new__, which subclasses may not
+    # override, so it is always present; subclasses get a __dict__ as
+    # usual, unless they declare '__slots__' themselves
+    __slots__ = ("__mapping__", "__weakref__")
 
     __names__ = (("", None),) # type: Tuple[Tuple[str, Any]]
     __views__ = (("", (0,)),) # type: Tuple[Tuple[str, Tuple[int]]]
 
-    @Property
-    def __mapping__(self, cache=_mapping_cache):
-        """Underlying OrderedDict mapping."""
-        # we're keeping the id of self because:
-        # 1) Bypassers instances are not hashable;
-        # 2) we want to clear the cache when it's garbage-collected;
-        # 3) we don't want to keep a weakref and handle callbacks.
-        id_self = id(self)
-        if id_self not in cache:
-            cache[id_self] = collections.OrderedDict()
-        return cache[id_self]
-
     @ClassProperty
     def __item_length__(cls, cache=weakref.WeakKeyDictionary()):
         """Return the length of the items in self."""
@@ -601,17 +865,15 @@ class Bypassers(metaclass=BypassersMeta):
         if cls.__name__ in type(cls).allowed:
             raise TypeError("cannot instantiate the {!r} class".format(cls.__name__))
 
-        return super(Bypassers, cls).__new__(cls)
+        self = super(Bypassers, cls).__new__(cls)
+        self.__mapping__ = BypassersMapping()
+        return self
 
     def __init__(self, names=None):
         """Initialize the instance."""
         if names is not None:
             self.update(names)
 
-    def __del__(self, cache=_mapping_cache):
-        """Remove the mapping from the cache."""
-        cache.pop(id(self), None)
-
     class __keys__(metaclass=Stable):
         """Stable 'keys' view object of Bypassers instances."""
 
@@ -646,13 +908,8 @@ class Bypassers(metaclass=BypassersMeta):
             new = type(self)()
             new_mapping = new.__mapping__
             mapping = self.__mapping__
-            for position in range(*item.indices(len(mapping))):
-                try:
-                    key = self._get_setting(position)
-                except IndexError:
-                    continue
-                else:
-                    new_mapping[key] = mapping[key]
+            for key in mapping.key_slice(item):
+                new_mapping[key] = mapping[key]
             return new
 
         elif isinstance(item, (str, bytes, tuple)) or item is Ellipsis:
@@ -667,13 +924,9 @@ class Bypassers(metaclass=BypassersMeta):
             del mapping[item]
 
         elif hasattr(item, "__index__"):
-            if item < 0:
-                item += len(mapping)
-            if 0 <= item < len(mapping):
-                for i, setting in enumerate(mapping):
-                    if i == item:
-                        del mapping[setting]
-                        break
+            item = int(item)
+            if -len(mapping) <= item < len(mapping):
+                mapping.delete_at(item)
 
             else:
                 raise IndexError("bypasser index out of bounds")
@@ -694,20 +947,13 @@ class Bypassers(metaclass=BypassersMeta):
                             pass
 
                     elif isinstance(setting, slice):
-                        for position in range(*setting.indices(len(mapping))):
-                            try:
-                                to_remove.add(self._get_setting(position))
-                            except IndexError:
-                                pass
+                        to_remove.update(mapping.key_slice(setting))
 
                 for setting in to_remove:
                     del mapping[setting]
 
         elif isinstance(item, slice):
-            to_remove = set()
-            for position in range(*item.indices(len(mapping))):
-                to_remove.add(self._get_setting(position))
-            for setting in to_remove:
+            for setting in mapping.key_slice(item):
                 del mapping[setting]
 
         elif item is Ellipsis:
@@ -731,7 +977,9 @@ class Bypassers(metaclass=BypassersMeta):
     def __copy__(self):
         """Return a shallow copy of self."""
         new = type(self)()
-        new.__mapping__.update(self.__mapping__)
+        new_mapping = new.__mapping__
+        for key, values in self.__mapping__.items():
+            new_mapping[key] = list(values) # don't share the lists
         return new
 
     def __deepcopy__(self, memo):
@@ -745,16 +993,10 @@ class Bypassers(metaclass=BypassersMeta):
     def _get_setting(self, index):
         """Get the item at index given."""
         assert hasattr(index, "__index__")
-        mapping = self.__mapping__
-        index = int(index)
-        if index < 0:
-            index += len(mapping)
-        if 0 <= index < len(mapping):
-            for i, setting in enumerate(mapping):
-                if i == index:
-                    return setting
-
-        raise IndexError("bypasser index out of bounds")
+        try:
+            return self.__mapping__.key_at(int(index))
+        except IndexError:
+            raise IndexError("bypasser index out of bounds") from None
 
     def _update_from_list_or_tuple(self, list_or_tuple):
         """Update the bypasser with list or tuple."""
@@ -767,9 +1009,7 @@ class Bypassers(metaclass=BypassersMeta):
             if not isinstance(setting, (str, bytes)):
                 raise TypeError("setting must be str or bytes")
 
-            if setting not in mapping:
-                mapping[setting] = []
-            mapping[setting].append(tuple(list_or_tuple[1:]))
+            mapping.append(setting, tuple(list_or_tuple[1:]))
 
         elif length > item_length:
             raise ValueError("too many items in list or tuple (expected "
@@ -832,9 +1072,7 @@ class Bypassers(metaclass=BypassersMeta):
             raise ValueError("too many items in iterable (expected "
                              "{0})".format(self.__item_length__))
 
-        if setting not in mapping:
-            mapping[setting] = []
-        mapping[setting].append(tuple(data))
+        mapping.append(setting, tuple(data))
 
     @staticmethod
     def _prevent_wrong_input(data):
@@ -892,10 +1130,8 @@ class Bypassers(metaclass=BypassersMeta):
             if isinstance(name, Bypassers):
                 if name.__item_length__ == self.__item_length__:
                     for key in name:
-                        if key not in mapping:
-                            mapping[key] = []
                         for values in name.__mapping__[key]:
-                            mapping[key].append(values)
+                            mapping.append(key, values)
                 else:
                     raise ValueError("Bypassers instance with unmatching length")
 
@@ -921,9 +1157,7 @@ class Bypassers(metaclass=BypassersMeta):
                     else:
                         data.append(default)
 
-                if name not in mapping:
-                    mapping[name] = []
-                mapping[name].append(tuple(data))
+                mapping.append(name, tuple(data))
 
             else:
                 raise TypeError("Bypassers settings can only be str or bytes")
@@ -949,6 +1183,15 @@ class Bypassers(metaclass=BypassersMeta):
         """Remove all items from the Bypasser."""
         self.__mapping__.clear()
 
+    def touch(self):
+        """Notify the bypasser that its values were modified in-place.
+
+        This is not needed for TrackedSet instances (see the class
+        docstring).
+
+        """
+        self.__mapping__.touch()
+
     def to_dict(self, *, deep=False, ordered=True):
         """Return a dict (or OrderedDict) of self."""
         new = self.copy(deep=deep)
@@ -986,11 +1229,13 @@ class Bypassers(metaclass=BypassersMeta):
 class BaseBypassers(Bypassers):
     """Base Bypassers class."""
 
+    __slots__ = ()
+
     __names__ = (
-                 ("setting",    NoValue),
-                 ("pairs",      set    ),
-                 ("module",     None   ),
-                 ("attr",       str    ),
+                 ("setting",    NoValue   ),
+                 ("pairs",      TrackedSet),
+                 ("module",     None      ),
+                 ("attr",       str       ),
                 )
 
     __views__ = (
@@ -1001,6 +1246,28 @@ class BaseBypassers(Bypassers):
                  ("items",       (0, 1, 2, 3)),
                 )
 
+class TypeBypassers(Bypassers):
+    """Bypassers class for the type-based loggers."""
+
+    __slots__ = ()
+
+    __names__ = (
+                 ("setting",    NoValue   ),
+                 ("types",      TrackedSet),
+                 ("pairs",      TrackedSet),
+                 ("module",     None      ),
+                 ("attr",       str       ),
+                )
+
+    __views__ = (
+                 ("keys",        (0,)           ),
+                 ("types",       (1,)           ),
+                 ("pairs",       (2,)           ),
+                 ("attributes",  (3, 4)         ),
+                 ("values",      (1, 2, 3, 4)   ),
+                 ("items",       (0, 1, 2, 3, 4)),
+                )
+
 class NumberMethods:
     """Dummy class for number methods."""
 
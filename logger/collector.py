@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+
+"""Collect the output of many processes into a single writer process.
+
+When many processes log to the same files, each of them opening and
+appending to the files on its own, lines from different processes can
+interleave and their writes compete for the files. A Collector instead
+runs one writer process, which owns every file handle; the loggers of
+the other processes send it their lines, through their own connection.
+
+Create the collector (and start it) before forking the workers, then
+give it to the loggers through their 'collector' parameter:
+
+    collector = Collector()
+    collector.start()
+    ... fork the workers, which each create their loggers ...
+    logger = TypeLogger(collector=collector)
+
+Each process connects to the collector the first time it writes, and
+sends each batch of lines as a single message, so lines are never torn
+or lost, and lines from the same process keep their order.
+
+"""
+
+__all__ = ["Collector", "CollectorClient"]
+
+import multiprocessing.connection
+import multiprocessing
+import threading
+import os
+
+from .utilities import pick
+from .io import IOBase, FilePool, _open_objects
+from .binary import BinaryPool
+
+_poll_interval = 0.1 # how often the idle clients check for the stop
+
+def _serve(conn, authkey, max_files, autoflush, rotation, binary, segment_size):
+    """Run the collector. This is the target of the writer process."""
+    if binary:
+        pool = BinaryPool(max_files, autoflush, segment_size)
+    else:
+        pool = FilePool(max_files, autoflush, rotation)
+
+    listener = multiprocessing.connection.Listener(authkey=authkey)
+    conn.send(listener.address)
+    conn.close()
+
+    stopping = threading.Event()
+    receivers = []
+
+    def receive(client):
+        """Write the batches sent by a single client, until stopping."""
+        with client:
+            while True:
+                try:
+                    if stopping.is_set():
+                        if not client.poll():
+                            return # everything it sent is written
+                    elif not client.poll(_poll_interval):
+                        continue
+                    message = client.recv()
+                except (EOFError, OSError):
+                    return
+                if message == "flush":
+                    pool.flush()
+                    client.send(True)
+                elif message == "stop":
+                    stopping.set()
+                    pool.flush()
+                    client.send(True)
+                    # wake up the main thread, which is waiting for clients
+                    multiprocessing.connection.Client(listener.address,
+                                                      authkey=authkey).close()
+                    return
+                else:
+                    for file, lines, encoding, errors in message:
+                        pool.write(file, lines, encoding, errors)
+
+    with listener:
+        while not stopping.is_set():
+            try:
+                client = listener.accept()
+            except (multiprocessing.AuthenticationError, OSError):
+                continue
+            receiver = threading.Thread(target=receive, args=(client,),
+                                        daemon=True)
+            receiver.start()
+            receivers[:] = [thread for thread in receivers if thread.is_alive()]
+            receivers.append(receiver)
+
+    # the other clients may still have batches sent before the stop
+    for receiver in receivers:
+        receiver.join()
+    pool.close()
+
+class Collector:
+    """Writer process, owning the files written by many processes.
+
+    The options are passed to the pool of files of the writer process:
+
+    'max_files', 'autoflush':
+                    See io.FilePool. Default to 16 and True.
+
+    'rotation':     An io.Rotation instance, to rotate the files (see
+                    the loggers' rotation parameters). Default to None.
+
+    'binary', 'segment_size':
+                    If 'binary' is True, the files are binary logs (see
+                    the 'binary' submodule) with the given segment size.
+                    The loggers using the collector then produce binary
+                    entries. Default to False and 16777216.
+
+    'batch_size':   Number of lines the processes keep before sending
+                    them to the collector, for loggers which don't
+                    flush after every write. Default to 1000.
+
+    The collector is stopped by close(), or when used as a context
+    manager; the lines sent until then are all written.
+
+    """
+
+    default_max_files = 16
+    default_autoflush = True
+    default_binary = False
+    default_segment_size = 1 << 24
+    default_batch_size = 1000
+
+    def __init__(self, max_files=None, autoflush=None, rotation=None,
+                 binary=None, segment_size=None, batch_size=None,
+                 context=None):
+        """Create a new collector. Call start() to start it."""
+        self.max_files = pick(max_files, self.default_max_files)
+        self.autoflush = pick(autoflush, self.default_autoflush)
+        self.rotation = rotation
+        self.binary = pick(binary, self.default_binary)
+        self.segment_size = pick(segment_size, self.default_segment_size)
+        self.batch_size = pick(batch_size, self.default_batch_size)
+        self.context = pick(context, multiprocessing.get_context())
+        self.authkey = os.urandom(32)
+        self.address = None
+        self.process = None
+
+    def __repr__(self):
+        """Return the representation of the collector."""
+        return "<{0} ({1!r})>".format(type(self).__name__, self.address)
+
+    def __enter__(self):
+        """Start the collector, and return it."""
+        if self.process is None:
+            self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """Stop the collector."""
+        self.close()
+
+    def start(self):
+        """Start the writer process, and wait until it is ready."""
+        if self.process is not None:
+            raise RuntimeError("the collector is already started")
+        receiver, sender = self.context.Pipe(duplex=False)
+        self.process = self.context.Process(target=_serve, daemon=True,
+                       name="{0}-{1}".format(type(self).__name__, id(self)),
+                       args=(sender, self.authkey, self.max_files,
+                             self.autoflush, self.rotation, self.binary,
+                             self.segment_size))
+        self.process.start()
+        sender.close()
+        with receiver:
+            self.address = receiver.recv()
+
+    def client(self, autoflush=None):
+        """Return a new client, for the current process."""
+        if self.address is None:
+            raise RuntimeError("the collector is not started")
+        return CollectorClient(self.address, self.authkey,
+                               pick(autoflush, self.autoflush),
+                               self.batch_size)
+
+    def close(self):
+        """Write everything that was sent, then stop the writer process."""
+        if self.process is None:
+            return
+        with multiprocessing.connection.Client(self.address,
+                                               authkey=self.authkey) as conn:
+            conn.send("stop")
+            conn.recv()
+        self.process.join()
+        self.process = None
+        self.address = None
+
+class CollectorClient(IOBase):
+    """Send lines to a collector, in place of a FilePool.
+
+    This has the same write(), flush(), release() and close() methods
+    as the FilePool. If 'autoflush' is True, the lines given to each
+    write() are sent right away; otherwise, they are kept until there
+    are 'batch_size' of them, or until flush() or close() is called.
+    flush() waits until the collector has written the lines it was
+    sent. Pending lines are also sent before forking, and at exit.
+
+    Each process uses its own connection, which is opened on the first
+    write, so the client can be created before forking.
+
+    """
+
+    def __init__(self, address, authkey, autoflush=True, batch_size=1000):
+        """Create a new client for the collector at 'address'."""
+        super().__init__()
+        self.address = address
+        self.authkey = authkey
+        self.autoflush = autoflush
+        self.batch_size = batch_size
+        self.rotation = None # the collector rotates the files
+        self.lock = threading.RLock()
+        self.pending = []
+        self.count = 0
+        self.conn = None
+        self.pid = os.getpid()
+
+    def __repr__(self):
+        """Return the representation of the client."""
+        return "<{0} ({1!r}, {2} pending)>".format(type(self).__name__,
+                                                   self.address, self.count)
+
+    def __len__(self):
+        """Return the number of pending lines."""
+        return self.count
+
+    def after_fork(self):
+        """Drop what was inherited from the parent process.
+
+        The pending lines were sent by the parent before forking, the
+        connection belongs to the parent, and the lock may have been held
+        by one of its threads.
+
+        """
+        self.pid = os.getpid()
+        self.lock = threading.RLock()
+        self.pending = []
+        self.count = 0
+        self.conn = None
+
+    def _forked(self):
+        """Call after_fork() if it wasn't called in this process yet.
+
+        This covers clients which were closed (and thus not reset) when
+        the process forked. This is called before taking the lock.
+
+        """
+        if self.pid != os.getpid():
+            self.after_fork()
+
+    def _connection(self):
+        """Return the connection of this process. Call with the lock held."""
+        if self.conn is None:
+            self.conn = multiprocessing.connection.Client(self.address,
+                                                          authkey=self.authkey)
+            if self.closed:
+                self.closed = False
+                _open_objects.add(self)
+        return self.conn
+
+    def write(self, file, lines, encoding=None, errors=None):
+        """Send the lines to be written to the file."""
+        lines = list(lines)
+        self._forked()
+        with self.lock:
+            self.pending.append((file, lines, encoding, errors))
+            self.count += len(lines)
+            if self.autoflush or self.count >= self.batch_size:
+                self._send()
+
+    def _send(self):
+        """Send the pending lines. This is called with the lock held."""
+        conn = self._connection()
+        if self.pending:
+            conn.send(self.pending)
+            self.pending = []
+            self.count = 0
+        return conn
+
+    def release(self, file):
+        """Do nothing; the files are owned by the collector."""
+
+    def flush(self):
+        """Send the pending lines, and wait until they are written."""
+        self._forked()
+        with self.lock:
+            if self.conn is None and not self.pending:
+                return
+            conn = self._send()
+            conn.send("flush")
+            try:
+                conn.recv()
+            except EOFError:
+                raise ConnectionError("the collector is stopped") from None
+
+    def close(self):
+        """Send the pending lines, then close the connection."""
+        self._forked()
+        with self.lock:
+            self.flush()
+            if self.conn is not None:
+                self.conn.close()
+                self.conn = None
+            super().close()
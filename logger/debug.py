@@ -6,25 +6,98 @@ __all__ = ["chk_def", "find_name"]
 
 import collections
 import inspect
+import weakref
+import types
 import sys
 import gc
 
 arguments = collections.namedtuple("arguments",
             "name value checker annotation")
 
+# {code: functions} registry used by get_function(); it only holds weak
+# references, so that it doesn't keep the functions (or code) alive
+_functions = weakref.WeakKeyDictionary()
+# {code: lookups since the last scan} for the code objects that no function
+# was found for; the heap is scanned again every '_max_misses' lookups
+_unknown = weakref.WeakKeyDictionary()
+_max_misses = 100
+
+def register_function(func):
+    """Register the function for get_function(), and return it.
+
+    Methods are registered through their underlying function. Anything
+    else which isn't a function is ignored.
+
+    """
+    target = getattr(func, "__func__", func)
+    if isinstance(target, types.FunctionType):
+        code = target.__code__
+        funcs = _functions.get(code)
+        if funcs is None:
+            funcs = _functions[code] = weakref.WeakSet()
+        funcs.add(target)
+        _unknown.pop(code, None)
+    return func
+
+def _find_functions(code):
+    """Scan the heap once for the functions of the code, and register them."""
+    for obj in gc.get_referrers(code):
+        if isinstance(obj, types.FunctionType) and obj.__code__ is code:
+            register_function(obj)
+    funcs = _functions.get(code)
+    if not funcs:
+        _functions.pop(code, None)
+        _unknown[code] = 0 # e.g. module or class bodies
+        return ()
+    return funcs
+
+def _matching(funcs, frame):
+    """Return the functions which may be running in the frame."""
+    fglobals = frame.f_globals
+    funcs = [func for func in funcs if func.__globals__ is fglobals]
+    if frame.f_code.co_freevars and funcs:
+        # closures of the same code: compare the cells with the frame
+        names = frame.f_code.co_freevars
+        flocals = frame.f_locals
+        def matches(func):
+            for name, cell in zip(names, func.__closure__):
+                try:
+                    if cell.cell_contents is not flocals.get(name, cell):
+                        return False
+                except ValueError: # empty cell
+                    if name in flocals:
+                        return False
+            return True
+        funcs = [func for func in funcs if matches(func)]
+    return funcs
+
 def get_function(depth=0):
-    """Return the function you are currently in."""
+    """Return the function you are currently in.
+
+    The function is looked up in the registry, which the decorators of
+    the 'decorators' module and chk_def() fill. Functions which aren't
+    registered are found by scanning the heap; the result is then
+    registered, so that the following lookups are O(1). The heap is
+    scanned again when none of the registered functions match, and
+    every so often for code that no function was found for.
 
-    funcs = []
+    """
 
     frame = sys._getframe(depth + 1)
     code = frame.f_code
-    fglobals = frame.f_globals
 
-    for func in gc.get_referrers(code):
-        if inspect.isfunction(func) or inspect.ismethod(func):
-            if func.__code__ is code and func.__globals__ is fglobals:
-                funcs.append(func)
+    funcs = _functions.get(code)
+    if funcs is None:
+        misses = _unknown.get(code)
+        if misses is not None and misses < _max_misses:
+            _unknown[code] = misses + 1
+            return None
+        funcs = _matching(_find_functions(code), frame)
+    else:
+        funcs = _matching(funcs, frame)
+        if not funcs:
+            # created after the registration, or the registered ones are gone
+            funcs = _matching(_find_functions(code), frame)
 
     if len(funcs) == 1:
         return funcs[0]
@@ -83,6 +156,8 @@ def chk_def(*olds, handler=None, parser=None, msg=[], func=[],
 
         name = name.__name__
 
+        register_function(runner)
+
         if inspect.ismethod(runner):
             fn = runner.__func__
             func.append((fn.__qualname__, "Method %r of class " + c, fn))
@@ -6,9 +6,26 @@ __all__ = ["handle_bypass", "check_bypass", "log_usage", "log_use",
            "total_decorate", "attribute", "Property", "ClassProperty",
            "DescriptorProperty", "readonly", "Singleton"]
 
+import threading
 import weakref
 import types
 
+from .sets import Domain
+from .debug import register_function
+
+def bypass_state(instance):
+    """Return the per-thread bypass state of the instance.
+
+    This is a threading.local object, created the first time it is
+    needed, which holds the settings bypassed for the call running in
+    the current thread (and, for the loggers, the active LogBatch).
+
+    """
+    try:
+        return instance.__dict__["_bypass_state"]
+    except KeyError:
+        return instance.__dict__.setdefault("_bypass_state", threading.local())
+
 class instance_bypass:
     """Context Manager to handle instance bypassing."""
 
@@ -47,29 +64,193 @@ class handle_bypass:
         with instance_bypass(instance):
             return self.func.__get__(instance, owner)
 
+class BypassPlan:
+    """Compiled evaluation plan for the bypassers of a logger.
+
+    Evaluating the bypassers means going through all the bound values,
+    and checking if any of the (module, attr) pairs is true (and, for
+    the type-based bypassers, if the type is in 'types'). The plan does
+    this work upfront, once for each type it's asked about, and keeps
+    the result as a list of operations. Settings which can never be
+    bypassed are dropped, and settings whose condition and value don't
+    depend on a lookup (their module is None) are folded into a single
+    dict. In the common case, evaluating the bypassers for a given type
+    is then a single dict lookup and a copy.
+
+    For the type-based bypassers, the types are interned as bits in a
+    Domain (the logger's, so that they keep the same bits across plans),
+    and the types bound to each value are compiled into a bitmask, so
+    that checking if a type is bound is a single bitwise AND.
+
+    The plan is tied to the version of the bypasser's mapping, and must
+    be rebuilt when it changes (see check_bypass.get_plan), including
+    when a bound TrackedSet is modified in-place. This is also what
+    keeps the masks in sync with the types.
+
+    """
+
+    def __init__(self, bypassers, typed=False, domain=None):
+        """Compile the plan from the bypassers."""
+        from .types import NoValue
+
+        self.bypassers = bypassers
+        self.version = bypassers.__mapping__.version
+        self.typed = typed
+        self.domain = Domain(()) if domain is None else domain
+        self.entries = []
+        self.masks = {} # all the types bound to each setting
+        self.by_type = {}
+
+        for setting, *values in bypassers.__items__():
+            if typed:
+                types, pairs, module, attr = values
+                types = self.mask(types)
+                self.masks[setting] = self.masks.get(setting, 0) | types
+            else:
+                types = 0
+                pairs, module, attr = values
+
+            if module is NoValue or attr is NoValue:
+                continue
+
+            # the value is the same no matter which pair matched, so
+            # their order doesn't matter, and one static match is enough
+            condition = []
+            for mod, attribute in pairs:
+                if mod is not None:
+                    condition.append((mod, attribute))
+                elif attribute:
+                    condition = True
+                    break
+
+            if not condition and not types:
+                continue # this can never be bypassed
+
+            self.entries.append((setting, types, condition, module, attr))
+
+    def __repr__(self):
+        """Return the representation of the plan."""
+        return "<{0} ({1} entries, version {2})>".format(type(self).__name__,
+               len(self.entries), self.version)
+
+    def mask(self, types):
+        """Return the bitmask of the types, interning the new ones."""
+        add = self.domain.add
+        mask = 0
+        for type in types:
+            mask |= 1 << add(type)
+        return mask
+
+    def bit(self, type):
+        """Return the bit of the type, or 0 if it's never bound."""
+        bit = self.domain.bits.get(type)
+        return 0 if bit is None else 1 << bit
+
+    def bound(self, setting, type):
+        """Return True if the type is bound to the setting."""
+        return self.masks.get(setting, 0) & self.bit(type) != 0
+
+    def compile(self, type=None):
+        """Return the list of operations for the type given."""
+        ops = []
+        static = None
+        bit = self.bit(type)
+        for setting, types, condition, module, attr in self.entries:
+            if condition is True or types & bit:
+                condition = None # always bypassed
+            elif not condition:
+                continue
+
+            if condition is None and module is None:
+                if static is None:
+                    static = {}
+                    ops.append(static)
+                static[setting] = attr
+            else:
+                static = None
+                ops.append((setting, condition, module, attr))
+
+        if not ops:
+            return {}
+        if len(ops) == 1 and isinstance(ops[0], dict):
+            return ops[0]
+        return ops
+
+    def evaluate(self, type=None):
+        """Return a new dict of the settings bypassed for the type."""
+        try:
+            ops = self.by_type[type]
+        except KeyError:
+            ops = self.by_type[type] = self.compile(type)
+
+        if isinstance(ops, dict):
+            return ops.copy()
+
+        get_setting = check_bypass._get_setting
+        bypassed = {}
+        for op in ops:
+            if isinstance(op, dict):
+                bypassed.update(op)
+                continue
+            setting, condition, module, attr = op
+            if condition is not None:
+                for mod, attribute in condition:
+                    if get_setting(mod, attribute, catch=True):
+                        break
+                else:
+                    continue
+            bypassed[setting] = get_setting(module, attr)
+
+        return bypassed
+
 class check_bypass:
-    """Handler to get the proper bypass check decorator."""
+    """Handler to get the proper bypass check decorator.
+
+    The handler to use is chosen from the '_bp_handler' attribute of
+    the class ("base" if it's missing). The bypassers of the instance
+    are compiled into a BypassPlan, which is kept on the instance and
+    rebuilt when the bypassers are modified.
+
+    The bound handler is stored on the instance the first time it is
+    accessed, so that subsequent calls don't need to go through the
+    descriptor. While the handler is running, the 'bypassed' attribute
+    of the instance holds the settings that were bypassed, and calls
+    to the decorated methods (including through super()) go directly
+    to the underlying function. The loggers keep that attribute in a
+    per-thread state (see bypass_state), so that concurrent calls from
+    other threads are checked independently.
+
+    """
 
     def __init__(self, func):
         """Create the bypass checker."""
         self.func = func
+        self.name = getattr(func, "__name__", None)
+
+    def __set_name__(self, owner, name):
+        """Set the name under which the checker is stored."""
+        self.name = name
 
     def __get__(self, instance, owner):
         """Access the method through the instance."""
         if instance is None:
             return self
-        try:
-            instance.bypassed
-        except AttributeError:
-            with instance_bypass(instance):
-                bp_handler = getattr(owner, "_bp_handler", "base")
-                handler = getattr(self, "_check_{0}_".format(bp_handler), None)
-                if handler is None:
-                    raise TypeError("%r does not have a bypass handler".format(owner.__name__))
+        if hasattr(instance, "bypassed"):
+            return self.func.__get__(instance, owner)
+
+        bp_handler = getattr(owner, "_bp_handler", "base")
+        handler = getattr(self, "_check_{0}_".format(bp_handler), None)
+        if handler is None:
+            raise TypeError("{!r} does not have a bypass handler".format(owner.__name__))
 
-                return types.MethodType(handler, instance)
+        method = types.MethodType(handler, instance)
+        for cls in owner.__mro__:
+            if self.name in cls.__dict__:
+                if cls.__dict__[self.name] is self: # not through super()
+                    instance.__dict__[self.name] = method
+                break
 
-        return self.func.__get__(instance, owner)
+        return method
 
     @staticmethod
     def _get_setting(module, attr, catch=False):
@@ -87,20 +268,56 @@ class check_bypass:
                 raise
         return value
 
+    @staticmethod
+    def get_plan(instance, typed=False):
+        """Return an up-to-date evaluation plan for the instance."""
+        bypassers = instance.bypassers
+        plan = instance.__dict__.get("_bypass_plan")
+        if (plan is None or plan.bypassers is not bypassers or
+                plan.version != bypassers.__mapping__.version or
+                plan.typed is not typed):
+            domain = getattr(instance, "type_domain", None)
+            if domain is not None and len(domain) > domain.max_items:
+                # forget the types which were bound once, but aren't anymore
+                domain = instance.type_domain = Domain(instance.logfiles)
+            plan = instance._bypass_plan = BypassPlan(bypassers, typed, domain)
+        return plan
+
+    def _evaluate(self, instance, type=None, typed=False):
+        """Evaluate the bypassers, once per type during a batch."""
+        batch = getattr(instance, "_batch", None)
+        if batch is None:
+            return self.get_plan(instance, typed).evaluate(type)
+
+        try:
+            bypassed = batch.bypassed[typed, type]
+        except KeyError:
+            bypassed = self.get_plan(instance, typed).evaluate(type)
+            batch.bypassed[typed, type] = bypassed
+        return bypassed.copy()
+
+    def _call_(self, instance, bypassed, args, kwargs):
+        """Call the function with the bypassed settings set."""
+        instance.bypassed = bypassed
+        try:
+            return self.func(instance, *args, **kwargs)
+        finally:
+            del instance.bypassed
+
     def _check_base_(self, instance, *args, **kwargs):
         """Checker for the base class."""
-        for setting, pairs, mod, attr in instance.bypassers.__items__():
-            if mod is NoValue or attr is NoValue:
-                continue
-            for module, attribute in pairs:
-                if self._get_setting(module, attribute, catch=True):
-                    instance.bypassed[setting] = self._get_setting(mod, attr)
-                    break
+        if hasattr(instance, "bypassed"):
+            return self.func(instance, *args, **kwargs)
 
-        return self.func(instance, *args, **kwargs)
+        bypassed = self._evaluate(instance)
+
+        return self._call_(instance, bypassed, args, kwargs)
 
     def _check_type_(self, instance, *args, type=None, file=None, **kwargs):
         """Checker for the type-based loggers."""
+        if hasattr(instance, "bypassed"):
+            return self.func(instance, *args, type=type, file=file, **kwargs)
+
         if file is type is None:
             type = "normal"
 
@@ -115,25 +332,28 @@ class check_bypass:
         if file is None:
             file = instance.logfiles.get(type, instance.logfiles["normal"])
 
-        for setting, types, pairs, mod, attr in instance.bypassers.__items__():
-            if mod is NoValue or attr is NoValue:
-                continue
-            for module, attribute in pairs:
-                if self._get_setting(module, attribute, catch=True):
-                    instance.bypassed[setting] = self._get_setting(mod, attr)
-                    break
-            else:
-                if type in types:
-                    instance.bypassed[setting] = self._get_setting(mod, attr)
+        bypassed = self._evaluate(instance, type, typed=True)
 
-        return self.func(instance, *args, type=type, file=file, **kwargs)
+        kwargs["type"] = type
+        kwargs["file"] = file
+        return self._call_(instance, bypassed, args, kwargs)
 
-    def _check_level_(self, instance, *args, level=None, file=None, **kwargs):
+    def _check_level_(self, instance, *args, level=None, **kwargs):
         """Checker for the level-based loggers."""
-        if file is None:
-            file = instance.default_file
-        if level is None:
-            level = instance.default_level
+        threshold = instance._level_threshold()
+        if (threshold is not None and
+                instance._resolve_level(level) < threshold):
+            return None # rejected before anything else is done
+
+        if hasattr(instance, "bypassed"):
+            return self.func(instance, *args, level=level, **kwargs)
+
+        bypassed = self._evaluate(instance)
+        if threshold is None and not instance._level_allows(level, bypassed):
+            return None # the "level" bypasser had to be evaluated first
+
+        kwargs["level"] = instance._resolve_level(bypassed.get("level", level))
+        return self._call_(instance, bypassed, args, kwargs)
 
 class log_usage:
     """Decorator to log function and method usage.
@@ -233,7 +453,7 @@ class log_usage:
 
     def __call__(self, func):
         """Call the handler."""
-        self.func = func
+        self.func = register_function(func)
         return lambda *args, **rest: self.call(func, args, rest, self.handler)
 
     def __get__(self, instance, owner):
@@ -283,7 +503,7 @@ class log_use(log_usage):
     def __init__(self, func):
         """Prepare a handler-less decorator."""
         self.handler = self._default_handler().logger
-        self.func = func
+        self.func = register_function(func)
 
     def __call__(self, *args, **kwargs):
         """Handle the calling of the function itself."""
@@ -323,8 +543,9 @@ def total_decorate(cls=None, *, handler=log_use, name=None):
     if cls is None: # as an argument-only decorator
         return lambda cls: total_decorate(cls, handler=handler, name=name)
 
-    namespace = {x: handler(getattr(cls, x)) for x in dir(cls) if x not in
-                 ("__repr__", "__str__") and callable(getattr(cls, x))}
+    namespace = {x: handler(register_function(getattr(cls, x))) for x in
+                 dir(cls) if x not in ("__repr__", "__str__") and
+                 callable(getattr(cls, x))}
 
     bases = (cls,) + cls.__bases__
 
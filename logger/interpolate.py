@@ -20,9 +20,21 @@ of the Interpolater class. The module currently exposes the following:
 
 __all__ = ["String"]
 
+import collections
+import threading
+import keyword
 import re
 
-from typing import Optional, Tuple, Pattern
+from typing import Any, Callable, Dict, List, Optional, Tuple, Pattern
+
+# parsed templates and generated functions, shared by all the
+# interpolaters (see compile() and compile_function())
+_templates = collections.OrderedDict() # type: Dict[Tuple[type, str], Tuple[Any, ...]]
+_functions = collections.OrderedDict() # type: Dict[Tuple[type, str], Callable[..., List[str]]]
+_cache_lock = threading.Lock()
+
+_splitter = re.compile(r"[\(\)\[\]\.]")
+_separators = frozenset("()[].")
 
 class Interpolater:
     """Base class for string interpolation.
@@ -57,6 +69,21 @@ class Interpolater:
     Note: The format specifier and the conversion syntax in the string
     do not have a specified ordering; both will be parsed regardless.
 
+    'cache_size': The maximum number of parsed templates to keep. The
+                  templates are shared between all classes, and the
+                  least recently used ones are dropped first. Each
+                  subclass may set its own size, which is enforced
+                  when it adds a template to the cache.
+
+    'codegen': If True, the templates are compiled into Python functions
+               the first time they are used (see compile_function()),
+               which are then called to format the string. This is
+               faster than going through the template when the same
+               string is formatted often, at the cost of compiling it
+               the first time. Each call still goes through Python
+               code, so that formatting a short string remains a few
+               times slower than with str.format().
+
     You may also define the following functions:
 
     'bounds': This will be called with the string to replace (i.e. the
@@ -89,6 +116,11 @@ class Interpolater:
              for example modify "{{" and "}}" to "{" and "}" (in the
              case of String).
 
+    Note on parsing: The string is only parsed (which is what calls the
+    'bounds' and 'check' methods) the first time it is formatted; the
+    result is cached per class and string, and reused afterwards. As
+    such, these methods should only depend on their arguments.
+
     Note on creating subclasses:
 
     All methods can be overridden in the subclasses. The only methods
@@ -98,7 +130,8 @@ class Interpolater:
     the methods for their operation. The 'string' attribute is only
     used in __init__, __len__, __str__ and __repr__; the interpolation
     methods call len(self) and str(self) to get the length and string
-    of self, instead of accessing the 'string' member.
+    of self, instead of accessing the 'string' member (format_map() only
+    reads it directly if __str__ is not overridden).
 
     Note on the return type of format() (and format_map()):
 
@@ -113,6 +146,9 @@ class Interpolater:
     conversion = None # type: Optional[Tuple[Pattern[str], slice]]
     specifier = None # type: Optional[Tuple[Pattern[str], slice]]
 
+    cache_size = 1024
+    codegen = False
+
     def bounds(self, string):
         """Return the string with proper bounds."""
         return string
@@ -124,6 +160,16 @@ class Interpolater:
     def check(self, lines, ignored):
         """Check the output and apply special cases."""
 
+    # True if neither __str__ nor modifier are overridden, in which case
+    # format_map() uses the 'string' member and joins the list directly
+    _plain = True
+
+    def __init_subclass__(cls, **kwargs):
+        """Check if the subclass overrides __str__ or modifier."""
+        super().__init_subclass__(**kwargs)
+        cls._plain = (cls.__str__ is Interpolater.__str__ and
+                      cls.modifier is Interpolater.modifier)
+
     def __init__(self, string):
         """Create a new instance for interpolation."""
         self.string = str(string)
@@ -157,10 +203,11 @@ class Interpolater:
         """Return a formatted string using the given arguments."""
         if not args:
             raise TypeError("format() needs an argument")
-        self, *lst = args
-        kwargs.update(enumerate(lst))
-        kwargs[None] = len(lst)
-        return self.format_map(kwargs)
+        count = len(args) - 1
+        for i in range(count):
+            kwargs[i] = args[i + 1]
+        kwargs[None] = count
+        return args[0].format_map(kwargs)
 
     def format_map(self, mapping):
         """Return a formatted string using the mapping directly.
@@ -190,16 +237,198 @@ class Interpolater:
 
         """
 
-        # TODO: 'invalid' class variable for e.g. unmatched braces
-        # also better handle double braces (not at the end)
-
         if self.pattern is None:
             return str(self)
 
-        count = -1
+        if self.codegen:
+            function = self.__dict__.get("_function")
+            string = self.string if self._plain else str(self)
+            if function is None or function[0] is not string:
+                function = (None, self.compile_function())
+            final = function[1](mapping)
+        else:
+            final = self._interpret(mapping)
+
+        if self._plain: # the default modifier can't return anything else
+            return "".join(final)
+
+        result = self.modifier(final)
+        if not isinstance(result, str):
+            raise ValueError("{0}.modifier must return a str, not {1}".format(
+                             type(self).__name__, type(result).__name__))
+        return result
+
+    def _interpret(self, mapping):
+        """Return the list of substrings, going through the template."""
+        final = []
+        for op in self.compile():
+            if op.__class__ is str:
+                final.append(op)
+                continue
+
+            name, keys, chain, converter, specifier = op
+            if keys is None:
+                result = mapping[name]
+            else:
+                result = self._get_index(mapping, *keys)
+
+            for kind, arg in chain:
+                if kind == ".":
+                    result = getattr(result, arg)
+                elif kind == "[":
+                    result = result[arg]
+                elif arg is None:
+                    result = result()
+                else:
+                    result = result(arg)
+
+            if converter is not None:
+                result = converter(result)
+            if specifier is None:
+                final.append(str(result))
+            else:
+                final.append(format(result, specifier))
+
+        return final
+
+    @staticmethod
+    def _get_index(mapping, index, name):
+        """Return the value for a numbered field."""
+        try:
+            return mapping[index]
+        except KeyError:
+            pass
+        try:
+            return mapping[name]
+        except KeyError:
+            pass
+        if index < 0:
+            try:
+                index += mapping[None]
+            except (KeyError, TypeError):
+                pass # we just keep the number as-is
+        try:
+            return mapping[index]
+        except KeyError:
+            raise IndexError("Format index out of range") from None
+
+    def _cached(self, cache, build, attr):
+        """Return the cached value for self, or build and cache it.
+
+        The value is also kept on the instance under 'attr', along with
+        the string it was made from, which saves the lookup in the
+        shared cache as long as the string stays the same.
+
+        """
+
+        string = str(self)
+        local = self.__dict__.get(attr)
+        if local is not None and local[0] is string:
+            return local[1]
+
+        key = (type(self), string)
+        value = cache.get(key)
+        if value is not None:
+            try:
+                cache.move_to_end(key)
+            except KeyError:
+                pass # removed by another thread in the meantime
+
+        else:
+            value = build()
+            with _cache_lock:
+                cache[key] = value
+                while len(cache) > self.cache_size:
+                    cache.popitem(last=False)
+
+        self.__dict__[attr] = (string, value)
+        return value
+
+    def compile(self):
+        """Return the parsed template of self, from the cache if possible.
+
+        The template is a tuple of operations, which are either literal
+        strings or (name, keys, chain, converter, specifier) tuples for
+        the replacement fields. Templates are cached per class and
+        string, keeping the 'cache_size' most recently used ones.
+
+        """
+
+        return self._cached(_templates, self._parse, "_template")
+
+    def compile_function(self):
+        """Return a function specialized for formatting self.
+
+        The function takes the mapping and returns the list of
+        substrings, like going through the template would, but with
+        the lookups, conversions and format() calls written out in its
+        source. These functions are cached like the templates.
+
+        """
+
+        return self._cached(_functions, self._generate, "_function")
+
+    def _generate(self):
+        """Generate the source of the formatting function and compile it."""
+        namespace = {"_get_index": self._get_index}
+        lines = ["def _format(mapping):"]
+        parts = []
+
+        for i, op in enumerate(self.compile()):
+            if op.__class__ is str:
+                parts.append(repr(op))
+                continue
+
+            name, keys, chain, converter, specifier = op
+            var = "_v{0}".format(i)
+            if keys is None:
+                lines.append("    {0} = mapping[{1!r}]".format(var, name))
+            else:
+                lines.append("    try:")
+                lines.append("        {0} = mapping[{1!r}]".format(var, keys[0]))
+                lines.append("    except KeyError:")
+                lines.append("        {0} = _get_index(mapping, {1!r}, {2!r})".format(var, *keys))
+
+            expr = var
+            for kind, arg in chain:
+                if kind == "." and arg.isidentifier() and not keyword.iskeyword(arg):
+                    expr = "{0}.{1}".format(expr, arg)
+                elif kind == ".":
+                    expr = "getattr({0}, {1!r})".format(expr, arg)
+                elif kind == "[":
+                    expr = "{0}[{1!r}]".format(expr, arg)
+                elif arg is None:
+                    expr = "{0}()".format(expr)
+                else:
+                    expr = "{0}({1!r})".format(expr, arg)
+
+            if converter is not None:
+                namespace["_c{0}".format(i)] = converter
+                expr = "_c{0}({1})".format(i, expr)
+
+            if specifier is None:
+                expr = "str({0})".format(expr)
+            else:
+                expr = "format({0}, {1!r})".format(expr, specifier)
+
+            lines.append("    {0} = {1}".format(var, expr))
+            parts.append(var)
+
+        lines.append("    return [{0}]".format(", ".join(parts)))
+
+        code = compile("\n".join(lines), "<{0} template>".format(
+                       type(self).__name__), "exec")
+        exec(code, namespace)
+        return namespace["_format"]
+
+    def _parse(self):
+        """Parse the string of self into a template."""
+
+        # TODO: 'invalid' class variable for e.g. unmatched braces
+        # also better handle double braces (not at the end)
+
         lines = []
         ignore = []
-        splitter = re.compile(r"[\(\)\[\]\.]")
 
         last = 0
         line = str(self)
@@ -222,14 +451,15 @@ class Interpolater:
 
         self.check(lines, ignore)
 
-        final = []
+        template = []
+        count = -1 # None once manual numbering is used
 
         for string, ignored in zip(lines, ignore):
             if string is None:
                 if ignored is None or not isinstance(ignored, str):
                     raise ValueError("invalid mutation in {0}.check".format(
                                      type(self).__name__))
-                final.append(ignored)
+                template.append(ignored)
                 continue
 
             if ignored is not None or not isinstance(string, str):
@@ -259,9 +489,8 @@ class Interpolater:
 
             if specifier is not None:
                 specifier = specifier[spec_slice]
-                string = format(type(self)(string), specifier)
 
-            converter = str
+            converter = None
             if conversion is not None:
                 conversion = conversion[conv_slice]
                 if conversion in ("s", "str"):
@@ -275,7 +504,7 @@ class Interpolater:
 
             seps = []
             last = 0
-            for match in splitter.finditer(string):
+            for match in _splitter.finditer(string):
                 if last != match.start():
                     seps.append(string[last:match.start()])
                 seps.append(match.group())
@@ -284,9 +513,11 @@ class Interpolater:
             if last < len(string):
                 seps.append(string[last:])
 
-            if seps:
+            string = ""
+            if seps and seps[0] not in _separators:
                 string = seps.pop(0)
 
+            auto = False
             if not string:
                 if count is None:
                     raise ValueError("cannot switch from manual field "
@@ -295,93 +526,64 @@ class Interpolater:
                 string = str(count)
                 auto = True
 
+            keys = None
             if string.count("-") <= 1 and string.lstrip("-").isdigit():
-                if count is not None and count != -1 and not auto:
-                    raise ValueError("cannot switch from automatic field "
-                          "numbering to manual field specification")
-
                 if not auto:
+                    if count is not None and count != -1:
+                        raise ValueError("cannot switch from automatic field "
+                              "numbering to manual field specification")
                     count = None # prevent switching between automatic/manual
 
-                num = int(string)
-                if num < 0:
-                    try:
-                        num += mapping[None]
-                    except (KeyError, TypeError):
-                        pass # we just keep the number as-is
-
-                for value in (int(string), string, num):
-                    try:
-                        result = mapping[value]
-                        break
-                    except KeyError:
-                        pass
+                keys = (int(string), string)
+
+            template.append((string, keys, self._parse_chain(seps),
+                             converter, specifier))
+
+        return tuple(template)
+
+    @staticmethod
+    def _parse_chain(seps):
+        """Parse the attribute, index and call operations of a field."""
+        chain = []
+        i = 0
+        while i < len(seps):
+            sep = seps[i]
+            if sep == ".":
+                if len(seps) <= i+1 or seps[i+1] in _separators:
+                    raise ValueError("Invalid attribute access in format string")
+                chain.append((".", seps[i+1]))
+                i += 2
+
+            elif sep == "[":
+                if len(seps) > i+1 and seps[i+1] == "]":
+                    raise ValueError("Empty indexing in format string")
+                try:
+                    end = seps.index("]", i+2)
+                except ValueError:
+                    raise ValueError("Invalid indexing in format string") from None
+
+                index = "".join(seps[i+1:end])
+                if index.isdigit():
+                    index = int(index)
+                chain.append(("[", index))
+                i = end + 1
+
+            elif sep == "(":
+                try:
+                    end = seps.index(")", i+1)
+                except ValueError:
+                    raise ValueError("Invalid call in format string") from None
+
+                if end == i+1: # no arguments
+                    chain.append(("(", None))
                 else:
-                    raise IndexError("Format index out of range")
+                    chain.append(("(", "".join(seps[i+1:end])))
+                i = end + 1
 
             else:
-                result = mapping[string]
-
-            res = [None] + seps
-            i = 1
-            while i < len(res):
-                sep = res[i]
-                assert sep is not None, "unexpected None in results index"
-                if sep == ".":
-                    if res[i-1] is not None or len(res) <= i+1 or res[i+1] in "[]().":
-                        raise ValueError("Invalid attribute access in format string")
-                    result = getattr(result, res[i+1])
-                    res[i] = res[i+1] = None
-                    i += 2
-
-                elif sep == "[":
-                    if len(res) > i+1 and res[i+1] == "]":
-                        raise ValueError("Empty indexing in format string")
-                    if res[i-1] is not None:
-                        raise ValueError("Invalid indexing in format string")
-                    s = 2
-                    while i+s < len(res):
-                        if res[i+s] == "]":
-                            break
-                        s += 1
-                    else:
-                        raise ValueError("Invalid indexing in format string")
-
-                    r = "".join(res[i+1:i+s])
-                    result = result[r]
-                    res[i:i+s+1] = [None] * (s+1)
-                    i = i+s+1
-
-                elif sep == "(":
-                    if res[i-1] is not None:
-                        raise ValueError("Invalid call in format string")
-                    s = 1
-                    while i+s < len(res):
-                        if res[i+s] == ")":
-                            break
-                        s += 1
-                    else:
-                        raise ValueError("Invalid call in format string")
-
-                    if s == 1: # no arguments
-                        result = result()
-                    else:
-                        r = "".join(res[i+1:i+s])
-                        result = result(r)
-                    res[i:i+s+1] = [None] * (s+1)
-                    i = i+s+1
-
-                else:
-                    raise ValueError("Invalid operation in format string")
+                raise ValueError("Invalid operation in format string")
 
-            assert res.count(None) == len(res) == i
-            final.append(converter(result))
-
-        result = self.modifier(final)
-        if not isinstance(result, str):
-            raise ValueError("{0}.modifier must return a str, not {1}".format(
-                             type(self).__name__, type(result).__name__))
-        return result
+        return tuple(chain)
 
 class String(Interpolater):
     """Interpolation system akin to str.format()."""
@@ -395,11 +597,15 @@ class String(Interpolater):
         single = re.compile("({|})")
         double = re.compile("({{|}})")
         for i, line in enumerate(ignored):
+            if line is None: # replacement field
+                continue
             if double.search(line):
                 ignored[i] = line.replace("{{", "{").replace("}}", "}")
             elif single.search(line):
                 raise ValueError("Single {!r} encountered in format string".format(single.search(line).group()))
 
+    codegen = True
+
     pattern = re.compile("(?<!{){[^{}]*}(?!})")
-    conversion = re.compile("!.+"), slice(1)
-    specifier = re.compile(":.+"), slice(1)
+    conversion = re.compile("!.+"), slice(1, None)
+    specifier = re.compile(":.+"), slice(1, None)
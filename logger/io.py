@@ -2,10 +2,685 @@
 
 """Specific module for I/O-related operations."""
 
-__all__ = []
+__all__ = ["FilePool", "Rotation", "ConsoleSink", "AsyncWriter",
+           "TerminalWidth", "terminal_width"]
 
+import collections
+import threading
+import datetime
+import gzip
+import bz2
+import lzma
+import weakref
+import traceback
+import atexit
+import shutil
+import signal
 import stat
+import time
+import sys
 import os
+import re
+
+from .utilities import pick
+
+# every I/O object which holds open resources registers itself here, so
+# that pending data can be flushed before forking and at interpreter exit
+_open_objects = weakref.WeakSet()
+
+def _flush_all():
+    """Flush every registered I/O object."""
+    for obj in list(_open_objects):
+        try:
+            obj.flush()
+        except (OSError, ValueError):
+            pass # nothing we can do this late
+
+def _close_all():
+    """Close every registered I/O object."""
+    # writers need to drain into the other objects before they're closed
+    for obj in sorted(_open_objects, key=lambda obj: obj.close_order):
+        try:
+            obj.close()
+        except (OSError, ValueError):
+            pass
+
+def _reset_all():
+    """Reset every registered I/O object, in a new child process."""
+    for obj in list(_open_objects):
+        obj.after_fork()
+
+atexit.register(_close_all)
+
+if hasattr(os, "register_at_fork"):
+    # don't let a child process inherit (and later write) our buffers,
+    # nor wait on threads and locks which only exist in the parent
+    os.register_at_fork(before=_flush_all, after_in_child=_reset_all)
 
 class IOBase:
     """Base class for I/O-related operations."""
+
+    closed = False
+    close_order = 1
+
+    def __init__(self):
+        """Register the object for flushing at exit."""
+        _open_objects.add(self)
+
+    def __enter__(self):
+        """Use the object as a context manager."""
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """Close the object when leaving the context manager."""
+        self.close()
+
+    def flush(self):
+        """Flush any pending data."""
+
+    def after_fork(self):
+        """Drop the state inherited from the parent, in a child process."""
+
+    def close(self):
+        """Close the object and release all of its resources."""
+        self.closed = True
+        _open_objects.discard(self)
+
+class FilePool(IOBase):
+    """Pool of open file handles, used for appending to log files.
+
+    Handles are keyed by (path, encoding, errors) and are kept open
+    between writes, so that logging a line doesn't cost an open() and
+    a close() call every time. At most 'max_files' handles are kept
+    open; the least recently used handle is closed when a new one
+    needs to be opened past that limit.
+
+    If 'autoflush' is True (the default), the handle is flushed after
+    each write, so that the lines are on disk by the time write()
+    returns. Otherwise, data is flushed when the handle is evicted,
+    when flush() or close() is called, and at interpreter exit.
+
+    The pool is safe to use from multiple threads. It can be closed
+    explicitly or used as a context manager; writing to a closed pool
+    will open it again.
+
+    If 'rotation' is a Rotation instance, the files are rotated as it
+    decides, right before writing lines that would make the file grow
+    past its size limit, or once it is too old. 'backups' is then an
+    optional callable which is given the path of the file being rotated
+    and returns how many rotated files to keep, or None to use the
+    policy's own setting.
+
+    """
+
+    default_max_files = 16
+    default_autoflush = True
+
+    def __init__(self, max_files=None, autoflush=None, rotation=None,
+                 backups=None):
+        """Create a new file pool."""
+        super().__init__()
+        self.max_files = pick(max_files, self.default_max_files)
+        self.autoflush = pick(autoflush, self.default_autoflush)
+        if self.max_files < 1:
+            raise ValueError("max_files must be at least 1")
+        self.handles = collections.OrderedDict()
+        self.lock = threading.RLock()
+        self.rotation = rotation
+        self.backups = backups
+        self.limits = {} # file: [size, deadline] when rotating
+
+    def __repr__(self):
+        """Return the representation of the pool."""
+        return "<{0} ({1}/{2} open)>".format(type(self).__name__,
+                                             len(self.handles), self.max_files)
+
+    def __len__(self):
+        """Return the number of open handles."""
+        return len(self.handles)
+
+    def __contains__(self, file):
+        """Return True if a handle for the file is open."""
+        return any(key[0] == file for key in self.handles)
+
+    def _open(self, file, encoding, errors):
+        """Open and return a new handle. This is called with the lock held."""
+        handles = self.handles
+        for key in list(handles):
+            # two handles to the same file would reorder the lines
+            if key[0] == file:
+                handles.pop(key).close()
+
+        while len(handles) >= self.max_files:
+            handles.popitem(last=False)[1].close()
+
+        handle = self._handle(file, encoding, errors)
+        handles[file, encoding, errors] = handle
+        if self.rotation is not None:
+            info = os.fstat(handle.fileno())
+            # the age of an existing file counts from its last change
+            started = info.st_mtime if info.st_size else time.time()
+            self.limits[file] = [info.st_size, self.rotation.deadline(started)]
+        return handle
+
+    def _handle(self, file, encoding, errors):
+        """Return a new handle for appending to the file."""
+        return open(file, "a", encoding=encoding, errors=errors)
+
+    def get(self, file, encoding=None, errors=None):
+        """Return an open handle for the file, opening it if needed."""
+        key = (file, encoding, errors)
+        with self.lock:
+            if self.closed:
+                self.closed = False
+                _open_objects.add(self)
+            handle = self.handles.get(key)
+            if handle is None:
+                return self._open(file, encoding, errors)
+            self.handles.move_to_end(key)
+            return handle
+
+    def write(self, file, lines, encoding=None, errors=None):
+        """Write an iterable of lines to the file."""
+        with self.lock:
+            handle = self.get(file, encoding, errors)
+            if self.rotation is None:
+                handle.writelines(lines)
+            else:
+                text = "".join(lines)
+                if text.isascii(): # this doesn't need to scan the string
+                    size = len(text)
+                else:
+                    size = len(text.encode(handle.encoding, handle.errors))
+                limits = self.limits[file]
+                if self.rotation.due(limits[0], size, limits[1]):
+                    handle = self.rotate(file, encoding, errors)
+                    limits = self.limits[file]
+                handle.write(text)
+                limits[0] += size
+            if self.autoflush:
+                handle.flush()
+
+    def rotate(self, file, encoding=None, errors=None):
+        """Rotate the file now, and return a new handle for it."""
+        with self.lock:
+            if self.rotation is None:
+                raise ValueError("the pool has no rotation policy")
+            self.release(file)
+            backups = None if self.backups is None else self.backups(file)
+            self.rotation.rotate(file, backups)
+            return self._open(file, encoding, errors)
+
+    def release(self, file):
+        """Close all the handles open for the file, if any."""
+        with self.lock:
+            for key in list(self.handles):
+                if key[0] == file:
+                    self.handles.pop(key).close()
+
+    def flush(self):
+        """Flush all the open handles."""
+        with self.lock:
+            for handle in self.handles.values():
+                handle.flush()
+
+    def close(self):
+        """Flush and close all the open handles."""
+        with self.lock:
+            while self.handles:
+                self.handles.popitem(last=False)[1].close()
+            super().close()
+        if self.rotation is not None and self.rotation.writer is not None:
+            self.rotation.writer.flush() # let the rotated files be finished
+
+class Rotation:
+    """Policy deciding when to rotate log files, and how to keep them.
+
+    A file is rotated by atomically renaming it, appending the time of
+    the rotation to its name ("logger.log.20240131-235959"), after which
+    a new file is started. The rotated files are then compressed and the
+    oldest ones removed, on a background thread, so that this never
+    blocks the logger. The available settings are:
+
+    'max_bytes':    Size, in bytes, that a file may not exceed. A file
+                    is rotated before writing lines which would make it
+                    grow past that size (unless it's empty). If None,
+                    the size is not limited.
+
+    'max_age':      Number of seconds after which a file is rotated,
+                    counted from its creation (or from its last change,
+                    for files which existed before). If None, the age
+                    is not limited.
+
+    'daily':        If True, files are rotated when the day changes,
+                    in local time or in UTC, according to 'use_utc'.
+
+    'backups':      Number of rotated files to keep; older ones are
+                    removed. If None, all rotated files are kept.
+
+    'compress':     Compression to apply to the rotated files; one of
+                    "gzip", "bz2" or "lzma", or a callable which is
+                    given the path of the rotated file, compresses it
+                    and returns the path of the compressed file (and is
+                    responsible for removing the original). If None,
+                    rotated files are kept as-is.
+
+    'writer':       The AsyncWriter on which the rotated files are
+                    compressed and removed. One is created when needed
+                    if this is None.
+
+    """
+
+    default_backups = None
+    default_compress = None
+    default_use_utc = False
+
+    compressors = {"gzip": (".gz", gzip.open),
+                   "bz2": (".bz2", bz2.open),
+                   "lzma": (".xz", lzma.open)}
+
+    def __init__(self, max_bytes=None, max_age=None, daily=False,
+                 use_utc=None, backups=None, compress=None, writer=None):
+        """Create a new rotation policy."""
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.daily = daily
+        self.use_utc = pick(use_utc, self.default_use_utc)
+        self.backups = pick(backups, self.default_backups)
+        self.compress = pick(compress, self.default_compress)
+        self.writer = writer
+        self.last = {} # file: (stamp, number) of the last rotation
+        if not (self.compress is None or callable(self.compress) or
+                self.compress in self.compressors):
+            raise ValueError("unknown compression: {!r}".format(self.compress))
+
+    def __repr__(self):
+        """Return the representation of the policy."""
+        return ("{0}(max_bytes={1!r}, max_age={2!r}, daily={3!r}, "
+                "backups={4!r}, compress={5!r})").format(type(self).__name__,
+                self.max_bytes, self.max_age, self.daily, self.backups,
+                self.compress)
+
+    def deadline(self, started):
+        """Return the time at which a file started at 'started' expires."""
+        deadline = float("inf")
+        if self.max_age is not None:
+            deadline = started + self.max_age
+        if self.daily:
+            if self.use_utc:
+                midnight = (started // 86400 + 1) * 86400
+            else:
+                day = datetime.date.fromtimestamp(started)
+                day += datetime.timedelta(days=1)
+                midnight = time.mktime(day.timetuple())
+            deadline = min(deadline, midnight)
+        return deadline
+
+    def due(self, size, adding, deadline):
+        """Return True if a file needs rotating before adding to it."""
+        if not size:
+            return False # never rotate to an empty file
+        if self.max_bytes is not None and size + adding > self.max_bytes:
+            return True
+        return time.time() >= deadline
+
+    @staticmethod
+    def _name(file):
+        """Return the pattern matching the names of the rotated files."""
+        return re.compile(re.escape(os.path.basename(file)) +
+                          r"\.(\d{8}-\d{6})(?:-(\d+))?(\.[a-z0-9]+)?$")
+
+    def rotated(self, file):
+        """Return the paths of the rotated files for the file, oldest first."""
+        head = os.path.dirname(file)
+        pattern = self._name(file)
+        found = []
+        for name in os.listdir(head or "."):
+            match = pattern.match(name)
+            if match is not None:
+                stamp, number, ext = match.groups()
+                found.append((stamp, int(number or 0), os.path.join(head, name)))
+        return [path for stamp, number, path in sorted(found)]
+
+    def rotate(self, file, backups=None):
+        """Rename the file out of the way, and schedule its compression."""
+        now = time.time()
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.gmtime(now) if self.use_utc
+                              else time.localtime(now))
+        # number the files rotated during the same second, after the
+        # newest one (older ones may have been removed in the meantime)
+        number = -1
+        for path in self.rotated(file):
+            match = self._name(file).match(os.path.basename(path))
+            if match.group(1) == stamp:
+                number = max(number, int(match.group(2) or 0))
+        last_stamp, last_number = self.last.get(file, (None, -1))
+        if last_stamp == stamp:
+            number = max(number, last_number)
+        number += 1
+        self.last[file] = (stamp, number)
+        if number:
+            target = "{0}.{1}-{2}".format(file, stamp, number)
+        else:
+            target = "{0}.{1}".format(file, stamp)
+
+        os.replace(file, target)
+
+        if self.writer is None:
+            self.writer = AsyncWriter()
+        self.writer.submit(self._finish, file, target,
+                           pick(backups, self.backups))
+        return target
+
+    def _finish(self, file, target, backups):
+        """Compress the rotated file and remove the extra ones."""
+        if not os.path.exists(target):
+            return # removed already, as part of the extra files
+        if self.compress is not None:
+            if callable(self.compress):
+                self.compress(target)
+            else:
+                ext, opener = self.compressors[self.compress]
+                temp = target + ext + ".tmp"
+                with open(target, "rb") as source, opener(temp, "wb") as dest:
+                    shutil.copyfileobj(source, dest)
+                os.replace(temp, target + ext)
+                os.remove(target)
+
+        if backups is not None:
+            rotated = self.rotated(file)
+            for path in rotated[:max(len(rotated) - backups, 0)]:
+                os.remove(path)
+
+class ConsoleSink(IOBase):
+    """Reusable text stream over the standard output's file descriptor.
+
+    The descriptor is wrapped once, with the given encoding and error
+    handler, instead of creating a new wrapper for every line. When to
+    flush the data to the terminal is determined by the flush policy:
+
+    'flush_lines': Number of writes after which the stream is flushed.
+                   1 flushes after every write; 0 never flushes on its
+                   own, leaving it to flush(), close() and to the exit
+                   of the interpreter.
+
+    'flush_interval': Number of seconds after which pending data is
+                      flushed, regardless of the number of writes. If
+                      None, only 'flush_lines' is used.
+
+    """
+
+    default_flush_lines = 1
+    default_flush_interval = None
+
+    def __init__(self, encoding=None, errors=None, flush_lines=None,
+                 flush_interval=None, fd=None):
+        """Create a new console sink."""
+        super().__init__()
+        self.encoding = encoding
+        self.errors = errors
+        self.flush_lines = pick(flush_lines, self.default_flush_lines)
+        self.flush_interval = pick(flush_interval, self.default_flush_interval)
+        self.fd = sys.stdout.fileno() if fd is None else fd
+        self.lock = threading.RLock()
+        self.pending = 0
+        self.timer = None
+        self.file = None
+
+    def __repr__(self):
+        """Return the representation of the sink."""
+        return "<{0} (fd={1}, encoding={2!r})>".format(type(self).__name__,
+                                                      self.fd, self.encoding)
+
+    def _open(self):
+        """Wrap the file descriptor. This is called with the lock held."""
+        self.file = open(self.fd, "w", encoding=self.encoding,
+                         errors=self.errors, closefd=False)
+        if self.closed:
+            self.closed = False
+            _open_objects.add(self)
+        return self.file
+
+    def write(self, text):
+        """Write the text, flushing according to the policy."""
+        self.writelines((text,))
+
+    def writelines(self, parts):
+        """Write an iterable of strings, counting as a single write."""
+        with self.lock:
+            file = self.file or self._open()
+            file.writelines(parts)
+            self.pending += 1
+            if self.flush_lines and self.pending >= self.flush_lines:
+                self.flush()
+            elif self.flush_interval is not None and self.timer is None:
+                self.timer = threading.Timer(self.flush_interval, self.flush)
+                self.timer.daemon = True
+                self.timer.start()
+
+    def flush(self):
+        """Flush the pending data to the terminal."""
+        with self.lock:
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+            if self.file is not None:
+                self.file.flush()
+            self.pending = 0
+
+    def after_fork(self):
+        """Forget the lock and timer of the parent process."""
+        self.lock = threading.RLock()
+        self.timer = None
+
+    def close(self):
+        """Flush the pending data and release the wrapper."""
+        with self.lock:
+            self.flush()
+            if self.file is not None:
+                self.file.close() # this doesn't close the descriptor
+                self.file = None
+            super().close()
+
+class AsyncWriter(IOBase):
+    """Run I/O operations on a background thread.
+
+    Operations are submitted as a callable with its arguments, and are
+    put in a bounded queue which is drained, in order, by a dedicated
+    writer thread. The thread is started on the first submission. When
+    the queue holds 'max_queue' operations, the 'overflow' policy
+    decides what happens to a new one:
+
+    "block":        Wait for the writer thread to make room (default).
+    "drop-oldest":  Discard the oldest queued operation.
+    "drop-newest":  Discard the operation being submitted.
+
+    The number of discarded operations is kept in the 'dropped'
+    attribute. flush() waits until every queued operation has been run,
+    and close() does the same before stopping the thread. Exceptions
+    raised by an operation are printed to stderr, and don't stop the
+    writer thread. A child process starts with an empty queue, and its
+    own thread.
+
+    """
+
+    default_max_queue = 10000
+    default_overflow = "block"
+
+    overflow_policies = ("block", "drop-oldest", "drop-newest")
+
+    close_order = 0
+
+    def __init__(self, max_queue=None, overflow=None):
+        """Create a new asynchronous writer."""
+        super().__init__()
+        self.max_queue = pick(max_queue, self.default_max_queue)
+        self.overflow = pick(overflow, self.default_overflow)
+        if self.overflow not in self.overflow_policies:
+            raise ValueError("unknown overflow policy: {!r}".format(overflow))
+        if self.max_queue < 1:
+            raise ValueError("max_queue must be at least 1")
+        self.queue = collections.deque()
+        self.condition = threading.Condition()
+        self.unfinished = 0
+        self.dropped = 0
+        self.thread = None
+        self.stopping = False
+
+    def __repr__(self):
+        """Return the representation of the writer."""
+        return "<{0} ({1}/{2} queued, {3} dropped)>".format(
+               type(self).__name__, len(self.queue), self.max_queue,
+               self.dropped)
+
+    def __len__(self):
+        """Return the number of queued operations."""
+        return len(self.queue)
+
+    def submit(self, func, *args):
+        """Queue func(*args) to be run by the writer thread."""
+        with self.condition:
+            if self.thread is None or self.closed:
+                self._start()
+            queue = self.queue
+            while len(queue) >= self.max_queue:
+                if self.overflow == "drop-newest":
+                    self.dropped += 1
+                    return
+                if self.overflow == "drop-oldest":
+                    queue.popleft()
+                    self.unfinished -= 1
+                    self.dropped += 1
+                elif threading.current_thread() is self.thread:
+                    break # don't wait for ourselves
+                else:
+                    self.condition.wait()
+            queue.append((func, args))
+            self.unfinished += 1
+            self.condition.notify_all()
+
+    def _start(self):
+        """Start the writer thread. This is called with the lock held."""
+        if self.closed:
+            self.closed = False
+            _open_objects.add(self)
+        self.stopping = False
+        self.thread = threading.Thread(target=self._run, daemon=True,
+                                       name="{0}-{1}".format(
+                                       type(self).__name__, id(self)))
+        self.thread.start()
+
+    def _run(self):
+        """Run the queued operations until the writer is closed."""
+        condition = self.condition
+        queue = self.queue
+        while True:
+            with condition:
+                while not queue and not self.stopping:
+                    condition.wait()
+                if not queue: # stopping and drained
+                    return
+                func, args = queue.popleft()
+                condition.notify_all() # there's room for one more
+
+            try:
+                func(*args)
+            except Exception:
+                traceback.print_exc()
+            finally:
+                with condition:
+                    self.unfinished -= 1
+                    condition.notify_all()
+
+    def flush(self):
+        """Wait until all the queued operations have been run."""
+        with self.condition:
+            if threading.current_thread() is self.thread:
+                return
+            while self.unfinished > 0 and self.thread is not None:
+                self.condition.wait()
+
+    def after_fork(self):
+        """Forget the queue and thread of the parent process.
+
+        The queued operations are run by the parent, and the thread only
+        exists there; a new one is started on the next submission.
+
+        """
+        self.queue = collections.deque()
+        self.condition = threading.Condition()
+        self.unfinished = 0
+        self.thread = None
+        self.stopping = False
+
+    def close(self):
+        """Run all the queued operations, then stop the writer thread."""
+        self.flush()
+        with self.condition:
+            thread = self.thread
+            self.stopping = True
+            self.condition.notify_all()
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+        with self.condition:
+            self.thread = None
+            super().close()
+
+class TerminalWidth:
+    """Cached width of the terminal, in columns.
+
+    Querying the terminal size is a system call, plus a couple of
+    environment lookups. The width is instead cached, and refreshed
+    after 'ttl' seconds.
+
+    If 'handle_signal' is True, the width is also refreshed as soon as
+    the terminal is resized, on platforms which send SIGWINCH. This
+    installs a process-wide signal handler, so it is off by default
+    (including for the 'terminal_width' instance used by the loggers).
+    The handler is only installed from the main thread, and only if
+    there's no handler already, in which case the time to live is the
+    only refresh mechanism.
+
+    """
+
+    default_ttl = 1.0
+    default_handle_signal = False
+
+    def __init__(self, ttl=None, handle_signal=None):
+        """Create a new terminal width cache."""
+        self.ttl = pick(ttl, self.default_ttl)
+        self.handle_signal = pick(handle_signal, self.default_handle_signal)
+        self.value = None
+        self.expires = 0.0
+        self.handler_installed = False
+
+    def __repr__(self):
+        """Return the representation of the cache."""
+        return "<{0} ({1!r} columns)>".format(type(self).__name__, self.value)
+
+    def __call__(self):
+        """Return the width of the terminal."""
+        now = time.monotonic()
+        if self.value is None or now >= self.expires:
+            if self.handle_signal and not self.handler_installed:
+                self._install_handler()
+            self.value = shutil.get_terminal_size().columns
+            self.expires = now + self.ttl
+        return self.value
+
+    def _install_handler(self):
+        """Install the SIGWINCH handler, if possible."""
+        self.handler_installed = True
+        if not hasattr(signal, "SIGWINCH"):
+            return
+        if threading.current_thread() is not threading.main_thread():
+            self.handler_installed = False # try again later
+            return
+        if signal.getsignal(signal.SIGWINCH) in (signal.SIG_DFL, None):
+            signal.signal(signal.SIGWINCH, self.invalidate)
+
+    def invalidate(self, signum=None, frame=None):
+        """Refresh the width on the next call."""
+        self.value = None
+
+terminal_width = TerminalWidth()
@@ -13,18 +13,105 @@ __all__ = [
            "TypeLogger", "TranslatedTypeLogger",        # type-based loggers
            "LevelLogger", "TranslatedLevelLogger",      # level-based loggers
            "NamesLogger", "TranslatedNamesLogger",      # names-based loggers
+           "AsyncBaseLogger", "AsyncTranslatedBaseLogger",  # asyncio loggers
+           "AsyncTypeLogger", "AsyncTranslatedTypeLogger",
+           "AsyncLevelLogger", "AsyncTranslatedLevelLogger",
+           "AsyncNamesLogger", "AsyncTranslatedNamesLogger",
+           "LogBatch",                                  # batched output
           ]
 
-import datetime
-import shutil
+import collections
+import functools
+import traceback
+import asyncio
 import time
+import math
 import sys
+import os
 import re
 
+from typing import Any, Dict, Set, Tuple
+
 from . import bypassers
 
-from .decorators import handle_bypass, check_bypass
-from .utilities import pick
+from .decorators import handle_bypass, check_bypass, bypass_state
+from .utilities import pick, iter_lines, iter_split
+from .io import FilePool, Rotation, ConsoleSink, AsyncWriter, terminal_width
+from .binary import BinaryPool
+from .timestamps import TimestampFormatter
+from .records import Record
+from .sets import Domain
+from .types import NoValue
+
+class LogBatch:
+    """Collect the output of a logger, to write it all at once.
+
+    While a batch is active on a logger (as a context manager), the
+    lines written from the same thread to files and to the screen are
+    kept and grouped by destination, then written when the batch ends,
+    with one call for each file and each screen output. The bypassers
+    evaluated for each type are also kept for the duration of the batch,
+    in 'bypassed'.
+
+    Batches can be nested; only the outermost one writes the output.
+
+    """
+
+    def __init__(self, logger):
+        """Create a new batch for the logger."""
+        self.logger = logger
+        self.outer = None
+        self.files = collections.OrderedDict()
+        self.screens = collections.OrderedDict()
+        self.bypassed = {}
+
+    def __enter__(self):
+        """Start collecting the output of the logger."""
+        self.outer = self.logger._batch
+        if self.outer is None:
+            self.logger._batch = self
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """Write all the collected output, then stop collecting."""
+        if self.outer is None:
+            self.logger._batch = None
+            self.flush()
+
+    @staticmethod
+    def unpack(record, kwargs):
+        """Return the (args, kwargs) pair for logging the record."""
+        if isinstance(record, Record):
+            if record.options:
+                kwargs = dict(kwargs, **record.options)
+            return (record,), kwargs
+        if isinstance(record, tuple):
+            return record, kwargs
+        return (record,), kwargs
+
+    def write(self, file, lines, encoding, errors):
+        """Add the lines to those of the file."""
+        key = (file, encoding, errors)
+        if key not in self.files:
+            self.files[key] = []
+        self.files[key].extend(lines)
+
+    def display(self, encoding, errors, parts):
+        """Add the parts to those of the screen."""
+        key = (encoding, errors)
+        if key not in self.screens:
+            self.screens[key] = []
+        self.screens[key].extend(parts)
+
+    def flush(self):
+        """Write all the collected output."""
+        logger = self.logger
+        for (encoding, errors), parts in self.screens.items():
+            logger._submit(logger._console(encoding, errors).writelines, parts)
+        for (file, encoding, errors), lines in self.files.items():
+            logger._submit(logger.handles.write, file, lines, encoding, errors)
+        self.screens.clear()
+        self.files.clear()
 
 class BaseLogger:
     """Base Logger class for your everyday needs.
@@ -92,6 +179,138 @@ class BaseLogger:
 
         Default:    True
 
+    max_files:
+                    Maximum number of log files which will be kept
+                    open at the same time. Files are kept open between
+                    calls to avoid re-opening them for every line; the
+                    least recently used file is closed when this limit
+                    is reached. Call the close() method or use the
+                    logger as a context manager to close them all.
+
+        Default:    16
+
+    autoflush:
+                    Boolean value to determine if the files should be
+                    flushed after every write. If False, lines are
+                    flushed when calling flush() or close(), when the
+                    file is closed to make room for another one, and
+                    at interpreter exit.
+
+        Default:    True
+
+    flush_lines:
+                    Number of lines printed to screen after which the
+                    output is flushed. If 0, the output is only flushed
+                    when calling flush() or close(), and at interpreter
+                    exit; see also the flush_interval parameter.
+
+        Default:    1
+
+    flush_interval:
+                    Number of seconds after which the lines printed to
+                    screen are flushed, if they haven't been already.
+                    If None, only the flush_lines parameter is used.
+
+        Default:    None
+
+    background:
+                    Boolean value to determine if printing to screen
+                    and writing to files should be done on a background
+                    thread. The lines are still formatted on the thread
+                    calling the logger, and are then put in a queue;
+                    the call returns without waiting for them to be
+                    written. flush() and close() wait until every line
+                    in the queue has been written.
+
+        Default:    False
+
+    max_queue:
+                    Maximum number of pending writes in the background
+                    queue, when 'background' is True.
+
+        Default:    10000
+
+    overflow:
+                    What to do when the background queue is full; one
+                    of "block" (wait for the queue to have room),
+                    "drop-oldest" (discard the oldest pending write)
+                    or "drop-newest" (discard the new write). Dropped
+                    writes are counted in the writer's 'dropped'
+                    attribute (e.g. logger.writer.dropped).
+
+        Default:    "block"
+
+    binary:
+                    Boolean value to determine if the files should be
+                    written as memory-mapped binary logs instead of
+                    text files (see the 'binary' submodule). The time
+                    of each line is then kept as an integer, and the
+                    timestamp is only formatted when reading the log
+                    back, for instance with binary.to_text(), which
+                    gives the same text as the text files would hold.
+
+        Default:    False
+
+    segment_size:
+                    Size, in bytes, of the segments of the binary logs,
+                    when 'binary' is True. A new segment is started
+                    when the current one is full.
+
+        Default:    16777216
+
+    max_bytes:
+                    Size, in bytes, that the log files may not exceed.
+                    A file is rotated (renamed with the time appended
+                    to its name, and a new file started) right before
+                    writing lines which would make it grow past this
+                    size. If None, the size of the files isn't limited.
+                    Rotation (this and the four parameters below)
+                    applies to text files; binary logs (see 'binary')
+                    are already split into segments.
+
+        Default:    None
+
+    max_age:
+                    Number of seconds after which a log file is
+                    rotated. If None, the age of files isn't limited.
+
+        Default:    None
+
+    daily:
+                    Boolean value to determine if the log files should
+                    be rotated when the day changes, in local time or
+                    in UTC, according to 'use_utc'.
+
+        Default:    False
+
+    backups:
+                    Number of rotated files to keep for each log file;
+                    older ones are removed. If None, all rotated files
+                    are kept.
+
+        Default:    None
+
+    compress:
+                    Compression to apply to rotated files: "gzip",
+                    "bz2", "lzma", or a callable given the path of the
+                    rotated file (see io.Rotation). Compression and the
+                    removal of old files happen on a background thread
+                    and never block the logger. If None, the rotated
+                    files are not compressed.
+
+        Default:    None
+
+    collector:
+                    A started collector.Collector instance, which will
+                    write the files for the logger, and for every other
+                    process using it. The files are then opened by the
+                    collector's process only, and the file-related
+                    parameters above are those of the collector; only
+                    'autoflush' is used by the logger, to decide if the
+                    lines are sent right away or in batches.
+
+        Default:    None
+
     bypassers:
                     This is an iterable of (setting, types, pairs,
                     module, attr) iterables. 'types' is an iterable of
@@ -115,8 +334,12 @@ class BaseLogger:
                     if not given as such. They can, however, be any
                     other object with the same API as sets. This is
                     done to allow the values to be modified and for the
-                    modifications to carry over to the bypassers. Do
-                    note that this parameter expects an iterable of
+                    modifications to carry over to the bypassers. The
+                    bypassers are compiled for speed, so they need to
+                    know about such modifications: bypassers.TrackedSet
+                    instances notify them, while for other sets, the
+                    bypassers' touch() method must be called afterwards.
+                    Do note that this parameter expects an iterable of
                     five-tuples, or an empty iterable.
 
         Default:    See below
@@ -179,12 +402,57 @@ class BaseLogger:
     default_ts_format = "[%Y-%m-%d] (%H:%M:%S {tzoffset})"
     default_split = True
 
+    default_max_files = 16
+    default_autoflush = True
+    default_flush_lines = 1
+    default_flush_interval = None
+
+    default_background = False
+    default_max_queue = 10000
+    default_overflow = "block"
+
+    default_binary = False
+    default_segment_size = 1 << 24
+
+    default_max_bytes = None
+    default_max_age = None
+    default_daily = False
+    default_backups = None
+    default_compress = None
+
     default_bypassers_handler = bypassers.BaseBypassers
 
+    @property
+    def bypassed(self):
+        """The settings bypassed for the call running in this thread."""
+        return bypass_state(self).bypassed
+
+    @bypassed.setter
+    def bypassed(self, value):
+        bypass_state(self).bypassed = value
+
+    @bypassed.deleter
+    def bypassed(self):
+        del bypass_state(self).bypassed
+
+    @property
+    def _batch(self):
+        """The LogBatch active in this thread, if any."""
+        return getattr(bypass_state(self), "batch", None)
+
+    @_batch.setter
+    def _batch(self, batch):
+        bypass_state(self).batch = batch
+
     def __init__(self, *, sep=None, linesep=None, end=None, use_utc=None,
                  ts_format=None, print_ts=None, split=None, tabsize=None,
                  display=None, write=None, encoding=None, errors=None,
-                 bypassers=None, bypassers_handler=None, **kwargs):
+                 max_files=None, autoflush=None, flush_lines=None,
+                 flush_interval=None, background=None, max_queue=None,
+                 overflow=None, binary=None, segment_size=None,
+                 max_bytes=None, max_age=None, daily=None, backups=None,
+                 compress=None, collector=None, bypassers=None,
+                 bypassers_handler=None, **kwargs):
         """Create a new base instance."""
 
         super().__init__(**kwargs)
@@ -213,6 +481,45 @@ class BaseLogger:
         self.print_ts = pick(print_ts, self.default_print_ts)
         self.ts_format = pick(ts_format, self.default_ts_format)
         self.split = pick(split, self.default_split)
+        self.ts_formatters = {}
+
+        # File handling settings
+
+        self.binary = pick(binary, self.default_binary)
+        if collector is not None:
+            self.binary = collector.binary
+            self.handles = collector.client(autoflush)
+        elif self.binary:
+            self.handles = BinaryPool(pick(max_files, self.default_max_files),
+                                      pick(autoflush, self.default_autoflush),
+                                      pick(segment_size,
+                                           self.default_segment_size))
+        else:
+            rotation = Rotation(pick(max_bytes, self.default_max_bytes),
+                                pick(max_age, self.default_max_age),
+                                pick(daily, self.default_daily),
+                                self.use_utc,
+                                pick(backups, self.default_backups),
+                                pick(compress, self.default_compress))
+            if (rotation.max_bytes is None and rotation.max_age is None and
+                    not rotation.daily):
+                rotation = None
+            self.handles = FilePool(pick(max_files, self.default_max_files),
+                                    pick(autoflush, self.default_autoflush),
+                                    rotation, self._backups)
+
+        # Screen handling settings
+
+        self.flush_lines = pick(flush_lines, self.default_flush_lines)
+        self.flush_interval = pick(flush_interval, self.default_flush_interval)
+        self.consoles = {}
+
+        # Background writing settings
+
+        self.writer = None
+        if pick(background, self.default_background):
+            self.writer = AsyncWriter(pick(max_queue, self.default_max_queue),
+                                      pick(overflow, self.default_overflow))
 
         # Setting bypassing settings
 
@@ -222,6 +529,66 @@ class BaseLogger:
         self.bypassers = bypassers_handler.from_iterable(bypassers)
         self.bypassers.add("timestamp", "splitter", "display", "write")
 
+    def __enter__(self):
+        """Use the logger as a context manager, closing it on exit."""
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """Close all the files opened by the logger."""
+        self.close()
+
+    def flush(self):
+        """Flush the screen output and all the files opened by the logger."""
+        if self.writer is not None:
+            self.writer.flush()
+        for console in self.consoles.values():
+            console.flush()
+        self.handles.flush()
+
+    def close(self):
+        """Flush the screen output and close all the logger's files."""
+        if self.writer is not None:
+            self.writer.close()
+        for console in self.consoles.values():
+            console.close()
+        self.consoles.clear()
+        self.handles.close()
+
+    def _backups(self, file):
+        """Return how many rotated files to keep, if not the default."""
+        return None
+
+    def _console(self, encoding, errors):
+        """Return the screen sink for the encoding and error handler."""
+        try:
+            return self.consoles[encoding, errors]
+        except KeyError:
+            console = ConsoleSink(encoding, errors, self.flush_lines,
+                                  self.flush_interval)
+            self.consoles[encoding, errors] = console
+            return console
+
+    def _submit(self, func, *args):
+        """Run func(*args) now, or on the background writer if enabled."""
+        if self.writer is None:
+            func(*args)
+        else:
+            self.writer.submit(func, *args)
+
+    def _write(self, file, lines, encoding=None, errors=None):
+        """Append the lines to the file, using the handles pool."""
+        if self._batch is not None:
+            self._batch.write(file, lines, encoding, errors)
+        else:
+            self._submit(self.handles.write, file, lines, encoding, errors)
+
+    def _display(self, encoding, errors, parts):
+        """Write the parts to the screen, as a single write."""
+        if self._batch is not None:
+            self._batch.display(encoding, errors, parts)
+        else:
+            self._submit(self._console(encoding, errors).writelines, parts)
+
     @handle_bypass
     def _get_timestamp(self, use_utc=None, ts_format=None):
         """Return a timestamp with timezone + offset from UTC."""
@@ -231,48 +598,69 @@ class BaseLogger:
         if not ts_format or "timestamp" in self.bypassed:
             return self.bypassed.get("timestamp", "")
 
-        if use_utc:
-            tmf = datetime.datetime.utcnow().strftime(ts_format)
-            tz = "UTC"
-            offset = "+0000"
-        else:
-            tmf = time.strftime(ts_format)
-            tz = time.tzname[0]
-            offset = "+"
-            if datetime.datetime.utcnow().hour > datetime.datetime.now().hour:
-                offset = "-"
-            offset += str(time.timezone // 36).zfill(4)
-        return tmf.format(tzname=tz, tzoffset=offset).strip().upper()
+        try:
+            formatter = self.ts_formatters[ts_format, use_utc]
+        except KeyError:
+            formatter = TimestampFormatter(ts_format, use_utc)
+            self.ts_formatters[ts_format, use_utc] = formatter
+        return formatter()
+
+    def _entries(self, kind, prefix, lines, use_utc=None, ts_format=None):
+        """Return the binary log entries for the lines, timestamped."""
+        use_utc = pick(use_utc, self.use_utc)
+        ts_format = pick(ts_format, self.ts_format)
+        now = time.time_ns()
+
+        if not ts_format or "timestamp" in self.bypassed:
+            prefix = self.bypassed.get("timestamp", "") + prefix
+            return [(now, kind, None, prefix + line) for line in lines]
+
+        format = (ts_format, use_utc)
+        return [(now, kind, format, prefix + line) for line in lines]
 
     def _split_lines(self, out):
         """Split long lines at clever points."""
-        col = shutil.get_terminal_size().columns
-        lines = [line.rstrip(" ") for line in out.splitlines()]
-        splines = [line.split(" ") for line in lines]
-        newlines = [] # newline-separated lines
-        for i, line in enumerate(lines):
+        return "\n".join(self._wrap_lines(iter_lines(out), terminal_width()))
+
+    @staticmethod
+    def _wrap_lines(lines, col):
+        """Yield the lines, wrapped at the last space before 'col'."""
+        for line in lines:
+            line = line.rstrip(" ")
             if len(line) <= col:
-                newlines.append(line)
+                yield line
                 continue
-            newstr = ""
-            for word in splines[i]:
-                if newstr:
-                    new = " ".join((newstr, word))
-                else:
-                    new = word
-                if len(new) >= col and word != new:
-                    newlines.append(newstr)
-                    newstr = word
-                elif len(new) >= col and word == new:
-                    if newstr:
-                        newlines.append(newstr)
-                    newlines.append(new)
-                    newstr = ""
+            words = [] # the current line is " ".join(words)
+            length = 0
+            for word in iter_split(line, " "):
+                if not length:
+                    if len(word) >= col:
+                        yield word
+                        words = []
+                    else:
+                        words = [word]
+                        length = len(word)
+                elif length + 1 + len(word) >= col:
+                    yield " ".join(words)
+                    words = [word]
+                    length = len(word)
                 else:
-                    newstr = new
-            if newstr:
-                newlines.append(newstr)
-        return "\n".join(newlines)
+                    words.append(word)
+                    length += 1 + len(word)
+            if length:
+                yield " ".join(words)
+
+    @staticmethod
+    def _join_lines(lines, end):
+        """Yield the lines separated by newlines, followed by 'end'."""
+        lines = iter(lines)
+        for line in lines:
+            yield line
+            break
+        for line in lines:
+            yield "\n"
+            yield line
+        yield end
 
     @handle_bypass
     def _print(self, *output, sep=None, use_utc=None, ts_format=None,
@@ -285,24 +673,23 @@ class BaseLogger:
         errors = pick(errors, self.errors)
         end = pick(end, self.end)
 
-        output = sep.join(str(x) for x in output)
+        output = Record.from_output(output, sep).text
+        lines = None
 
         if pick(print_ts, self.print_ts):
-            out = output.splitlines()
             ts = self._get_timestamp(use_utc, ts_format)
-            for i, line in enumerate(out):
-                out[i] = " ".join((ts, line))
-            output = "\n".join(out)
+            lines = (" ".join((ts, line)) for line in iter_lines(output))
 
         if self.bypassed.get("splitter", pick(split, self.split)):
-            output = self._split_lines(output)
-
-        with open(sys.stdout.fileno(), "w", errors=errors,
-                  encoding=encoding, closefd=False) as file:
+            lines = self._wrap_lines(pick(lines, iter_lines(output)),
+                                     terminal_width())
 
-            file.write(output + end)
+        if lines is None:
+            parts = (output, end)
+        else:
+            parts = self._join_lines(lines, end)
 
-            file.flush()
+        self._display(encoding, errors, parts)
 
     @check_bypass
     def logger(self, *output, sep=None, file=None, split=None,
@@ -314,15 +701,42 @@ class BaseLogger:
         errors = pick(errors, self.errors)
         display = pick(display, self.display)
         write = pick(write, self.write)
-        output = sep.join(str(x) for x in output)
+        record = Record.from_output(output, sep)
 
         if display:
-            self._print(output, sep=sep, use_utc=use_utc, ts_format=ts_format,
+            self._print(record, sep=sep, use_utc=use_utc, ts_format=ts_format,
                                 print_ts=print_ts, split=split, errors=errors)
 
         if write and file is not None:
-            with open(file, "a", encoding=encoding, errors=errors) as f:
-                f.write(output + "\n")
+            if self.binary:
+                lines = [(time.time_ns(), "", None, record.text)]
+            else:
+                lines = (record.text + "\n",)
+            self._write(file, lines, encoding, errors)
+
+    def log_many(self, records, **kwargs):
+        """Log many lines at once.
+
+        Each record is either a Record instance, a tuple of arguments, or
+        a single argument, which is logged by calling the logger method.
+        The keyword arguments are given to every call, and the 'options'
+        of Record instances are added to them. The lines written to each
+        file are written all at once at the end, and so are the lines
+        displayed on screen. The bypassers are also only evaluated once
+        (per type, for the type-based loggers).
+
+        """
+
+        with LogBatch(self):
+            for record in records:
+                args, options = LogBatch.unpack(record, kwargs)
+                self.logger(*args, **options)
+
+        return self._done()
+
+    def _done(self):
+        """Return the result of the logging methods; None by default."""
+        return None
 
     def docstring(self, *output, tabsize=None, display=True, write=False,
                   sep=None, **kwargs):
@@ -355,7 +769,8 @@ class BaseLogger:
         while lines and not lines[0].strip():
             lines.pop(0)
 
-        self.logger(*lines, display=display, write=write, sep=sep, **kwargs)
+        return self.logger(*lines, display=display, write=write, sep=sep,
+                           **kwargs)
 
 class Translater:
     """Logging class to use to translate lines.
@@ -480,6 +895,15 @@ class Translater:
     and be potentially translated, pass the "check" keyword argument
     with a True value, or use the "check" setting of the bypassers.
 
+    Note on the catalog: Translations are looked up once per line and
+    language, and the result is kept in the 'catalog' mapping of
+    {(language, line): translation} pairs; lines without a translation
+    are kept in the 'untranslated' set, so that they aren't looked up
+    again either. After modifying the translation modules, or the
+    'module', 'modules', 'first' or 'main' attributes, the catalog needs
+    to be cleared with the clear_catalog() method. The load_catalog()
+    method can be used to look up a set of lines in advance.
+
     Note on translating: The translated lines can take new-style
     formatting with {0} or similar; it can use list indexes, regular
     indexes or named indexes like {foo}. Assign an ordered iterable for
@@ -570,78 +994,127 @@ class Translater:
         self.first = pick(first, self.default_first)
         self.pattern = re.compile(pick(pattern, self.default_pattern))
 
+        self.catalog = {} # type: Dict[Tuple[str, str], Any]
+        self.untranslated = set() # type: Set[Tuple[str, str]]
+
         self.bypassers.add("check", "translate")
-        # the API for the bypassers has changed, so this needs to be updated
-        self.bypassers.update(("translate",) +
-                self.bypassers("translate")[:-2] + (None, True))
+
+    @staticmethod
+    def _copy(name, new):
+        """Copy name using its class' copy method, or 'new'."""
+        return getattr(name.__class__, "copy", new)(name)
+
+    @staticmethod
+    def _enum(iterable):
+        """Return the (index, line) or (key, line) pairs of iterable."""
+        if hasattr(iterable, "items"):
+            return list(iterable.items())
+        return enumerate(iterable)
+
+    @staticmethod
+    def _get_line(module, other, fallback):
+        """Return module[other] or module.other, or fallback."""
+        try:
+            value = module[other]
+        except (TypeError, KeyError, IndexError):
+            try:
+                value = getattr(module, other)
+            except AttributeError:
+                return fallback
+        return value
+
+    def _lookup(self, line, language):
+        """Look up the translation of line in the modules."""
+        get_line = self._get_line
+        original = line
+        module = None
+        lang = None
+        if self.module is not None:
+            if self.first == "line":
+                module = get_line(self.module, line, original)
+            else:
+                module = get_line(self.module, language,
+                         get_line(self.module, self.main, original))
+
+        if module is None and self.modules is not None:
+            lang = self.modules.get(language)
+            if lang is not None:
+                module = get_line(lang, line, original)
+
+        if module is not None:
+            if lang is None:
+                if self.first == "line":
+                    line = get_line(module, language,
+                           get_line(module, self.main, original))
+                else:
+                    line = get_line(module, line, original)
+
+            else:
+                line = module
+
+        return line
+
+    def get_translation(self, line, language):
+        """Return the translation of line, or None if there is none."""
+        key = (language, line)
+        try:
+            return self.catalog[key]
+        except KeyError:
+            pass
+
+        if key in self.untranslated or self.pattern.search(line) is None:
+            return None
+
+        value = self._lookup(line, language)
+        if value == line:
+            self.untranslated.add(key)
+            return None
+
+        self.catalog[key] = value
+        return value
+
+    def load_catalog(self, lines, languages=None):
+        """Look up the lines in advance, for all languages by default."""
+        for language in pick(languages, self.all_languages):
+            for line in lines:
+                self.get_translation(line, language)
+
+    def clear_catalog(self):
+        """Forget all translations that were looked up."""
+        self.catalog.clear()
+        self.untranslated.clear()
 
     def translate(self, output, language, format, format_dict, format_mod):
         """Translate a line into the desired language."""
 
         # TODO: Use the interpolate submodule for translation and interpolation
 
-        def copy(name, new):
-            return getattr(name.__class__, "copy", new)(name)
-
-        format = copy(format, list)
-        format_dict = copy(format_dict, dict)
+        format = self._copy(format, list)
+        format_dict = self._copy(format_dict, dict)
 
         if isinstance(format_mod, tuple):
             format_mod = list(format_mod)
         else: # TODO: support dict or drop support altogether. perhaps add our own interpolation mechanism
             format_mod = [str(format_mod)]
 
-        def enum(iterable):
-            if hasattr(iterable, "items"):
-                return list(iterable.items())
-            return enumerate(iterable)
-
-        def get_line(module, other, fallback):
-            try:
-                value = module[other]
-            except (TypeError, KeyError, IndexError):
-                try:
-                    value = getattr(module, other)
-                except AttributeError:
-                    return fallback
-            return value
+        get_translation = self.get_translation
 
         for iterable in (format, format_dict, format_mod, output):
-            for i, line in enum(iterable):
-                if self.pattern.search(line) is None:
+            for i, line in self._enum(iterable):
+                line = get_translation(line, language)
+                if line is None:
                     continue
-                original = line
-                module = None
-                lang = None
-                if self.module is not None:
-                    if self.first == "line":
-                        module = get_line(self.module, line, original)
-                    else:
-                        module = get_line(self.module, language,
-                                 get_line(self.module, self.main, original))
-
-                if module is None and self.modules is not None:
-                    lang = self.modules.get(language)
-                    if lang is not None:
-                        module = get_line(lang, line, original)
-
-                if module is not None:
-                    if lang is None:
-                        if self.first == "line":
-                            line = get_line(module, language,
-                                   get_line(module, self.main, original))
-                        else:
-                            line = get_line(module, line, original)
-
-                    else:
-                        line = module
 
-                if line != original and iterable == output:
-                    format_mod = tuple(format_mod)
-                    line = line.format(*format, **format_dict) % format_mod
+                if iterable is output:
+                    line = line.format(*format, **format_dict) % tuple(format_mod)
 
                 iterable[i] = line
 
+    def _translated(self, language, format, format_dict, format_mod, lines):
+        """Translate the lines of a record and return them."""
+        self.translate(lines, language, format, format_dict, format_mod)
+        return lines
+
     @check_bypass
     def logger(self, *output, file=None, check=None, language=None,
                format=None, format_dict=None, format_mod=None, display=None,
@@ -657,28 +1130,242 @@ class Translater:
         format_dict = pick(format_dict, {})
         format_mod = pick(format_mod, ())
 
-        output = [str(x) for x in output] or [""]
+        sep = pick(kwargs.pop("sep", None), self.separator)
+
+        if len(output) == 1 and isinstance(output[0], Record):
+            # e.g. from multiple() or log_many(); translate its arguments
+            output, sep = output[0].args, output[0].sep
 
         if ("translate" not in self.bypassed and check and
                                language != self.main):
 
-            trout = output[:]
-            self.translate(trout, language, format, format_dict, format_mod)
+            trout = Record(output, sep, functools.partial(self._translated,
+                           language, format, format_dict, format_mod))
 
-            trfile = self.all_languages[language] + "_" + file
+            head, tail = os.path.split(file)
+            trfile = os.path.join(head, self.all_languages[language] + "_" + tail)
 
-            super().logger(*trout, file=trfile, display=display, **kwargs)
+            super().logger(trout, file=trfile, display=display, sep=sep,
+                           **kwargs)
 
             display = self.bypassed.get("display", False)
 
+        transform = None
         if check:
-            self.translate(output, self.main, format, format_dict, format_mod)
+            transform = functools.partial(self._translated, self.main,
+                                          format, format_dict, format_mod)
+
+        super().logger(Record(output, sep, transform), file=file,
+                       display=display, sep=sep, **kwargs)
+
+class Asynchronous:
+    """Logging class to use the loggers from asyncio code.
+
+    The logging methods (logger(), log_many(), multiple(), ...) do all
+    the work but the I/O right away, exactly as the other loggers do,
+    bypassers and translation included, and return a future. Printing
+    to screen and writing to files is left to a writer task, which runs
+    the pending writes in an executor, in order, so that the event loop
+    is never blocked by I/O.
+
+    The future can be awaited, or ignored (fire-and-forget). It is done
+    as soon as there are less than 'max_queue' pending writes; awaiting
+    it thus slows down the coroutines logging faster than the lines can
+    be written. Writes made by callers which don't await the future are
+    subject to the 'overflow' parameter, when 'max_queue' writes are
+    pending: "block" keeps them anyway, while "drop-oldest" and
+    "drop-newest" discard writes (counting them in 'dropped').
+
+    aflush() waits until all pending writes are done, and aclose() does
+    the same before closing the files; the logger can also be used as
+    an asynchronous context manager. The synchronous flush() and close()
+    methods do the pending writes on the spot. Lines logged outside of a
+    running event loop (or from another thread) are written right away,
+    as with the other loggers, and the methods then return None.
+
+    The options are the same as the other loggers, with this addition:
+
+    executor:
+                    The concurrent.futures executor in which to run the
+                    writes. If None, the loop's default executor is
+                    used.
+
+        Default:    None
+
+    """
+
+    default_executor = None
 
-        super().logger(*output, file=file, display=display, **kwargs)
+    def __init__(self, *, executor=None, max_queue=None, overflow=None,
+                 **kwargs):
+        """Create a new asynchronous logger."""
+
+        super().__init__(max_queue=max_queue, overflow=overflow, **kwargs)
+
+        self.executor = pick(executor, self.default_executor)
+        self.max_queue = pick(max_queue, self.default_max_queue)
+        self.overflow = pick(overflow, self.default_overflow)
+        if self.overflow not in AsyncWriter.overflow_policies:
+            raise ValueError("unknown overflow policy: {!r}".format(overflow))
+
+        self.pending = collections.deque()
+        self.dropped = 0
+        self._running = 0 # number of writes being run in the executor
+        self._loop = None
+        self._task = None
+        self._wakeup = None
+        self._waiters = collections.deque() # futures waiting for room
+        self._idle = collections.deque() # futures waiting for the writes
+
+    async def __aenter__(self):
+        """Use the logger as an asynchronous context manager."""
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        """Write all the pending lines, then close the files."""
+        await self.aclose()
+
+    def logger(self, *output, **kwargs):
+        """Log the line, returning a future (see the class docstring)."""
+        super().logger(*output, **kwargs)
+        return self._done()
+
+    logger.passthrough = True # this only wraps the actual logger method
+
+    def _done(self):
+        """Return a future which is done when there's room for writes."""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return None
+        future = loop.create_future()
+        if loop is not self._loop or self._backlog() < self.max_queue:
+            future.set_result(None)
+        else:
+            self._waiters.append(future)
+        return future
+
+    def _backlog(self):
+        """Return the number of writes which are not done yet."""
+        return len(self.pending) + self._running
+
+    def _submit(self, func, *args):
+        """Queue func(*args) for the writer task, or run it right away."""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return super()._submit(func, *args)
+
+        if loop is not self._loop or self._task is None or self._task.done():
+            self._start(loop)
+
+        pending = self.pending
+        if len(pending) >= self.max_queue:
+            if self.overflow == "drop-newest":
+                self.dropped += 1
+                return
+            if self.overflow == "drop-oldest":
+                pending.popleft()
+                self.dropped += 1
+        pending.append((func, args))
+        self._wakeup.set()
+
+    def _start(self, loop):
+        """Start the writer task in the loop."""
+        self._run(self._take()) # left by a previous loop, if any
+        self._loop = loop
+        self._wakeup = asyncio.Event()
+        self._waiters.clear()
+        self._idle.clear()
+        self._task = loop.create_task(self._writer())
+
+    def _take(self):
+        """Return the pending writes, and forget them."""
+        writes = list(self.pending)
+        self.pending.clear()
+        return writes
+
+    def _run(self, writes):
+        """Run the writes. This is done in the executor."""
+        for func, args in writes:
+            try:
+                func(*args)
+            except Exception:
+                traceback.print_exc()
+
+    async def _writer(self):
+        """Run the pending writes in the executor, in order."""
+        loop = asyncio.get_running_loop()
+        while True:
+            if not self.pending:
+                self._release(self._idle, len(self._idle))
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            writes = self._take()
+            self._running = len(writes)
+            try:
+                await loop.run_in_executor(self.executor, self._run, writes)
+            finally:
+                self._running = 0
+            self._release(self._waiters, self.max_queue - self._backlog())
+
+    @staticmethod
+    def _release(futures, count):
+        """Mark up to 'count' of the futures as done."""
+        while futures and count > 0:
+            future = futures.popleft()
+            if not future.done():
+                future.set_result(None)
+                count -= 1
+
+    async def aflush(self):
+        """Wait until the pending writes are done, then flush the files."""
+        loop = asyncio.get_running_loop()
+        if self._loop is loop and self._backlog():
+            future = loop.create_future()
+            self._idle.append(future)
+            self._wakeup.set()
+            await future
+        await loop.run_in_executor(self.executor, super().flush)
+
+    async def aclose(self):
+        """Wait until the pending writes are done, then close the files."""
+        loop = asyncio.get_running_loop()
+        await self.aflush()
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._release(self._waiters, len(self._waiters))
+        await loop.run_in_executor(self.executor, super().close)
+
+    def flush(self):
+        """Do the pending writes, then flush the files. This blocks."""
+        self._run(self._take())
+        super().flush()
+
+    def close(self):
+        """Do the pending writes, then close the files. This blocks."""
+        self._run(self._take())
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        super().close()
 
 class TranslatedBaseLogger(Translater, BaseLogger):
     """Implement translater base logging."""
 
+class AsyncBaseLogger(Asynchronous, BaseLogger):
+    """Implement base logging for asyncio code."""
+
+class AsyncTranslatedBaseLogger(Asynchronous, Translater, BaseLogger):
+    """Implement translater base logging for asyncio code."""
+
 class TypeLogger(BaseLogger):
     """Type-based logger class.
 
@@ -692,6 +1379,14 @@ class TypeLogger(BaseLogger):
 
         Default:    {"normal": "logger.log", "all": "mixed.log"}
 
+    retention:
+                    Dictionary of {type:backups} pairs, overriding the
+                    'backups' parameter for the file of each type, when
+                    the files are rotated. If a file is used by many
+                    types, the largest number is used.
+
+        Default:    {}
+
     Additions to the bypassers:
 
     "logall":
@@ -720,11 +1415,15 @@ class TypeLogger(BaseLogger):
 
     default_logfiles = "normal", "logger.log"
 
-    #default_bypassers_handler = bypassers.TypeBypassers
+    default_bypassers_handler = bypassers.TypeBypassers
 
-    def __init__(self, *, logfiles=None, **kwargs):
+    _bp_handler = "type"
+
+    def __init__(self, *, logfiles=None, retention=None, **kwargs):
         """Create a new type-based logger."""
 
+        self.retention = pick(retention, {})
+
         super().__init__(**kwargs)
 
         type, file = self.default_logfiles
@@ -736,8 +1435,18 @@ class TypeLogger(BaseLogger):
             self.logfiles = logfiles
             logfiles[type] = logfiles.get(type, file)
 
+        # the types are interned as bits, for the bypassers' plans; types
+        # added to the logfiles later are interned when they get bound
+        self.type_domain = Domain(self.logfiles)
+
         self.bypassers.add("logall", "files", "all")
 
+    def _backups(self, file):
+        """Return how many rotated files to keep, if not the default."""
+        counts = [backups for type, backups in self.retention.items()
+                  if self.logfiles.get(type) == file]
+        return max(counts) if counts else None
+
     @check_bypass
     def logger(self, *output, file=None, type=None, display=None, write=None,
                sep=None, split=None, use_utc=None, ts_format=None,
@@ -745,66 +1454,154 @@ class TypeLogger(BaseLogger):
         """Log everything to screen and/or file. Always use this."""
 
         sep = pick(sep, self.separator)
+        self._emit(Record.from_output(output, sep), type, file, display, {},
+                   write=write, sep=sep, split=split, use_utc=use_utc,
+                   ts_format=ts_format, print_ts=print_ts, encoding=encoding,
+                   errors=errors)
+
+    def _emit(self, record, type, file, display, shared, write=None, sep=None,
+              split=None, use_utc=None, ts_format=None, print_ts=None,
+              encoding=None, errors=None):
+        """Display and write the record, with the bypassers evaluated.
+
+        'shared' is a dict in which the values which don't depend on the
+        type (the timestamp, the "all" types, the lines to write) are
+        kept, so that they can be shared when emitting the same record
+        for multiple types.
+
+        """
+
+        bypassed = self.bypassed
         encoding = pick(encoding, self.encoding)
         errors = pick(errors, self.errors)
-        split = self.bypassed.get("splitter", pick(split, self.split))
-        display = self.bypassed.get("display", pick(display, self.display))
-        write = self.bypassed.get("write", pick(write, self.write))
+        split = bypassed.get("splitter", pick(split, self.split))
+        display = bypassed.get("display", pick(display, self.display))
+        write = bypassed.get("write", pick(write, self.write))
 
-        timestamp = self._get_timestamp(use_utc, ts_format)
         # this is the file to write everything to
-        logall = self.bypassed.get("logall")
+        logall = bypassed.get("logall")
 
         if display:
-            self._print(*output, sep=sep, use_utc=use_utc, split=split,
+            self._print(record, sep=sep, use_utc=use_utc, split=split,
                         ts_format=ts_format, print_ts=print_ts, errors=errors)
 
         if write:
-            output = sep.join(str(x) for x in output).splitlines()
-            alines = [x for x in self.logfiles if x in
-                                 self.bypassers("all")[0]]
+            if self.binary:
+                timestamp = None # formatted when reading the log
+            else:
+                key = ("timestamp", bypassed.get("timestamp", NoValue))
+                if key not in shared:
+                    shared[key] = self._get_timestamp(use_utc, ts_format)
+                timestamp = shared[key]
+
+            if logall and "plan" not in shared:
+                shared["plan"] = check_bypass.get_plan(self, typed=True)
+
             getter = [file]
             if logall:
                 getter.append(logall)
             for log in getter:
-                if (log == logall and type not in alines) or log is None:
+                if log is None or (log == logall and (type not in self.logfiles
+                                   or not shared["plan"].bound("all", type))):
                     continue
                 atypes = "type.{0} - ".format(type) if log == logall else ""
-                with open(log, "a", encoding=encoding, errors=errors) as f:
-                    for writer in output:
-                        f.write("{0}{1}{2}\n".format(timestamp, atypes, writer))
+                if timestamp is None:
+                    key = ("entries", type, atypes)
+                    if key not in shared:
+                        shared[key] = self._entries(type, atypes, record.lines,
+                                                    use_utc, ts_format)
+                else:
+                    key = ("lines", timestamp, atypes)
+                    if key not in shared:
+                        shared[key] = ["{0}{1}{2}\n".format(timestamp, atypes,
+                                       writer) for writer in record.lines]
+                self._write(log, shared[key], encoding, errors)
+
+    def multiple(self, *output, types=None, display=None, file=None,
+                 sep=None, **rest):
+        """Log one or more line to multiple files.
+
+        The line is rendered once, the bypassers are evaluated for each
+        type from the compiled plan, and the values that don't depend on
+        the type are shared between them. The files are written in a
+        single pass at the end (see LogBatch).
+
+        """
 
-    def multiple(self, *output, types=None, display=None, **rest):
-        """Log one or more line to multiple files."""
         types = pick(types, ["normal"])
 
         if len(types) == 1 and "*" in types: # allows any iterable
-            for log in self.logfiles:
-                if log not in self.bypassers("files")[0]:
-                    if display:
-                        self.logger(*output, type=log, display=True, **rest)
-                        display = False # display only once
-                    else:
-                        self.logger(*output, type=log, display=False, **rest)
+            plan = check_bypass.get_plan(self, typed=True)
+            types = [log for log in self.logfiles
+                     if not plan.bound("files", log)]
 
-        elif types:
-            for log in types:
-                if display:
-                    self.logger(*output, type=log, display=True, **rest)
-                    display = False
-                else:
-                    self.logger(*output, type=log, display=False, **rest)
+        elif not types:
+            return self.logger(*output, display=display, file=file, sep=sep,
+                               **rest)
 
-        else:
-            self.logger(*output, display=display, **rest)
+        sep = pick(sep, self.separator)
+        record = Record.from_output(output, sep)
+
+        if self._logger_extended():
+            # the logger method is extended (e.g. to translate lines)
+            with LogBatch(self):
+                for log in types:
+                    self.logger(record, type=log, display=bool(display),
+                                file=file, sep=sep, **rest)
+                    display = False # display only once
+            return self._done()
+
+        plan = check_bypass.get_plan(self, typed=True)
+        logfiles = self.logfiles
+        shared = {}
+
+        with LogBatch(self):
+            for log in types:
+                self.bypassed = plan.evaluate(log)
+                try:
+                    self._emit(record, log, pick(file, logfiles.get(log,
+                               logfiles["normal"])), bool(display), shared,
+                               sep=sep, **rest)
+                finally:
+                    del self.bypassed
+                display = False # display only once
+
+        return self._done()
+
+    @classmethod
+    def _logger_extended(cls):
+        """Return True if the logger method does more than TypeLogger's."""
+        for base in cls.__mro__:
+            method = base.__dict__.get("logger")
+            if method is not None and not getattr(method, "passthrough", False):
+                return method is not TypeLogger.__dict__["logger"]
+        return False
+
+    def multiple_many(self, records, types=None, display=None, **rest):
+        """Log many lines to multiple files at once (see log_many)."""
+        rest["types"] = types
+        rest["display"] = display
+        with LogBatch(self):
+            for record in records:
+                args, options = LogBatch.unpack(record, rest)
+                self.multiple(*args, **options)
+
+        return self._done()
 
     def show(self, *output, type="show", display=True, write=False, **rest):
         """Explicit way to only print to screen."""
-        self.logger(*output, type=type, display=display, write=write, **rest)
+        return self.logger(*output, type=type, display=display, write=write,
+                           **rest)
 
 class TranslatedTypeLogger(Translater, TypeLogger):
     """Implement translated type-based logging."""
 
+class AsyncTypeLogger(Asynchronous, TypeLogger):
+    """Implement type-based logging for asyncio code."""
+
+class AsyncTranslatedTypeLogger(Asynchronous, Translater, TypeLogger):
+    """Implement translated type-based logging for asyncio code."""
+
 class LevelLogger(BaseLogger):
     """Implement levelled logging.
 
@@ -821,6 +1618,13 @@ class LevelLogger(BaseLogger):
                     the logger method. The resulting value must be a
                     number or None.
 
+    Lines with a level lower than the logger's level are rejected before
+    anything else is done, including the bypassers evaluation (unless
+    the "level" bypasser needs to be looked up, in which case the line
+    is rejected once the bypassers are evaluated). Use the method
+    is_enabled_for() to know if a line would be logged, for instance to
+    avoid building costly arguments.
+
     """
 
     default_level = 0
@@ -828,6 +1632,8 @@ class LevelLogger(BaseLogger):
 
     #default_bypassers_handler = bypassers.LevelBypassers
 
+    _bp_handler = "level"
+
     def __init__(self, *, level=None, file=None, **kwargs):
         """Create a new levelled logging instance."""
 
@@ -836,6 +1642,75 @@ class LevelLogger(BaseLogger):
         self.level = pick(level, self.default_level)
         self.file = pick(file, self.default_file)
 
+        self.bypassers.add("level")
+        self._level_gate = (None, None, None, None)
+
+    def _resolve_level(self, level):
+        """Return the numeric level for the level given."""
+        if level is None:
+            return self.default_level
+        return level
+
+    def _level_threshold(self):
+        """Return the level below which all the lines are rejected.
+
+        This is the logger's level if the "level" bypasser never applies.
+        If it always applies with the same number (or None), every line
+        is either logged or rejected, and this is minus infinity or
+        infinity. This is None if the bypasser depends on a lookup, or
+        on a name, as it then needs to be evaluated for each line. The
+        result is kept until the bypassers or the level are modified.
+
+        """
+
+        bypassers = self.bypassers
+        gate = self._level_gate
+        if (gate[0] is bypassers and gate[1] == bypassers.__mapping__.version
+                and gate[2] == self.level):
+            return gate[3]
+
+        override = NoValue
+        lookup = False
+        ops = check_bypass.get_plan(self).compile()
+        for op in (ops,) if isinstance(ops, dict) else ops:
+            if isinstance(op, dict):
+                if "level" in op:
+                    override, lookup = op["level"], False
+            elif op[0] == "level":
+                lookup = True
+
+        if lookup:
+            threshold = None
+        elif override is NoValue:
+            threshold = self.level
+        elif override is None:
+            threshold = math.inf
+        elif isinstance(override, (int, float)):
+            threshold = -math.inf if override >= self.level else math.inf
+        else: # a name, whose level may change
+            threshold = None
+
+        self._level_gate = (bypassers, bypassers.__mapping__.version,
+                            self.level, threshold)
+        return threshold
+
+    def _level_allows(self, level, bypassed):
+        """Return True if the line is logged, given the bypassed settings."""
+        override = bypassed.get("level", NoValue)
+        if override is not NoValue:
+            if override is None:
+                return False
+            level = override
+        return self._resolve_level(level) >= self.level
+
+    def is_enabled_for(self, level=None):
+        """Return True if a line at the given level would be logged."""
+        threshold = self._level_threshold()
+        if threshold is None:
+            bypassed = check_bypass.get_plan(self).evaluate()
+            return self._level_allows(level, bypassed)
+        return self._resolve_level(level) >= threshold
+
     @check_bypass
     def logger(self, *output, file=None, level=None, display=None, write=None,
                sep=None, split=None, use_utc=None, ts_format=None,
@@ -848,40 +1723,29 @@ class LevelLogger(BaseLogger):
         split = self.bypassed.get("splitter", pick(split, self.split))
         display = self.bypassed.get("display", pick(display, self.display))
         write = self.bypassed.get("write", pick(write, self.write))
-
-        timestamp = self._get_timestamp(use_utc, ts_format)
-        # this is the file to write everything to
-        logall = self.bypassed.get("logall")
+        record = Record.from_output(output, sep)
 
         if display:
-            self._print(*output, sep=sep, use_utc=use_utc, split=split,
+            self._print(record, sep=sep, use_utc=use_utc, split=split,
                         ts_format=ts_format, print_ts=print_ts, errors=errors)
         if write:
-            output = sep.join(str(x) for x in output).splitlines()
-            alines = [x for x in self.logfiles if x in
-                                 self.bypassers("all")[0]]
-            getter = [file]
-            if logall:
-                getter.append(logall)
-            for log in getter:
-                if (log == logall and type not in alines) or log is None:
-                    continue
-                atypes = "type.{0} - ".format(type) if log == logall else ""
-                with open(log, "a", encoding=encoding, errors=errors) as f:
-                    for writer in output:
-                        f.write(timestamp + atypes + writer + "\n")
-
-    def logger_new(self, *output, level=None, **kwargs):
-        """Log a line based on level given."""
-
-        level = self.bypassed.get("level", level)
-
-        if level is not None and level >= self.level:
-            super().logger(*output, **kwargs)
+            if self.binary:
+                lines = self._entries(str(self._resolve_level(level)), "",
+                                      record.lines, use_utc, ts_format)
+            else:
+                timestamp = self._get_timestamp(use_utc, ts_format)
+                lines = [timestamp + writer + "\n" for writer in record.lines]
+            self._write(pick(file, self.file), lines, encoding, errors)
 
 class TranslatedLevelLogger(Translater, LevelLogger):
     """Implement a way to have levelled logging with translating."""
 
+class AsyncLevelLogger(Asynchronous, LevelLogger):
+    """Implement levelled logging for asyncio code."""
+
+class AsyncTranslatedLevelLogger(Asynchronous, Translater, LevelLogger):
+    """Implement levelled logging with translating for asyncio code."""
+
 class NamesLogger(LevelLogger):
     """Implement named levels logging.
 
@@ -921,15 +1785,21 @@ class NamesLogger(LevelLogger):
         if self.name not in self.levels:
             self.levels[self.name] = self.default_level
 
-    @check_bypass
-    def logger(self, *output, level=None, **kwargs):
-        """Log a line matching a named level."""
-
-        level = self.levels.get(level)
-        if level is None:
-            level = self.name
-
-        super().logger(*output, level=level, **kwargs)
+    def _resolve_level(self, level):
+        """Return the numeric level for the name or level given."""
+        levels = self.levels
+        if level is None or isinstance(level, str):
+            value = levels.get(level)
+            if value is None:
+                value = levels.get(self.name, self.default_level)
+            return value
+        return level
 
 class TranslatedNamesLogger(Translater, NamesLogger):
     """Implement a way to use named levels with translating."""
+
+class AsyncNamesLogger(Asynchronous, NamesLogger):
+    """Implement named levels logging for asyncio code."""
+
+class AsyncTranslatedNamesLogger(Asynchronous, Translater, NamesLogger):
+    """Implement named levels with translating for asyncio code."""
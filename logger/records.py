@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+
+"""Deferred rendering of the lines given to the loggers."""
+
+__all__ = ["Record"]
+
+class Record:
+    """Lazily rendered line, made of the arguments given to a logger.
+
+    The arguments are kept as-is, and are only converted to strings and
+    joined with 'sep' the first time the text is needed (that is, when
+    the line is actually printed or written somewhere). The result is
+    then kept, so that the screen, the main file and any other file all
+    share the same rendered text. If nothing ends up consuming the
+    record, the arguments are never converted at all.
+
+    'transform' is an optional callable, which is given the list of the
+    arguments converted to strings, and returns the list to join. The
+    translating loggers use this to translate the lines only when they
+    are actually rendered.
+
+    A record may be given to the logger methods in place of the output
+    arguments; it will be used directly instead of creating a new one.
+
+    'options' is an optional mapping of keyword arguments for the logger
+    method. It is used by the batch methods (such as log_many()), where
+    it allows each record to use its own type, file, level, etc.
+
+    """
+
+    __slots__ = ("args", "sep", "transform", "options", "_text", "_lines")
+
+    def __init__(self, args, sep=" ", transform=None, options=None):
+        """Create a new record from the arguments."""
+        self.args = args
+        self.sep = sep
+        self.transform = transform
+        self.options = options
+        self._text = None
+        self._lines = None
+
+    @classmethod
+    def from_output(cls, output, sep):
+        """Return the record given as sole output, or a new record."""
+        if len(output) == 1 and isinstance(output[0], Record):
+            return output[0]
+        return cls(output, sep)
+
+    def __repr__(self):
+        """Return the representation of the record."""
+        return "{0}({1!r}, sep={2!r})".format(type(self).__name__,
+                                              self.args, self.sep)
+
+    def __str__(self):
+        """Return the rendered text of the record."""
+        return self.text
+
+    @property
+    def rendered(self):
+        """Return True if the text was rendered already."""
+        return self._text is not None
+
+    @property
+    def text(self):
+        """Return the rendered text, rendering it the first time."""
+        text = self._text
+        if text is None:
+            strings = [str(x) for x in self.args]
+            if self.transform is not None:
+                strings = self.transform(strings)
+            text = self._text = self.sep.join(strings)
+        return text
+
+    @property
+    def lines(self):
+        """Return the list of lines of the rendered text."""
+        lines = self._lines
+        if lines is None:
+            lines = self._lines = self.text.splitlines()
+        return lines
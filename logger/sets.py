@@ -7,13 +7,17 @@ __all__ = [ # Mutable versions; Immutable versions;      Ordered; Duplicates
             "MultiSet",         "FrozenMultiSet",        # [ ]       [X]
             "OrderedSet",       "FrozenOrderedSet",      # [X]       [ ]
             "OrderedMultiSet",  "FrozenOrderedMultiSet", # [X]       [X]
+            "Domain", "register_domain", "unregister_domain",
           ]
 
+import collections.abc
 import collections
 import itertools
+import weakref
+import bisect
 import types
 
-from .utilities import counter_to_iterable, count
+from .utilities import count
 
 class SetBase:
     """A base set implementation for all implementations."""
@@ -31,7 +35,7 @@ class SetBase:
 
     def __len__(self):
         """Return the number of items in the set."""
-        return sum(self._dict.values())
+        return len(self._dict)
 
     def __repr__(self):
         """Return the representation of the set."""
@@ -135,32 +139,32 @@ class SetBase:
         """Return a set of the items only in one of the sets."""
         if not isinstance(other, SetBase):
             return NotImplemented
-        new = self._dict.fromkeys(x for x in self if x not in other)
-        new.update((x, None) for x in other if x not in self)
+        new = type(self)._dict.fromkeys(x for x in self._dict if x not in other)
+        new.update((x, None) for x in other._dict if x not in self)
         return type(self)(new)
 
     def __rxor__(self, other):
         """Return a set of the items only in one of the sets."""
         if not isinstance(other, SetBase):
             return NotImplemented
-        new = other._dict.fromkeys(x for x in other if x not in self)
-        new.update((x, None) for x in self if x not in other)
+        new = type(other)._dict.fromkeys(x for x in other._dict if x not in self)
+        new.update((x, None) for x in self._dict if x not in other)
         return type(self)(new)
 
     def __or__(self, other):
         """Return a set of the items in either sets, or both."""
         if not isinstance(other, SetBase):
             return NotImplemented
-        new = self._dict.fromkeys(self._dict)
-        new.update(other._dict.fromkeys(other._dict))
+        new = type(self)._dict.fromkeys(self._dict)
+        new.update(type(other)._dict.fromkeys(other._dict))
         return type(self)(new)
 
     def __ror__(self, other):
         """Return a set of the items in either sets, or both."""
         if not isinstance(other, SetBase):
             return NotImplemented
-        new = other._dict.fromkeys(other._dict)
-        new.update(self._dict.fromkeys(self._dict))
+        new = type(other)._dict.fromkeys(other._dict)
+        new.update(type(self)._dict.fromkeys(self._dict))
         return type(self)(new)
 
     def __add__(self, other):
@@ -207,8 +211,8 @@ class SetBase:
 
     def intersection(self, iterable):
         """Return a set of the items from both the set and iterable."""
-        new = type(self._dict)()
-        copy = self._dict.fromkeys(self._dict)
+        new = type(self)._dict()
+        copy = type(self)._dict.fromkeys(self._dict)
         for item in iterable:
             if item in copy and item not in new:
                 new[item] = None
@@ -216,7 +220,7 @@ class SetBase:
 
     def difference(self, iterable):
         """Return a set of the items in the set but not the iterable."""
-        copy = self._dict.fromkeys(self._dict)
+        copy = type(self)._dict.fromkeys(self._dict)
         for item in iterable:
             if item in copy:
                 del copy[item]
@@ -224,22 +228,22 @@ class SetBase:
 
     def symmetric_difference(self, iterable):
         """Return a set of the items in one of the set or the iterable."""
-        copy = self._dict.fromkeys(self._dict)
-        to_add = type(self._dict)()
-        to_remove = type(self._dict)()
+        copy = type(self)._dict.fromkeys(self._dict)
+        to_add = type(self)._dict()
+        to_remove = type(self)._dict()
         for item in iterable:
             if item not in copy:
                 to_add[item] = None
             else:
                 to_remove[item] = None
 
-        new = self._dict.fromkeys(k for k in copy if k not in to_remove)
+        new = type(self)._dict.fromkeys(k for k in copy if k not in to_remove)
         new.update(to_add)
         return type(self)(new)
 
     def union(self, iterable):
         """Return a set of the items in both the set or iterable."""
-        copy = self._dict.fromkeys(self._dict)
+        copy = type(self)._dict.fromkeys(self._dict)
         for item in iterable:
             copy[item] = None
         return type(self)(copy)
@@ -387,83 +391,550 @@ class MutableSetBase(SetBase):
         """Clear the set."""
         self._dict.clear()
 
+class Domain:
+    """A finite set of items, such as the log types or the levels.
+
+    The frozen sets whose items all come from a registered domain store
+    them as the bits of an integer, the bit of each item being its
+    position in the domain. As a domain only allows a limited number of
+    distinct sets, these sets are also interned: creating a set equal
+    to one which already exists returns the existing one. Register
+    domains with register_domain().
+
+    Domains which grow with add() (such as the types of the loggers'
+    bypassers) should be replaced once they hold more than 'max_items'
+    items, so that they don't grow forever in long-running processes.
+
+    """
+
+    max_items = 1024
+
+    def __init__(self, items):
+        """Create a new domain of the given items."""
+        self.items = tuple(dict.fromkeys(items))
+        self.bits = {item: bit for bit, item in enumerate(self.items)}
+        self.interned = weakref.WeakValueDictionary() # sets by (class, mask)
+
+    def __repr__(self):
+        """Return the representation of the domain."""
+        return "{0}({1!r})".format(type(self).__name__, list(self.items))
+
+    def __len__(self):
+        """Return the number of items in the domain."""
+        return len(self.items)
+
+    def add(self, item):
+        """Add the item to the domain if it's new, and return its bit."""
+        bit = self.bits.get(item)
+        if bit is None:
+            bit = self.bits[item] = len(self.items)
+            self.items += (item,)
+        return bit
+
+    def mask(self, items):
+        """Return the bits of the items, or None if one isn't in the domain."""
+        bits = self.bits
+        mask = 0
+        try:
+            for item in items:
+                mask |= 1 << bits[item]
+        except KeyError:
+            return None
+        return mask
+
+_domains = [] # registered domains, in order
+
+def register_domain(items):
+    """Register and return a new domain of the given items.
+
+    Frozen sets created afterwards, whose items all come from the
+    domain, are stored as bits. Domains are tried in the order they
+    were registered, so smaller domains should be registered first.
+
+    """
+    domain = Domain(items)
+    _domains.append(domain)
+    return domain
+
+def unregister_domain(domain):
+    """Stop storing the new frozen sets of the domain's items as bits."""
+    _domains.remove(domain)
+
+class _CompactMapping(collections.abc.Mapping):
+    """Base read-only {item: count} mapping of the compact frozen sets."""
+
+    __slots__ = ()
+
+    def copy(self):
+        """Return a new dict with the same items."""
+        return dict(self.items())
+
+    def __repr__(self):
+        """Return the representation of the mapping."""
+        return "{0}({1!r})".format(type(self).__name__, self.copy())
+
+class _SortedCounts(_CompactMapping):
+    """Mapping of the items, sorted in a tuple, to their counts.
+
+    Items are looked up with bisect, or with a linear scan of the tuple
+    (which is faster) if it holds at most 'linear' items. 'counts' is
+    None if every count is 1, which is always the case for the sets
+    without duplicates.
+
+    """
+
+    __slots__ = ("keys_", "counts")
+
+    sortable = (str, int, bytes) # types which are totally ordered
+    linear = 8
+
+    def __init__(self, keys, counts):
+        """Create a new mapping from the sorted keys and their counts."""
+        self.keys_ = keys
+        self.counts = counts
+
+    @classmethod
+    def build(cls, mapping):
+        """Return a new mapping of the counts, or None if it can't be sorted."""
+        kinds = set(map(type, mapping))
+        if len(kinds) > 1 or (kinds and kinds.pop() not in cls.sortable):
+            return None
+        keys = tuple(sorted(mapping))
+        counts = tuple(map(mapping.__getitem__, keys))
+        if all(total == 1 for total in counts):
+            counts = None
+        return cls(keys, counts)
+
+    def _slot(self, item):
+        """Return the position of the item in the keys, or None."""
+        keys = self.keys_
+        try:
+            slot = bisect.bisect_left(keys, item)
+        except TypeError: # not comparable, thus not in
+            return None
+        if slot < len(keys) and keys[slot] == item:
+            return slot
+        return None
+
+    def __contains__(self, item):
+        """Return True if the item is in the mapping."""
+        keys = self.keys_
+        if len(keys) <= self.linear:
+            return item in keys
+        try:
+            slot = bisect.bisect_left(keys, item)
+        except TypeError:
+            return False
+        return slot < len(keys) and keys[slot] == item
+
+    def __getitem__(self, item):
+        """Return the count of the item."""
+        slot = self._slot(item)
+        if slot is None:
+            raise KeyError(item)
+        return 1 if self.counts is None else self.counts[slot]
+
+    def __iter__(self):
+        """Iterate over the items."""
+        return iter(self.keys_)
+
+    def __len__(self):
+        """Return the number of distinct items."""
+        return len(self.keys_)
+
+    def items(self):
+        """Return an iterable of the (item, count) pairs."""
+        if self.counts is None:
+            return zip(self.keys_, itertools.repeat(1))
+        return zip(self.keys_, self.counts)
+
+    def __eq__(self, other):
+        """Return True if both mappings are equal."""
+        if isinstance(other, _SortedCounts):
+            return self.keys_ == other.keys_ and self.counts == other.counts
+        return super().__eq__(other)
+
+class _BitCounts(_CompactMapping):
+    """Mapping of the items of a domain, stored as bits, to a count of 1."""
+
+    __slots__ = ("domain", "mask")
+
+    def __init__(self, domain, mask):
+        """Create a new mapping of the items with a bit set in the mask."""
+        self.domain = domain
+        self.mask = mask
+
+    def __contains__(self, item):
+        """Return True if the item is in the mapping."""
+        try:
+            bit = self.domain.bits.get(item)
+        except TypeError: # unhashable
+            return False
+        return bit is not None and self.mask >> bit & 1 == 1
+
+    def __getitem__(self, item):
+        """Return the count of the item."""
+        if item not in self:
+            raise KeyError(item)
+        return 1
+
+    def __iter__(self):
+        """Iterate over the items, in the order of the domain."""
+        mask = self.mask
+        return (item for bit, item in enumerate(self.domain.items)
+                if mask >> bit & 1)
+
+    def __len__(self):
+        """Return the number of items."""
+        return bin(self.mask).count("1")
+
+    def items(self):
+        """Return an iterable of the (item, count) pairs."""
+        return zip(self, itertools.repeat(1))
+
+    def __eq__(self, other):
+        """Return True if both mappings are equal."""
+        if isinstance(other, _BitCounts) and other.domain is self.domain:
+            return self.mask == other.mask
+        return super().__eq__(other)
+
+def _compact(counts):
+    """Return a compact mapping of the counts, or None if not possible."""
+    if all(total == 1 for total in counts.values()):
+        for domain in _domains:
+            mask = domain.mask(counts)
+            if mask is not None:
+                return _BitCounts(domain, mask)
+    return _SortedCounts.build(counts)
+
 class ImmutableSetBase(SetBase):
-    """A base set implementation for immutable sets."""
+    """A base set implementation for immutable sets.
+
+    The unordered immutable sets are stored compactly: as bits (and
+    interned) if all their items come from a registered Domain, or else
+    as a sorted tuple if the items are all strings, all integers, or
+    all bytes. Other sets fall back to a read-only dict. The hash of a
+    set is only computed once. The membership of the small compact sets
+    is tested by scanning a tuple of their items (the sorted keys, which
+    are shared with the mapping), without calling the mapping itself.
+
+    """
 
     def __new__(cls, iterable=()):
         """Create a new immutable set."""
-        new = cls._dict.fromkeys(iterable, 1)
+        return cls._from_counts(cls._dict.fromkeys(iterable, 1))
+
+    @classmethod
+    def _from_counts(cls, counts):
+        """Create a new set holding the {item: count} mapping."""
+        mapping = None
+        if cls._dict is dict: # unordered
+            mapping = _compact(counts)
+        if isinstance(mapping, _BitCounts):
+            interned = mapping.domain.interned
+            self = interned.get((cls, mapping.mask))
+            if self is not None:
+                return self
+
         self = super().__new__(cls)
-        self._dict = types.MappingProxyType(new)
+        self._hash = None
+        if mapping is None:
+            self._items = self._lookup = counts
+            self._dict = types.MappingProxyType(counts) # hides its methods
+        else:
+            self._dict = self._lookup = mapping
+            if isinstance(mapping, _BitCounts):
+                interned[cls, mapping.mask] = self
+                if len(mapping) <= _SortedCounts.linear:
+                    self._lookup = tuple(mapping)
+            elif len(mapping) <= _SortedCounts.linear:
+                self._lookup = mapping.keys_
         return self
 
+    def __contains__(self, item):
+        """Return True if the item is in the set, False otherwise."""
+        try:
+            return item in self._lookup
+        except TypeError: # unhashable, thus not in
+            return False
+
+    def __reduce__(self):
+        """Return the state for copying and pickling the set."""
+        counts = type(self)._dict(self._dict.items())
+        return type(self)._from_counts, (counts,)
+
     def __hash__(self):
         """Return the hash of the set."""
-        return hash(tuple(self._dict.items()))
+        if self._hash is None:
+            self._hash = hash(frozenset(self._dict.items()))
+        return self._hash
+
+class _IndexedDict(collections.OrderedDict):
+    """Ordered dict which keeps a positional index of its keys.
+
+    The index (the list of the keys, and the slot of each key in that
+    list) is built the first time it is needed, and is then kept up to
+    date: new keys are appended to it, while deleted keys are only
+    replaced with a marker. While there are markers, a Fenwick tree of
+    the live slots maps positions to slots (and back) in O(log n); the
+    list is only compacted once more than half of it is markers, so
+    that the compactions are amortised over the deletions.
+
+    For the multisets, the position following the last copy of each key
+    is also kept (as the running total of the counts), and is rebuilt
+    when the counts change; it is empty if every count is 1.
+
+    """
+
+    def __init__(self, *args, **kwargs):
+        """Create a new indexed dict."""
+        self._keys = None # not built yet
+        self._slots = None
+        self._ends = None # stale
+        self._deleted = 0
+        self._tree = None # only built while there are markers
+        super().__init__(*args, **kwargs)
+
+    def __reduce__(self):
+        """Return the state for copying and pickling, without the index."""
+        return type(self), (list(self.items()),)
+
+    def __setitem__(self, key, value):
+        """Set the value of the key, indexing it if it's new."""
+        keys = self._keys
+        if keys is not None and key not in self:
+            self._slots[key] = len(keys)
+            keys.append(key)
+            if self._tree is not None:
+                self._tree_append()
+        if self._ends is not None and (self._ends or value != 1):
+            self._ends = None
+        super().__setitem__(key, value)
+
+    def __delitem__(self, key):
+        """Delete the key, leaving a marker in the index."""
+        super().__delitem__(key)
+        keys = self._keys
+        if keys is not None:
+            slot = self._slots.pop(key)
+            if slot == len(keys) - 1:
+                keys.pop()
+                if self._tree is not None:
+                    self._tree.pop() # no other node covers the last one
+            else:
+                keys[slot] = _deleted
+                self._deleted += 1
+                if self._tree is not None:
+                    self._tree_update(slot, -1)
+        if self._ends:
+            self._ends = None
+
+    def pop(self, key, *default):
+        """Remove the key and return its value."""
+        if key in self:
+            value = self[key]
+            del self[key]
+            return value
+        if default:
+            return default[0]
+        raise KeyError(key)
+
+    def popitem(self, last=True):
+        """Remove and return the last (or first) key and its value."""
+        if not self:
+            raise KeyError("dictionary is empty")
+        key = next(reversed(self) if last else iter(self))
+        return key, self.pop(key)
+
+    def setdefault(self, key, default=None):
+        """Return the value of the key, setting it to default if needed."""
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def clear(self):
+        """Remove all the keys."""
+        super().clear()
+        self._reset()
+
+    def move_to_end(self, key, last=True):
+        """Move the key to the end (or start); the index is rebuilt later."""
+        super().move_to_end(key, last)
+        self._reset()
+
+    def _reset(self):
+        """Drop the index, to be rebuilt the next time it is needed."""
+        self._keys = None
+        self._ends = None
+        self._deleted = 0
+        self._tree = None
+
+    def _index(self):
+        """Return the list of the keys, which may hold markers."""
+        keys = self._keys
+        if keys is None or self._deleted > len(keys) // 2:
+            keys = self._keys = list(self)
+            self._slots = {key: i for i, key in enumerate(keys)}
+            self._deleted = 0
+            self._tree = None
+        return keys
+
+    def _build_tree(self):
+        """Build the Fenwick tree of the live slots of the index."""
+        keys = self._keys
+        tree = [0] * (len(keys) + 1)
+        for node, key in enumerate(keys, 1):
+            if key is not _deleted:
+                tree[node] += 1
+            parent = node + (node & -node)
+            if parent <= len(keys):
+                tree[parent] += tree[node]
+        self._tree = tree
+        return tree
+
+    def _tree_update(self, slot, delta):
+        """Add delta to the count of the slot in the tree."""
+        tree = self._tree
+        node = slot + 1
+        while node < len(tree):
+            tree[node] += delta
+            node += node & -node
+
+    def _tree_append(self):
+        """Add a node for a new live slot at the end of the tree."""
+        node = len(self._tree)
+        self._tree.append(1 + self._live_before(node - 1) -
+                          self._live_before(node - (node & -node)))
+
+    def _live_before(self, slot):
+        """Return the number of live slots before the slot."""
+        tree = self._tree
+        total = 0
+        while slot:
+            total += tree[slot]
+            slot -= slot & -slot
+        return total
+
+    def key_list(self):
+        """Return the list of the keys, in order."""
+        if self._deleted:
+            self._keys = None
+        return self._index()
+
+    def key_at(self, position):
+        """Return the key at the (non-negative) position."""
+        keys = self._index()
+        if not self._deleted:
+            return keys[position]
+        tree = self._tree or self._build_tree()
+        slot = 0
+        step = 1 << (len(tree).bit_length() - 1)
+        while step:
+            node = slot + step
+            if node < len(tree) and tree[node] <= position:
+                slot = node
+                position -= tree[node]
+            step >>= 1
+        return keys[slot]
+
+    def keys_at(self, index):
+        """Return the keys at the positions of the slice."""
+        keys = self._index()
+        if not self._deleted:
+            return keys[index]
+        return [self.key_at(i) for i in range(*index.indices(len(self)))]
+
+    def position(self, key):
+        """Return the position of the key, or None."""
+        self._index()
+        slot = self._slots.get(key)
+        if slot is None or not self._deleted:
+            return slot
+        self._tree or self._build_tree()
+        return self._live_before(slot)
+
+    def ends(self):
+        """Return the position after the last copy of each key."""
+        ends = self._ends
+        if ends is None:
+            keys = self.key_list()
+            ends = list(itertools.accumulate(map(self.__getitem__, keys)))
+            if not ends or ends[-1] == len(keys):
+                ends = () # no duplicates; the positions are the slots
+            self._ends = ends
+        return ends
+
+_deleted = object() # marker for the deleted keys in the index
 
 class OrderedSetBase(SetBase):
     """A base ordered set implementation for the ordered versions.
 
-    Indexing an ordered set is supported, but is not very efficient.
-    See the information below on indexing and deleting items. Getting
-    or deleting an item with its index is O(n), while using a slice or
-    tuple as indices is O(log n).
+    The items of an ordered set are indexed by position. The index is
+    built on the first positional access, then kept up to date as items
+    are added or removed. Getting an item with its index and finding
+    the index of an item are O(1), or O(log n) once items have been
+    removed (until the index is compacted, when half of it is stale),
+    and slicing a slice of k items is O(k) or O(k log n) likewise. For
+    the multisets with duplicates, the positions of the items are
+    rebuilt whenever the counts change.
 
     Furthermore, the items in an ordered set are ordered by the first
     item's insert location, should there be duplicates. If an arbitrary
     order (including re-ordering) is desired, a list is recommended.
 
     Indexing a set using an int (or int-like) object returns the item
-    at that position. Indexing using a slice recursively iterates over
-    the set with each integer in the slice, and returns a new set.
-    Finally, indexing with a tuple recursively iterates over the set
-    and returns a tuple of the elements.
+    at that position. Indexing using a slice returns a new set of the
+    items at the positions of the slice. Finally, indexing with a tuple
+    recursively indexes the set with each element of the tuple, and
+    returns a tuple of the results.
 
     Assigning to an index makes no sense for a set (even ordered), and
     is not supported. However, deleting from an index is somewhat less
-    senseless. Doing `del oset[i]` is approximately equivalent (mostly
-    in regards to performance) to `oset.remove(oset[i])`. Valid indices
-    include ints (or int-like), slices, and tuples. Please note that,
-    since tuples can contain an arbitrary number of nested structures,
-    passing in tuples to delete items has an exponential runtime cost.
+    senseless. Doing `del oset[i]` is equivalent to doing the call
+    `oset.remove(oset[i])`. Deleting a slice removes the items at the
+    positions of the slice (as they were before the deletion). Valid
+    indices include ints (or int-like), slices, and tuples. Please note
+    that tuples are processed one element at a time, so that the
+    positions of the later elements are after the earlier deletions.
 
     """
 
-    _dict = collections.OrderedDict
+    _dict = _IndexedDict
+
+    def _indexed(self):
+        """Return the dict holding the items and their index."""
+        items = getattr(self, "_items", None)
+        return self._dict if items is None else items
+
+    def _at(self, mapping, index):
+        """Return the item at the (non-negative) position in the mapping."""
+        ends = mapping.ends()
+        if not ends:
+            return mapping.key_at(index)
+        return mapping.key_list()[bisect.bisect_right(ends, index)]
+
+    def _positions(self, mapping, index):
+        """Return the items at the positions of the slice."""
+        ends = mapping.ends()
+        if not ends:
+            return mapping.keys_at(index)
+        return [self._at(mapping, i) for i in range(*index.indices(ends[-1]))]
 
     def __getitem__(self, index):
         """Get the item at index given."""
         if hasattr(index, "__index__"):
-            if index >= 0:
-                it = iter(self)
-            else:
-                it = reversed(self)
-                index = -index
-
-            for i in range(index):
-                try:
-                    next(it)
-                except StopIteration:
-                    raise IndexError("set index out of range") from None
-
-            try:
-                return next(it)
-            except StopIteration:
-                raise IndexError("set index out of range") from None
+            mapping = self._indexed()
+            index = index.__index__()
+            ends = mapping.ends()
+            size = ends[-1] if ends else len(mapping)
+            if index < 0:
+                index += size
+            if not 0 <= index < size:
+                raise IndexError("set index out of range")
+            return self._at(mapping, index)
 
         elif isinstance(index, slice):
-            new = type(self._dict)()
-            for i in range(*index.indices(len(self))):
-                try:
-                    item = self[i]
-                except IndexError:
-                    continue
-
-                if item not in new:
-                    new[item] = 0
-                new[item] += 1
-
-            return type(self)(counter_to_iterable(new))
+            return type(self)(self._positions(self._indexed(), index))
 
         elif isinstance(index, tuple):
             new = []
@@ -481,11 +952,8 @@ class OrderedSetBase(SetBase):
             self.remove(self[index])
 
         elif isinstance(index, slice):
-            for i in range(*index.indices(len(self))):
-                try:
-                    self.remove(self[i])
-                except (IndexError, KeyError):
-                    continue
+            for item in self._positions(self._indexed(), index):
+                self.remove(item)
 
         elif isinstance(index, tuple):
             for item in index:
@@ -502,12 +970,14 @@ class OrderedSetBase(SetBase):
 
     def find(self, item):
         """Return the index of the item in the set, or -1 if it's not in."""
-        item_hash = hash(item) # If it's not hashable, it cannot be in a set
-        for i, value in enumerate(self):
-            if hash(value) == item_hash and value == item:
-                return i
-
-        return -1
+        mapping = self._indexed()
+        ends = mapping.ends()
+        position = mapping.position(item)
+        if position is None:
+            return -1
+        if not ends:
+            return position
+        return ends[position] - mapping[item]
 
     def index(self, item):
         """Return the index of the item in the set if it exists."""
@@ -517,11 +987,94 @@ class OrderedSetBase(SetBase):
         return value
 
 class MultiSetBase(SetBase):
-    """A base multiset implementation for both multiset versions."""
+    """A base multiset implementation for both multiset versions.
+
+    The multisets hold an {item: count} mapping and keep the total of
+    the counts, so that getting their length is O(1). The operations
+    between sets work on the counts directly rather than on every copy
+    of every item, and are thus O(distinct items), however large the
+    counts are. Iterating over a multiset still yields every copy.
+
+    """
+
+    def __len__(self):
+        """Return the number of items in the set."""
+        return self._len
+
+    @classmethod
+    def _counted(cls, iterable):
+        """Return a new {item: count} mapping of the iterable's items."""
+        if isinstance(iterable, SetBase):
+            return cls._dict(iterable._dict)
+        return count(iterable, cls._dict)
+
+    def _counts(self, iterable):
+        """Return an {item: count} mapping of the iterable's items."""
+        if isinstance(iterable, SetBase):
+            return iterable._dict
+        return count(iterable, type(self)._dict)
+
+    def __and__(self, other):
+        """Return a set of the common items."""
+        if not isinstance(other, SetBase):
+            return NotImplemented
+        new = type(self)._dict()
+        for item, value in self._dict.items():
+            if item in other:
+                new[item] = value
+        return self._from_counts(new)
+
+    def __rand__(self, other):
+        """Return a set of the common items."""
+        if not isinstance(other, SetBase):
+            return NotImplemented
+        new = type(self)._dict()
+        for item, value in other._dict.items():
+            if item in self:
+                new[item] = value
+        return self._from_counts(new)
+
+    def __sub__(self, other):
+        """Return a set of the items not in the other set."""
+        if not isinstance(other, SetBase):
+            return NotImplemented
+        new = type(self)._dict()
+        for item, value in self._dict.items():
+            if item not in other:
+                new[item] = value
+        return self._from_counts(new)
+
+    def __rsub__(self, other):
+        """Return a set of the items not in the set."""
+        if not isinstance(other, SetBase):
+            return NotImplemented
+        new = type(self)._dict()
+        for item, value in other._dict.items():
+            if item not in self:
+                new[item] = value
+        return self._from_counts(new)
+
+    def __add__(self, other):
+        """Return a set of all the items in the sets."""
+        if not isinstance(other, SetBase):
+            return NotImplemented
+        new = self._counted(self)
+        for item, value in other._dict.items():
+            new[item] = new.get(item, 0) + value
+        return self._from_counts(new)
+
+    def __radd__(self, other):
+        """Return a set of all the items in the sets."""
+        if not isinstance(other, SetBase):
+            return NotImplemented
+        new = self._counted(other)
+        for item, value in self._dict.items():
+            new[item] = new.get(item, 0) + value
+        return self._from_counts(new)
 
     def issubset(self, iterable):
         """Return True if the set is a subset of the iterable."""
-        counter = count(iterable, type(self._dict))
+        counter = self._counts(iterable)
 
         for item, value in self._dict.items():
             if item not in counter or counter[item] < value:
@@ -531,7 +1084,7 @@ class MultiSetBase(SetBase):
 
     def issuperset(self, iterable):
         """Return True if the set is a superset of the iterable."""
-        for item, value in count(iterable, type(self._dict)).items():
+        for item, value in self._counts(iterable).items():
             if item not in self._dict or self._dict[item] < value:
                 return False
 
@@ -539,43 +1092,41 @@ class MultiSetBase(SetBase):
 
     def intersection(self, iterable):
         """Return a set of the items from both the set and iterable."""
-        new = type(self._dict)()
-        copy = self._dict.copy()
-        for item in iterable:
-            if item in copy and copy[item] > 0:
-                if item not in new:
-                    new[item] = 0
-                new[item] += 1
-                copy[item] -= 1
-        return type(self)(counter_to_iterable(new))
+        new = type(self)._dict()
+        for item, value in self._counts(iterable).items():
+            total = min(value, self._dict.get(item, 0))
+            if total:
+                new[item] = total
+        return self._from_counts(new)
 
     def difference(self, iterable):
         """Return a set of the items in the set but not the iterable."""
-        copy = self._dict.copy()
-        for item in iterable:
-            if item in copy and copy[item] > 0:
-                copy[item] -= 1
-        return type(self)(counter_to_iterable(copy))
+        new = type(self)._dict()
+        counter = self._counts(iterable)
+        for item, value in self._dict.items():
+            total = value - counter.get(item, 0)
+            if total > 0:
+                new[item] = total
+        return self._from_counts(new)
 
     def symmetric_difference(self, iterable):
         """Return a set of the items in either the set or the iterable."""
-        new = type(self._dict)()
-        copy = self._dict.copy()
-        counter = count(iterable, type(self._dict))
+        new = type(self)._dict()
+        counter = self._counts(iterable)
 
-        for item in itertools.chain(copy, counter):
-            new[item] = abs(copy.get(item, 0) - counter.get(item, 0))
+        for item in itertools.chain(self._dict, counter):
+            total = abs(self._dict.get(item, 0) - counter.get(item, 0))
+            if total:
+                new[item] = total
 
-        return type(self)(counter_to_iterable(new))
+        return self._from_counts(new)
 
     def sum(self, iterable):
         """Return a set of all items and their counts."""
-        new = self._dict.copy()
-        for item in iterable:
-            if item not in new:
-                new[item] = 0
-            new[item] += 1
-        return type(self)(counter_to_iterable(new))
+        new = self._counted(self)
+        for item, value in self._counts(iterable).items():
+            new[item] = new.get(item, 0) + value
+        return self._from_counts(new)
 
 class Set(MutableSetBase):
     """A mutable and unordered set which does not allow duplicates."""
@@ -588,21 +1139,34 @@ class MultiSet(MutableSetBase, MultiSetBase):
 
     def __init__(self, iterable=()):
         """Create a new mutable multiset."""
-        self._dict = count(iterable, self._dict)
+        self._dict = self._counted(iterable)
+        self._len = sum(self._dict.values())
+
+    @classmethod
+    def _from_counts(cls, counts):
+        """Create a new set holding the {item: count} mapping."""
+        self = cls.__new__(cls)
+        self._dict = counts
+        self._len = sum(counts.values())
+        return self
+
+    def _set_count(self, item, total):
+        """Set the count of the item, removing it if it drops to 0."""
+        current = self._dict.get(item, 0)
+        if total > 0:
+            self._dict[item] = total
+            self._len += total - current
+        elif current:
+            del self._dict[item]
+            self._len -= current
 
     def __iand__(self, other):
         """Update the set with the items in both sets."""
         if not isinstance(other, SetBase):
             return NotImplemented
 
-        copy = self._dict.copy()
-
-        for item, value in copy.items():
-            total = min(other.count(item), value)
-            if total:
-                self._dict[item] = total
-            else:
-                del self._dict[item]
+        for item, value in list(self._dict.items()):
+            self._set_count(item, min(other.count(item), value))
 
         return self
 
@@ -611,14 +1175,8 @@ class MultiSet(MutableSetBase, MultiSetBase):
         if not isinstance(other, SetBase):
             return NotImplemented
 
-        copy = self._dict.copy()
-
-        for item, value in copy.items():
-            total = value - other.count(item)
-            if total > 0:
-                self._dict[item] = total
-            else:
-                del self._dict[item]
+        for item, value in list(self._dict.items()):
+            self._set_count(item, value - other.count(item))
 
         return self
 
@@ -627,20 +1185,8 @@ class MultiSet(MutableSetBase, MultiSetBase):
         if not isinstance(other, SetBase):
             return NotImplemented
 
-        copy = self._dict.copy()
-
-        for item, value in copy.items():
-            total = abs(value - other.count(item))
-            if total:
-                self._dict[item] = total
-            else:
-                del self._dict[item]
-
         for item, value in other._dict.items():
-            if item in copy:
-                continue # already did it
-
-            self._dict[item] = value
+            self._set_count(item, abs(self._dict.get(item, 0) - value))
 
         return self
 
@@ -649,8 +1195,8 @@ class MultiSet(MutableSetBase, MultiSetBase):
         if not isinstance(other, SetBase):
             return NotImplemented
 
-        for item in itertools.chain(self._dict, other._dict):
-            self._dict[item] = 1 # we don't care about the count
+        for item in itertools.chain(list(self._dict), other._dict):
+            self._set_count(item, 1) # we don't care about the count
 
         return self
 
@@ -660,7 +1206,7 @@ class MultiSet(MutableSetBase, MultiSetBase):
             return NotImplemented
 
         for item, value in other._dict.items():
-            self._dict[item] = self._dict.get(item, 0) + value
+            self._set_count(item, self._dict.get(item, 0) + value)
 
         return self
 
@@ -670,19 +1216,20 @@ class MultiSet(MutableSetBase, MultiSetBase):
             self._dict[item] = 1
         else:
             self._dict[item] += 1
+        self._len += 1
 
     def discard(self, item):
         """Remove an item from the set if it exists."""
         if item in self._dict:
-            self._dict[item] -= 1
-            if self._dict[item] <= 0:
-                del self._dict[item]
+            self._set_count(item, self._dict[item] - 1)
 
     def remove(self, item):
         """Remove an item from the set."""
-        self._dict[item] -= 1 # Raises a KeyError if not present
-        if self._dict[item] <= 0:
-            del self._dict[item]
+        self._set_count(item, self._dict[item] - 1) # KeyError if not present
+
+    def drop(self, item):
+        """Drop all instances of the item from the set."""
+        self._set_count(item, 0)
 
     def pop(self):
         """Remove and return a random item from the set."""
@@ -690,76 +1237,58 @@ class MultiSet(MutableSetBase, MultiSetBase):
             raise KeyError("pop from empty set")
 
         item = next(iter(self._dict))
-        if self._dict[item] == 1:
-            del self._dict[item]
-            return item
-
-        self._dict[item] -= 1
+        self._set_count(item, self._dict[item] - 1)
         return item
 
     def intersection_update(self, iterable):
         """Update the set with the items in both the set and iterable."""
-        copy = self._dict.copy()
-        counter = count(iterable, type(self._dict))
+        counter = self._counts(iterable)
 
-        for item, value in copy.items():
-            total = min(value, counter.get(item, 0))
-            if not total:
-                del self._dict[item]
-            else:
-                self._dict[item] = total
+        for item, value in list(self._dict.items()):
+            self._set_count(item, min(value, counter.get(item, 0)))
 
     def difference_update(self, iterable):
         """Update the set with the items not in the iterable."""
-        for item, value in count(iterable, type(self._dict)).items():
+        for item, value in self._counts(iterable).items():
             if item in self._dict:
-                self._dict[item] -= value
-                if self._dict[item] <= 0:
-                    del self._dict[item]
+                self._set_count(item, self._dict[item] - value)
 
     def symmetric_difference_update(self, iterable):
         """Update the set with the items in one of the set or iterable."""
-        copy = self._dict.copy()
-        counter = count(iterable, type(self._dict))
-
-        for item, value in copy.items():
-            total = abs(value - counter.get(item, 0))
-            if total:
-                self._dict[item] = total
-            else:
-                del self._dict[item]
-
-        for item, value in counter.items():
-            if item in copy:
-                continue # already done it above
-            self._dict[item] = value
+        for item, value in self._counts(iterable).items():
+            self._set_count(item, abs(self._dict.get(item, 0) - value))
 
     def union_update(self, iterable):
         """Update the set with the items from both the set and iterable."""
-        for item in itertools.chain(self._dict, iterable):
-            self._dict[item] = 1
+        for item in itertools.chain(list(self._dict), self._counts(iterable)):
+            self._set_count(item, 1)
 
     def sum_update(self, iterable):
         """Update the set with all items from the set and iterable."""
-        for item in iterable:
-            if item not in self._dict:
-                self._dict[item] = 0
-            self._dict[item] += 1
+        for item, value in self._counts(iterable).items():
+            self._set_count(item, self._dict.get(item, 0) + value)
 
     def update(self, iterable):
         """Update the set with all items from the iterable."""
-        for item in iterable:
-            if item not in self._dict:
-                self._dict[item] = 0
-            self._dict[item] += 1
+        self.sum_update(iterable)
+
+    def clear(self):
+        """Clear the set."""
+        self._dict.clear()
+        self._len = 0
 
 class FrozenMultiSet(ImmutableSetBase, MultiSetBase):
     """An immutable and unordered set which allows duplicates."""
 
     def __new__(cls, iterable=()):
-        new = count(iterable, cls._dict)
-        self = super().__new__(cls)
-        self._dict = types.MappingProxyType(new)
+        """Create a new immutable multiset."""
+        return cls._from_counts(cls._counted(iterable))
+
+    @classmethod
+    def _from_counts(cls, counts):
+        """Create a new set holding the {item: count} mapping."""
+        self = super()._from_counts(counts)
+        self._len = sum(counts.values())
         return self
 
 class OrderedSet(OrderedSetBase, Set):
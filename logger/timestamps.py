@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+
+"""Timestamp formatting for the loggers."""
+
+__all__ = ["TimestampFormatter"]
+
+import datetime
+import time
+
+class TimestampFormatter:
+    """Format timestamps, re-rendering them at most once per second.
+
+    The format string is the same as for the loggers' 'ts_format'
+    parameter: the directives of time.strftime(), plus {tzname} and
+    {tzoffset} for the time zone name and offset. These two fields are
+    substituted once, when the formatter is created, and the rendered
+    timestamp is reused for as long as the current second is the same.
+    The result is identical to formatting it from scratch every time.
+
+    Formats using a sub-second directive (%f) are rendered every time,
+    and so are formats with replacement fields other than {tzname} and
+    {tzoffset} (which raise an error when formatted).
+
+    """
+
+    __slots__ = ("ts_format", "use_utc", "templates", "cached")
+
+    def __init__(self, ts_format, use_utc=False):
+        """Create a new timestamp formatter."""
+        self.ts_format = ts_format
+        self.use_utc = use_utc
+        self.cached = (None, None)
+        self.templates = None
+
+        if "%f" in ts_format:
+            return # changes more than once per second
+
+        if use_utc:
+            fields = {"+": ("UTC", "+0000")}
+        else:
+            offset = str(time.timezone // 36).zfill(4)
+            fields = {sign: (time.tzname[0], sign + offset) for sign in "+-"}
+
+        templates = {}
+        for sign, (tz, offset) in fields.items():
+            try:
+                templates[sign] = ts_format.format(tzname=tz, tzoffset=offset)
+            except (LookupError, ValueError, AttributeError):
+                return # let it fail when formatting
+        self.templates = templates
+
+    def __repr__(self):
+        """Return the representation of the formatter."""
+        return "{0}({1!r}, use_utc={2!r})".format(type(self).__name__,
+                                                  self.ts_format, self.use_utc)
+
+    def __call__(self):
+        """Return the timestamp for the current time."""
+        now = int(time.time())
+        second, value = self.cached
+        if second == now:
+            return value
+
+        if self.templates is None:
+            return self.render()
+
+        value = self._format(now)
+        self.cached = (now, value)
+        return value
+
+    def at(self, when):
+        """Return the timestamp for 'when', in seconds since the epoch."""
+        if self.templates is None:
+            return self.render(when)
+
+        now = int(when)
+        second, value = self.cached
+        if second != now:
+            value = self._format(now)
+            self.cached = (now, value)
+        return value
+
+    def _format(self, now):
+        """Format the timestamp for the given second, using the templates."""
+        templates = self.templates
+        if self.use_utc:
+            utc = time.gmtime(now)
+            value = datetime.datetime(*utc[:6]).strftime(templates["+"])
+        else:
+            local = time.localtime(now)
+            sign = "-" if time.gmtime(now).tm_hour > local.tm_hour else "+"
+            value = time.strftime(templates[sign], local)
+
+        return value.strip().upper()
+
+    def render(self, when=None):
+        """Render the timestamp from scratch, without using the cache.
+
+        'when' is the time to render, in seconds since the epoch; the
+        current time is used if it is None.
+
+        """
+        if when is None:
+            when = time.time()
+        utc = datetime.datetime.utcfromtimestamp(when)
+        if self.use_utc:
+            tmf = utc.strftime(self.ts_format)
+            tz = "UTC"
+            offset = "+0000"
+        else:
+            tmf = time.strftime(self.ts_format, time.localtime(when))
+            tz = time.tzname[0]
+            offset = "+"
+            if utc.hour > datetime.datetime.fromtimestamp(when).hour:
+                offset = "-"
+            offset += str(time.timezone // 36).zfill(4)
+        return tmf.format(tzname=tz, tzoffset=offset).strip().upper()
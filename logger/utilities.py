@@ -3,10 +3,14 @@
 """Small utility functions for use in various places."""
 
 __all__ = ["pick", "is_dunder", "convert_to_od",
-           "counter_to_iterable", "count"]
+           "counter_to_iterable", "count", "iter_lines", "iter_split"]
 
 import collections
 import itertools
+import re
+
+# the line boundaries recognized by str.splitlines()
+_line_boundaries = re.compile("\r\n|[\n\r\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029]")
 
 def pick(arg, default):
     """Handler for default versus given argument."""
@@ -35,3 +39,35 @@ def count(iterable, mapping):
         items[item] += 1
 
     return items
+
+def iter_lines(string):
+    """Yield the lines of string, like a lazy str.splitlines()."""
+    last = 0
+    for match in _line_boundaries.finditer(string):
+        yield string[last:match.start()]
+        last = match.end()
+    if last < len(string):
+        yield string[last:]
+
+def iter_split(string, sep, chunk=65536):
+    """Yield the parts of string, like a lazy str.split(sep).
+
+    The string is split 'chunk' characters at a time (give or take a
+    part), which keeps memory bounded for very large strings. This is
+    only done for single-character separators, since occurrences of a
+    longer separator could overlap the point where a chunk is cut.
+
+    """
+    if len(sep) != 1:
+        yield from string.split(sep)
+        return
+
+    start = 0
+    size = len(string)
+    while start + chunk < size:
+        end = string.find(sep, start + chunk)
+        if end == -1:
+            break
+        yield from string[start:end].split(sep)
+        start = end + 1
+    yield from string[start:].split(sep)